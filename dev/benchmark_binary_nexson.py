@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+'''Compares the size and the decoding speed of the binary (MessagePack)
+NexSON serialization with compact JSON decoded by each of the JSON
+libraries that peyotl.utility.json_backend can use.
+
+Usage:
+    benchmark_binary_nexson.py [-n REPS] [study.json ...]
+
+If no files are given, the by-ID NexSON files in the peyotl test data are used.
+'''
+from peyotl.nexson_syntax.binary_nexson import dumps_binary_nexson, loads_binary_nexson
+from peyotl.nexson_syntax.helper import detect_nexson_version, _is_by_id_hbf
+from peyotl.utility.json_backend import available_json_backends, json_dumps
+from peyotl.utility.input_output import read_as_json
+from peyotl.test.support import pathmap
+import glob
+import time
+import sys
+import os
+
+def _time_per_rep(func, reps):
+    start = time.time()
+    for _ in range(reps):
+        func()
+    return (time.time() - start) / reps
+
+def main(filepaths, reps):
+    blobs = []
+    for fp in filepaths:
+        blob = read_as_json(fp)
+        if _is_by_id_hbf(detect_nexson_version(blob)):
+            blobs.append(blob)
+    texts = [json_dumps(b).encode('utf-8') for b in blobs]
+    binaries = [dumps_binary_nexson(b) for b in blobs]
+    json_mb = sum([len(t) for t in texts]) / 1.0e6
+    bin_mb = sum([len(b) for b in binaries]) / 1.0e6
+    sys.stdout.write('{n:d} files, {r:d} reps\n'.format(n=len(blobs), r=reps))
+    sys.stdout.write('compact JSON {j:.3f} MB, binary {b:.3f} MB ({p:.1f}%)\n'.format(j=json_mb,
+                                                                                      b=bin_mb,
+                                                                                      p=100.0 * bin_mb / json_mb))
+    sys.stdout.write('{f:>16} {d:>12}\n'.format(f='format', d='decode s'))
+    for backend in available_json_backends():
+        t = _time_per_rep(lambda: [backend.loads(x) for x in texts], reps)
+        sys.stdout.write('{f:>16} {d:12.4f}\n'.format(f='JSON ' + backend.name, d=t))
+    t = _time_per_rep(lambda: [loads_binary_nexson(x) for x in binaries], reps)
+    sys.stdout.write('{f:>16} {d:12.4f}\n'.format(f='binary', d=t))
+    t = _time_per_rep(lambda: [dumps_binary_nexson(x) for x in blobs], reps)
+    sys.stdout.write('binary encode {d:.4f} s\n'.format(d=t))
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    num_reps = 5
+    if '-n' in args:
+        i = args.index('-n')
+        num_reps = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    if not args:
+        args = glob.glob(os.path.join(pathmap.nexson_source_path(), '*', '*.json'))
+    main(args, num_reps)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+'''Compares one-against-all split comparisons with python int bitmasks
+(add_bits4subtree_ids + compare_bits_as_splits) and with SplitBitmaps.
+
+Usage:
+    benchmark_bitmap_splits.py [--leaves N] [--splits K]
+
+Two random trees with N (default 20000) leaves are built. K (default 200)
+splits of the first tree are each compared with every split of the second
+("taxo") tree. The leaves are numbered in the postorder of the taxo tree,
+so its splits are intervals of bits ("bitmap"); "bitmap-rows" is the same
+comparison with the interval shortcut disabled. Requires numpy.
+'''
+from peyotl.phylo.bitmap_splits import SplitBitmaps, tree_split_bitmaps
+from peyotl.phylo.compat import compare_bits_as_splits
+from peyotl.phylo.tree import parse_newick
+from peyotl.test.support.helper import random_newick
+import random
+import time
+import sys
+
+def main(num_leaves, num_splits):
+    rng = random.Random(1)
+    labels = ['t{i:d}'.format(i=i) for i in range(num_leaves)]
+    phylo = parse_newick(newick=random_newick(labels, rng))
+    taxo = parse_newick(newick=random_newick(labels, rng))
+
+    start = time.time()
+    leaf2bit, taxo_splits = tree_split_bitmaps(taxo)
+    phylo_splits = tree_split_bitmaps(phylo, leaf2bit)[1]
+    bitmap_setup = time.time() - start
+    start = time.time()
+    id2bit = dict([(i, 1 << b) for i, b in leaf2bit.items()])
+    phylo.add_bits4subtree_ids(id2bit)
+    taxo.add_bits4subtree_ids(id2bit)
+    int_setup = time.time() - start
+    rows_only = SplitBitmaps(taxo_splits.num_leaves, rows=taxo_splits.rows)
+
+    universe = taxo.root.bits4subtree_ids
+    taxo_bits = [nd.bits4subtree_ids for nd in taxo_splits.labels]
+    phylo_nodes = phylo_splits.labels[:num_splits]
+    start = time.time()
+    int_results = []
+    for nd in phylo_nodes:
+        b = nd.bits4subtree_ids
+        int_results.append([compare_bits_as_splits(b, tb, universe).value for tb in taxo_bits])
+    int_t = time.time() - start
+    start = time.time()
+    bitmap_results = []
+    for i in range(len(phylo_nodes)):
+        bitmap_results.append(taxo_splits.compare(phylo_splits.bitmap(i)))
+    bitmap_t = time.time() - start
+    start = time.time()
+    rows_results = []
+    for i in range(len(phylo_nodes)):
+        rows_results.append(rows_only.compare(phylo_splits.bitmap(i)))
+    rows_t = time.time() - start
+    for expected, got, got_rows in zip(int_results, bitmap_results, rows_results):
+        assert list(got) == expected
+        assert list(got_rows) == expected
+
+    start = time.time()
+    bits2node = dict([(b, i) for i, b in enumerate(taxo_bits)])
+    found_int = [bits2node.get(nd.bits4subtree_ids) for nd in phylo_splits.labels]
+    int_lookup_t = time.time() - start
+    start = time.time()
+    found_bitmap = [taxo_splits.index_of(phylo_splits.bitmap(i)) for i in range(len(phylo_splits))]
+    bitmap_lookup_t = time.time() - start
+    assert found_int == found_bitmap
+
+    n_cmp = len(phylo_nodes) * len(taxo_bits)
+    sys.stdout.write('{n:d} leaves, {p:d} x {t:d} split comparisons\n'.format(n=num_leaves,
+                                                                             p=len(phylo_nodes),
+                                                                             t=len(taxo_bits)))
+    sys.stdout.write('{m:>12} {s:>10} {c:>14} {r:>14} {l:>10}\n'.format(m='method',
+                                                                      s='setup s',
+                                                                      c='compare s',
+                                                                      r='cmp/s',
+                                                                      l='lookup s'))
+    for name, setup_t, cmp_t, lookup_t in (('int', int_setup, int_t, int_lookup_t),
+                                           ('bitmap', bitmap_setup, bitmap_t, bitmap_lookup_t),
+                                           ('bitmap-rows', bitmap_setup, rows_t, bitmap_lookup_t)):
+        sys.stdout.write('{m:>12} {s:10.3f} {c:14.3f} {r:14.0f} {l:10.3f}\n'.format(m=name,
+                                                                                  s=setup_t,
+                                                                                  c=cmp_t,
+                                                                                  r=n_cmp / cmp_t,
+                                                                                  l=lookup_t))
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    leaves, splits = 20000, 200
+    if '--leaves' in args:
+        i = args.index('--leaves')
+        leaves = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    if '--splits' in args:
+        i = args.index('--splits')
+        splits = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    main(leaves, splits)
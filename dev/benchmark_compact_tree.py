@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+'''Compares the time and memory needed to parse a newick tree into a
+TreeWithPathsInEdges and into a CompactTree.
+
+Usage:
+    benchmark_compact_tree.py [--leaves N] [tree.tre]
+
+If no file is given, a random tree with N (default 200000) labelled leaves
+is used. Memory is only reported under python 3 (it uses tracemalloc).
+'''
+from peyotl.phylo.tree import parse_newick, TreeWithPathsInEdges
+from peyotl.phylo.compact_tree import CompactTree
+from peyotl.test.support.helper import random_newick
+import random
+import time
+import sys
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+def _random_newick(num_leaves, rng):
+    labels = ['Taxon_{i:d}_ott{o:d}'.format(i=i, o=rng.randint(1, 5000000)) for i in range(num_leaves)]
+    return random_newick(labels, rng, internal_label=lambda: 'ott{o:d}'.format(o=rng.randint(1, 5000000)))
+
+def _parse(newick, filepath, tree_class):
+    start = time.time()
+    tree = parse_newick(newick=newick, filepath=filepath, _class=tree_class)
+    elapsed = time.time() - start
+    start = time.time()
+    num_nodes = 0
+    for _ in tree.postorder_node_iter():
+        num_nodes += 1
+    iter_elapsed = time.time() - start
+    mb = None
+    if tracemalloc is not None:
+        # parsed again, because tracing slows the parsing down
+        del tree
+        tracemalloc.start()
+        tree = parse_newick(newick=newick, filepath=filepath, _class=tree_class)
+        mb = tracemalloc.get_traced_memory()[0] / 1.0e6
+        tracemalloc.stop()
+    return elapsed, iter_elapsed, mb, num_nodes
+
+def main(newick, filepath):
+    sys.stdout.write('{c:>22} {n:>10} {p:>9} {t:>11} {m:>10}\n'.format(c='class',
+                                                                       n='nodes',
+                                                                       p='parse s',
+                                                                       t='postorder s',
+                                                                       m='MB'))
+    for tree_class in (TreeWithPathsInEdges, CompactTree):
+        parse_t, iter_t, mb, num_nodes = _parse(newick, filepath, tree_class)
+        mb = 'n/a' if mb is None else '{:.1f}'.format(mb)
+        sys.stdout.write('{c:>22} {n:10d} {p:9.2f} {t:11.2f} {m:>10}\n'.format(c=tree_class.__name__,
+                                                                            n=num_nodes,
+                                                                            p=parse_t,
+                                                                            t=iter_t,
+                                                                            m=mb))
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    num_leaves = 200000
+    if '--leaves' in args:
+        i = args.index('--leaves')
+        num_leaves = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    if args:
+        main(None, args[0])
+    else:
+        main(_random_newick(num_leaves, random.Random(1)), None)
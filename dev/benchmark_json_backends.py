@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+'''Reports the throughput (MB/s) of loading and dumping NexSON study files with
+each of the JSON libraries that peyotl.utility.json_backend can use.
+
+Usage:
+    benchmark_json_backends.py [-n REPS] [study.json ...]
+
+If no files are given, the NexSON files in the peyotl test data are used.
+"canonical dump" is the sorted, newline-separated form written by write_as_json
+(always produced by the json module).
+'''
+from peyotl.utility.json_backend import available_json_backends
+from peyotl.utility.str_util import get_utf_8_string_io_writer, flush_utf_8_writer
+from peyotl.utility.input_output import write_as_json
+from peyotl.test.support import pathmap
+import codecs
+import glob
+import time
+import sys
+import os
+
+def _time_per_rep(func, reps):
+    start = time.time()
+    for _ in range(reps):
+        func()
+    return (time.time() - start) / reps
+
+def _canonical_dump(blob):
+    f, wrapper = get_utf_8_string_io_writer()
+    write_as_json(blob, wrapper)
+    flush_utf_8_writer(wrapper)
+    return f.getvalue()
+
+def main(filepaths, reps):
+    texts = []
+    for fp in filepaths:
+        with codecs.open(fp, 'r', encoding='utf-8') as fo:
+            texts.append(fo.read())
+    num_mb = sum([len(t.encode('utf-8')) for t in texts]) / 1.0e6
+    sys.stdout.write('{n:d} files, {m:.2f} MB, {r:d} reps\n'.format(n=len(texts), m=num_mb, r=reps))
+    sys.stdout.write('{b:>10} {l:>12} {d:>12} {s:>12}\n'.format(b='backend',
+                                                              l='load MB/s',
+                                                              d='dump MB/s',
+                                                              s='sorted MB/s'))
+    blobs = None
+    for backend in available_json_backends():
+        load_t = _time_per_rep(lambda: [backend.loads(t) for t in texts], reps)
+        blobs = [backend.loads(t) for t in texts]
+        dump_t = _time_per_rep(lambda: [backend.dumps(b) for b in blobs], reps)
+        sorted_t = _time_per_rep(lambda: [backend.dumps(b, sort_keys=True) for b in blobs], reps)
+        sys.stdout.write('{b:>10} {l:12.2f} {d:12.2f} {s:12.2f}\n'.format(b=backend.name,
+                                                                          l=num_mb / load_t,
+                                                                          d=num_mb / dump_t,
+                                                                          s=num_mb / sorted_t))
+    canon_t = _time_per_rep(lambda: [_canonical_dump(b) for b in blobs], reps)
+    sys.stdout.write('canonical dump (json module) {c:.2f} MB/s\n'.format(c=num_mb / canon_t))
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    num_reps = 5
+    if '-n' in args:
+        i = args.index('-n')
+        num_reps = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    if not args:
+        args = glob.glob(os.path.join(pathmap.nexson_source_path(), '*', '*.json'))
+    main(args, num_reps)
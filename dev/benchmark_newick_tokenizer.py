@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+'''Reports the throughput (MB/s) of NewickTokenizer and ChunkedNewickTokenizer.
+
+Usage:
+    benchmark_newick_tokenizer.py [-n REPS] [--leaves N] [tree.tre ...]
+
+If no files are given, a random tree with N (default 200000) leaves with
+OTT-style labels and branch lengths is written to a temporary file.
+'''
+from peyotl.utility.tokenizer import NewickTokenizer, ChunkedNewickTokenizer
+from peyotl.test.support.helper import random_newick
+import tempfile
+import random
+import codecs
+import time
+import sys
+import os
+
+def _write_random_tree(filepath, num_leaves, rng):
+    labels = ['Taxon_{i:d}_ott{o:d}:{b:.5f}'.format(i=i, o=rng.randint(1, 5000000), b=rng.random())
+              for i in range(num_leaves)]
+    newick = random_newick(labels,
+                           rng,
+                           internal_label=lambda: 'ott{o:d}'.format(o=rng.randint(1, 5000000)),
+                           edge_length=rng.random)
+    with codecs.open(filepath, 'w', encoding='utf-8') as fo:
+        fo.write(newick)
+        fo.write('\n')
+
+def _time_tokenizing(tokenizer_class, filepath, reps):
+    num_tokens = 0
+    start = time.time()
+    for _ in range(reps):
+        num_tokens = 0
+        for _tok in tokenizer_class(filepath=filepath):
+            num_tokens += 1
+    return (time.time() - start) / reps, num_tokens
+
+def main(filepaths, reps):
+    for fp in filepaths:
+        num_mb = os.path.getsize(fp) / 1.0e6
+        sys.stdout.write('{f}: {m:.2f} MB, {r:d} reps\n'.format(f=fp, m=num_mb, r=reps))
+        for tokenizer_class in (NewickTokenizer, ChunkedNewickTokenizer):
+            t, num_tokens = _time_tokenizing(tokenizer_class, fp, reps)
+            sys.stdout.write('{c:>24} {n:10d} tokens {s:8.3f} s {r:8.2f} MB/s\n'.format(c=tokenizer_class.__name__,
+                                                                                       n=num_tokens,
+                                                                                       s=t,
+                                                                                       r=num_mb / t))
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    num_reps = 3
+    num_leaves = 200000
+    if '-n' in args:
+        i = args.index('-n')
+        num_reps = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    if '--leaves' in args:
+        i = args.index('--leaves')
+        num_leaves = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    if args:
+        main(args, num_reps)
+    else:
+        tmp_dir = tempfile.mkdtemp()
+        tmp_fp = os.path.join(tmp_dir, 'random.tre')
+        try:
+            _write_random_tree(tmp_fp, num_leaves, random.Random(1))
+            main([tmp_fp], num_reps)
+        finally:
+            os.remove(tmp_fp)
+            os.rmdir(tmp_dir)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+'''Times the pairwise split distances of a collection of random trees.
+
+Usage:
+    benchmark_split_distance.py [--trees T] [--leaves N] [--processes P]
+
+T (default 100) random trees are each built on a random half of N (default
+2000) OTT IDs. The all-pairs RF/weighted distances are computed in one
+process and in P (default 4) processes.
+'''
+from peyotl.phylo.split_distance import collection_tree_splits, iter_pairwise_distances
+from peyotl.phylo.tree import parse_newick
+from peyotl.test.support.helper import random_newick
+import random
+import time
+import sys
+
+def main(num_trees, num_leaves, num_processes):
+    rng = random.Random(1)
+    labels = ['ott{i:d}'.format(i=i) for i in range(num_leaves)]
+    trees = [parse_newick(newick=random_newick([i for i in labels if rng.random() < 0.5], rng))
+             for _ in range(num_trees)]
+    start = time.time()
+    splits = collection_tree_splits(trees)
+    setup_t = time.time() - start
+    num_pairs = num_trees * (num_trees - 1) // 2
+    sys.stdout.write('{t:d} trees, {n:d} leaves, {p:d} pairs, setup {s:.3f} s\n'.format(t=num_trees,
+                                                                                      n=num_leaves,
+                                                                                      p=num_pairs,
+                                                                                      s=setup_t))
+    results = []
+    for p in (1, num_processes):
+        start = time.time()
+        results.append(list(iter_pairwise_distances(splits, num_processes=p)))
+        t = time.time() - start
+        sys.stdout.write('{p:>3d} processes {t:10.3f} s {r:12.0f} pairs/s\n'.format(p=p, t=t, r=num_pairs / t))
+    assert results[0] == results[1]
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    settings = {'--trees': 100, '--leaves': 2000, '--processes': 4}
+    for k in settings:
+        if k in args:
+            i = args.index(k)
+            settings[k] = int(args[i + 1])
+            args = args[:i] + args[i + 2:]
+    main(settings['--trees'], settings['--leaves'], settings['--processes'])
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+'''Validates NexSON study files and reports the time spent in each phase of
+validation for each type of element (see peyotl.nexson_validation.validation_profile).
+
+Usage:
+    benchmark_validation.py [-n REPS] [study.json ...]
+
+If no files are given, the NexSON files in the peyotl test data are used.
+'''
+from peyotl.nexson_validation import validate_nexson, ValidationProfile
+from peyotl.utility.input_output import read_as_json
+from peyotl.test.support import pathmap
+import glob
+import sys
+import os
+
+def main(filepaths, reps):
+    blobs = [read_as_json(fp) for fp in filepaths]
+    profile = ValidationProfile()
+    for _ in range(reps):
+        for blob in blobs:
+            validate_nexson(blob, validation_profile=profile)
+    total = profile.get('top-level', 'total')
+    sys.stdout.write('{n:d} files, {r:d} reps, {t:.2f} ms per study\n'.format(n=len(blobs),
+                                                                             r=reps,
+                                                                             t=1000.0 * total['seconds'] / total['calls']))
+    profile.write_table(sys.stdout)
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    num_reps = 5
+    if '-n' in args:
+        i = args.index('-n')
+        num_reps = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    if not args:
+        args = glob.glob(os.path.join(pathmap.nexson_source_path(), '*', '*.json'))
+    main(args, num_reps)
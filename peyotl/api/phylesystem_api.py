@@ -4,7 +4,7 @@ from peyotl.api.wrapper import _WSWrapper, APIWrapper
 from peyotl.api.study_ref import TreeRef
 from peyotl.nexson_syntax import create_content_spec
 from peyotl.utility import get_logger
-import anyjson
+from peyotl.utility.json_backend import json_dumps
 import urllib
 import os
 _LOG = get_logger(__name__)
@@ -173,7 +173,7 @@ variable to obtain this token. If you need to obtain your key, see the instructi
             params['commit_msg'] = commit_msg
         return self.json_http_post(uri,
                                    params=params,
-                                   data=anyjson.dumps({'nexson': nexson}))
+                                   data=json_dumps({'nexson': nexson}))
     def put_study(self,
                   study_id,
                   nexson,
@@ -187,7 +187,7 @@ variable to obtain this token. If you need to obtain your key, see the instructi
             params['commit_msg'] = commit_msg
         return self.json_http_put(uri,
                                   params=params,
-                                  data=anyjson.dumps({'nexson': nexson}))
+                                  data=json_dumps({'nexson': nexson}))
     def _remote_phylesystem_config(self):
         uri = '{d}/phylesystem_config'.format(d=self._prefix)
         return self.json_http_get(uri)
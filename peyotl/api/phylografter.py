@@ -8,7 +8,7 @@ from peyotl.utility.str_util import is_str_type
 from peyotl.utility import write_to_filepath
 from peyotl.nexson_syntax import write_as_json
 import datetime
-import anyjson
+from peyotl.utility.json_backend import json_loads
 import requests
 import gzip
 from peyotl.utility import get_logger
@@ -64,12 +64,12 @@ class _PhylografterWrapper(_WSWrapper):
             raise
         if is_str_type(results):
             if output_filepath is None:
-                return anyjson.loads(results)
+                return json_loads(results)
             else:
                 if store_raw:
                     write_to_filepath(results, output_filepath)
                 else:
-                    write_as_json(anyjson.loads(results), output_filepath)
+                    write_as_json(json_loads(results), output_filepath)
                 return True
         raise RuntimeError('gzipped response from phylografter export_gzipNexSON.json, but not a string is:', results)
     # alias fetch_nexson
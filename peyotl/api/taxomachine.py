@@ -4,7 +4,7 @@ from peyotl.api.taxon import TaxonWrapper, TaxonHolder
 from peyotl.utility import get_config_object, get_logger
 from peyotl.api.wrapper import _WSWrapper, APIWrapper
 import weakref
-import anyjson
+from peyotl.utility.json_backend import json_dumps
 _LOG = get_logger(__name__)
 _EMPTY_TUPLE = tuple()
 class TaxonomyInfoWrapper(FrozenDictAttrWrapper):
@@ -180,7 +180,7 @@ class _TaxomachineAPIWrapper(_WSWrapper):
             data['include_deprecated'] = True
         if include_dubious:
             data['include_dubious'] = True
-        resp = self.json_http_post(uri, data=anyjson.dumps(data))
+        resp = self.json_http_post(uri, data=json_dumps(data))
         if wrap_response is None or wrap_response is False:
             return resp
         if wrap_response is True:
@@ -210,13 +210,13 @@ class _TaxomachineAPIWrapper(_WSWrapper):
                 data['context_name'] = context_name
             if include_dubious:
                 data['include_dubious'] = True
-        return self.json_http_post(uri, data=anyjson.dumps(data))
+        return self.json_http_post(uri, data=json_dumps(data))
     def infer_context(self, names):
         if self.use_v1:
             raise NotImplementedError("infer_context not wrapped in v1")
         uri = '{p}/infer_context'.format(p=self.prefix)
         data = {'names': names}
-        return self.json_http_post(uri, data=anyjson.dumps(data))
+        return self.json_http_post(uri, data=json_dumps(data))
     def __init__(self, domain, **kwargs):
         self._config = get_config_object(None, **kwargs)
         self._api_vers = self._config.get_from_config_setting_cascade([('apis', 'taxomachine_api_version'),
@@ -269,7 +269,7 @@ class _TaxomachineAPIWrapper(_WSWrapper):
                 'include_lineage': bool(include_lineage),
                 'list_terminal_descendants': bool(list_terminal_descendants)}
         uri = '{p}/taxon'.format(p=self.taxonomy_prefix)
-        r = self.json_http_post(uri, data=anyjson.dumps(data))
+        r = self.json_http_post(uri, data=json_dumps(data))
         if 'error' in r:
             raise ValueError(r['error'])
         if wrap_response:
@@ -282,14 +282,14 @@ class _TaxomachineAPIWrapper(_WSWrapper):
             raise NotImplementedError('"subtree" method not implemented')
         data = {'ott_id': int(ott_id), }
         uri = '{p}/subtree'.format(p=self.taxonomy_prefix)
-        return self.json_http_post(uri, data=anyjson.dumps(data))
+        return self.json_http_post(uri, data=json_dumps(data))
     def lica(self, ott_ids, include_lineage=False):
         if self.use_v1:
             raise NotImplementedError('"lica" method not implemented')
         data = {'ott_ids': [int(i) for i in ott_ids],
                 'include_lineage': bool(include_lineage)}
         uri = '{p}/lica'.format(p=self.taxonomy_prefix)
-        return self.json_http_post(uri, data=anyjson.dumps(data))
+        return self.json_http_post(uri, data=json_dumps(data))
     def contexts(self):
         # Taxonomic name contexts. These are cached in _contexts
         if self._contexts is None:
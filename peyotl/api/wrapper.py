@@ -4,17 +4,17 @@ from peyotl.utility import get_config_object, get_logger
 import requests
 import warnings
 import codecs
-import anyjson
+from peyotl.utility.json_backend import json_dumps, json_loads
 import os
 _LOG = get_logger(__name__)
 
 GZIP_REQUEST_HEADERS = {
     'Accept-Encoding' : 'gzip',
-    'Content-Type' : 'application/json',
+    'Content-Type' : 'application/json; charset=utf-8',
     'Accept' : 'application/json',
 }
 
-_JSON_HEADERS = {'Content-Type': 'application/json',
+_JSON_HEADERS = {'Content-Type': 'application/json; charset=utf-8',
                  'Accept': 'application/json', }
 
 CURL_LOGGER = os.environ.get('PEYOTL_CURL_LOG_FILE')
@@ -46,8 +46,8 @@ def log_request_as_curl(curl_log, url, verb, headers, params, data):
             dargs = ''
         if data:
             if is_str_type(data):
-                data = anyjson.loads(data)
-            dargs = "'" + anyjson.dumps(data) + "'"
+                data = json_loads(data)
+            dargs = "'" + json_dumps(data) + "'"
         else:
             dargs = ''
         data_arg = ''
@@ -322,7 +322,7 @@ def _http_method_summary_str(url, verb, headers, params, data=None):
     if data is None:
         ds = 'None'
     elif is_str_type(data):
-        ds = _dict_summary(anyjson.loads(data), 'data')
+        ds = _dict_summary(json_loads(data), 'data')
     else:
         ds = _dict_summary(data, 'data')
     fmt = 'error in HTTP {v} verb call to {u} with {p}, {d} and {h}'
@@ -373,6 +373,10 @@ class _WSWrapper(object):
         if CURL_LOGGER is not None:
             log_request_as_curl(CURL_LOGGER, url, verb, headers, params, data)
         func = _VERB_TO_METHOD_DICT[verb]
+        if isinstance(data, UNICODE):
+            # json_dumps does not escape non-ASCII characters, and requests
+            #   would encode a text body as latin-1
+            data = data.encode('utf-8')
         try:
             resp = func(url, params=params, headers=headers, data=data)
         except requests.exceptions.ConnectionError:
@@ -1,20 +1,25 @@
 #!/usr/bin/env python
 from peyotl.ott import create_pruned_and_taxonomy_for_tip_ott_ids
-from peyotl.phylo.compat import compare_bits_as_splits, SplitComparison
+from peyotl.nexson_syntax import extract_tree_nexson
+from peyotl.nexson_proxy import NexsonTreeProxy
+from peyotl.utility.json_backend import json_loads
+from peyotl.phylo.tree import IndexedTree
 from peyotl.utility import any_early_exit, get_logger
-from peyotl.utility.str_util import reverse_dict
+from peyotl.utility.worker_pool import imap_with_worker_state
 _LOG = get_logger(__name__)
-def evaluate_tree_rooting(nexson, ott, tree_proxy):
+def evaluate_tree_rooting(nexson, ott, tree_proxy, taxonomy_cache=None):
     '''
     Returns None if the taxanomy contributes no information to the rooting decision
         (e.g. all of the tips are within one genus in the taxonomy)
-
-    TODO: need to coordinate with Jim Allman and see if we can
-    do this in a non- O(nm) manner (where n and m are the # of non-trivial edges in the phylo and taxo tree)
-    putting barrier notes on the phylo tree would work...
-
+    Otherwise the pruned phylogeny is scored with score_rootings and its
+        result is returned.
+    See create_pruned_and_taxonomy_for_tip_ott_ids for `taxonomy_cache`.
     '''
-    pruned_phylo, taxo_tree = create_pruned_and_taxonomy_for_tip_ott_ids(tree_proxy, ott)
+    # only the topology and IDs of the trees are used, so the paths are compacted
+    pruned_phylo, taxo_tree = create_pruned_and_taxonomy_for_tip_ott_ids(tree_proxy,
+                                                                         ott,
+                                                                         compact_paths=True,
+                                                                         taxonomy_cache=taxonomy_cache)
     if taxo_tree is None: # this can happen if no otus are mapped
         return None
     has_taxo_groupings = any_early_exit(taxo_tree.root.child_iter(), lambda nd: not nd.is_leaf)
@@ -23,192 +28,307 @@ def evaluate_tree_rooting(nexson, ott, tree_proxy):
     has_phylo_groupings = any_early_exit(pruned_phylo.root.child_iter(), lambda nd: not nd.is_leaf)
     if not has_phylo_groupings:
         return None
-    id2bit = pruned_phylo.add_bits4subtree_ids(None)
-    taxo_tree.add_bits4subtree_ids(id2bit)
-    assert taxo_tree.root.bits4subtree_ids == pruned_phylo.root.bits4subtree_ids
-    taxo_nontriv_splits = taxo_tree.bits2internal_node
-    taxon_mask = taxo_tree.root.bits4subtree_ids
-    #_LOG.debug('taxo_nontriv_splits = {}'.format(taxo_nontriv_splits))
-    # might want to copy this dict rather than modify in place..
-    del taxo_nontriv_splits[taxon_mask] # root bitmask is trivial
-    _LOG.debug('taxon_mask = {} (which is {} bits)'.format(bin(taxon_mask)[2:], len(bin(taxon_mask)) - 2))
-    num_ids = len(id2bit)
-    _LOG.debug('id2bit has length = {}'.format(len(id2bit)))
-    #for checking tips of the phylogeny, it is nice to know which leaf OTUs attach
-    #   at the base of the taxonomy (no other grouping)
-    basal_taxo = set()
-    basal_bits = 0
-    for c in taxo_tree.root.child_iter():
-        if c.is_leaf:
-            basal_taxo.add(c._id)
-            basal_bits |= id2bit[c._id]
-    _LOG.debug('basal_bits = {}'.format(bin(basal_bits)[2:].zfill(num_ids)))
-    _LOG.debug('# nontrivial taxo splits = {}'.format(len(taxo_nontriv_splits)))
-    _EMPTY_SET = frozenset([])
-    non_root_pp_preorder = [nd for nd in pruned_phylo.preorder_node_iter()][1:]
-    curr_root_incompat_set = set()
-    any_root_incompat_set = set()
-    _taxo_node_id_set_cache = {_EMPTY_SET: _EMPTY_SET}
-    for node in non_root_pp_preorder:
-        edge = node.edge
-        if node.is_leaf:
-            edge._displays = None
-            edge._inverted_displays = None
-            b = id2bit[node._id]
-            if node._id in basal_taxo:
-                edge._not_inverted_incompat = _EMPTY_SET
-                edge._inverted_incompat = _EMPTY_SET
-                inv_mask = taxon_mask - b
-                idisp = taxo_nontriv_splits.get(inv_mask)
-                if idisp is not None:
-                    edge._inverted_displays = idisp
+    return score_rootings(pruned_phylo, taxo_tree)
+
+def score_rootings(phylo, taxo_tree):
+    '''Scores every rooting of `phylo` (at an internal node, or on an edge) against
+    the non-trivial taxa of `taxo_tree`, which must have the same leaf IDs.
+    A rooting "displays" a taxon if one of the clades of the rooted tree has the
+    leaves of the taxon, and is "incompatible" with a taxon if any of its clades
+    overlaps the taxon without either one containing the other.
+
+    The scores are stored as rooting_here_disp_score, rooting_here_incompat_score
+        and rooting_here_score (a (disp, incompat) tuple) on the internal nodes
+        of phylo (rooting at the node) and on the edge of every non-root node
+        (rooting on the edge between the node and its parent).
+    Returns a dict with:
+        "current_score": the score of the current rooting,
+        "best_score": the highest disp score (ties broken by the lowest incompat score),
+        "best_rootings": list of (node, on_edge) pairs that have the best_score, and
+        "any_root_incompat": set of the IDs of taxa that conflict with every rooting, and
+        "num_tips": the number of leaves of phylo.
+
+    Rather than comparing every edge with every taxon, each taxon is mapped
+    to the region of rootings that display it and the region that conflicts
+    with it (both are unions of a few subtrees and single nodes of the phylogeny
+    rooted at a leaf), and all of the regions are summed in one preorder sweep.
+    '''
+    pnodes = [nd for nd in phylo.preorder_node_iter()]
+    pindex = {}
+    for i, nd in enumerate(pnodes):
+        pindex[nd] = i
+    nbrs = [[] for _ in pnodes]
+    for i, nd in enumerate(pnodes[1:], 1):
+        p = pindex[nd.parent]
+        nbrs[i].append(p)
+        nbrs[p].append(i)
+    tnodes = [nd for nd in taxo_tree.preorder_node_iter()]
+    taxo = IndexedTree.from_nodes(tnodes)
+    tleaf_by_id = dict([(tnodes[i]._id, i) for i in range(len(tnodes)) if not taxo.children[i]])
+    is_leaf = [nd.is_leaf for nd in pnodes]
+    pleaves = [i for i in range(len(pnodes)) if is_leaf[i]]
+    if set([pnodes[i]._id for i in pleaves]) != set(tleaf_by_id.keys()):
+        raise ValueError('The phylogeny and the taxonomy must have the same leaf IDs')
+    # The phylogeny is handled as rooted at the leaf that is in the fewest taxa,
+    #   so that (unless the leaf is in a taxon) every taxon is a potential clade.
+    x0 = min(pleaves, key=lambda i: taxo.depth[tleaf_by_id[pnodes[i]._id]])
+    xt = IndexedTree.from_adjacency(nbrs, x0, is_leaf)
+    order, xparent, xchildren = xt.order, xt.parent, xt.children
+    num_x = len(order)
+    num_leaves = xt.num_leaves[0] + 1
+    # taxo_lca[v] is the smallest taxon that contains all of the leaves of v
+    taxo_lca = [-1] * num_x
+    for v in range(num_x - 1, 0, -1):
+        if xchildren[v]:
+            a = taxo_lca[xchildren[v][0]]
+            for c in xchildren[v][1:]:
+                a = taxo.lca(a, taxo_lca[c])
+            taxo_lca[v] = a
+        else:
+            taxo_lca[v] = tleaf_by_id[pnodes[order[v]]._id]
+    x_by_id = dict([(pnodes[order[v]]._id, v) for v in range(num_x) if not xchildren[v] or v == 0])
+    # phylo_lca[t] is the phylogeny's MRCA of the leaves of taxon t
+    phylo_lca = [-1] * len(tnodes)
+    for t in range(len(tnodes) - 1, -1, -1):
+        if taxo.children[t]:
+            p = phylo_lca[taxo.children[t][0]]
+            for c in taxo.children[t][1:]:
+                p = xt.lca(p, phylo_lca[c])
+            phylo_lca[t] = p
+        else:
+            phylo_lca[t] = x_by_id[tnodes[t]._id]
+    tx0 = tleaf_by_id[pnodes[x0]._id]
+    # counts for: all rootings, rootings in the subtree below v (including v
+    #   and the edge above v), rooting at v, and rooting on the edge above v
+    counts = {}
+    for k in ('incompat', 'disp'):
+        counts[k] = [0, [0] * num_x, [0] * num_x, [0] * num_x]
+    incompat, disp = counts['incompat'], counts['disp']
+    any_root_incompat = set()
+    num_taxa = 0
+    for t in range(1, len(tnodes)):
+        if len(taxo.children[t]) < 2 or taxo.num_leaves[t] == num_leaves:
+            continue # trivial taxon, or the same leaves as its only child
+        num_taxa += 1
+        t_last = taxo.last[t]
+        if t <= tx0 <= t_last:
+            # the taxon is the side of a split that contains x0, so the other side is a clade
+            clade_is_taxon = False
+            in_clade = _count_leaves_outside(xt, taxo_lca, t, t_last)
+            size = num_leaves - taxo.num_leaves[t]
+            p = 1
+            descend = True
+            while descend:
+                descend = False
+                for c in xchildren[p]:
+                    if in_clade[c] == size:
+                        p, descend = c, True
+                        break
+            full = [c for c in xchildren[p] if in_clade[c] == xt.num_leaves[c]]
+        else:
+            clade_is_taxon = True
+            size = taxo.num_leaves[t]
+            p = phylo_lca[t]
+            full = [c for c in xchildren[p] if t <= taxo_lca[c] <= t_last]
+        if sum([xt.num_leaves[c] for c in full]) != size:
+            incompat[0] += 1
+            any_root_incompat.add(tnodes[t]._id)
+            continue
+        is_edge = len(full) == len(xchildren[p])
+        if clade_is_taxon:
+            if is_edge:
+                # conflicts with rootings strictly below p, displayed by all others except p
+                incompat[1][p] += 1
+                incompat[2][p] -= 1
+                incompat[3][p] -= 1
+                disp[0] += 1
+                disp[1][p] -= 1
+                disp[3][p] += 1
             else:
-                edge._not_inverted_incompat = _EMPTY_SET
-                #TODO would be more efficient to jump to tip and walk back...
-                b = id2bit[node._id]
-                ii = set()
-                for tb, tid in taxo_nontriv_splits.items():
-                    if tb & b:
-                        ii.add(tid)
-                edge._inverted_incompat = _get_cached_set(ii, _taxo_node_id_set_cache)
-                disp = taxo_nontriv_splits.get(b)
-                if disp is not None:
-                    edge._displays = disp
+                for c in full:
+                    incompat[1][c] += 1
         else:
-            #TODO this could be more efficient...
-            b = node.bits4subtree_ids
-            nii = set()
-            ii = set()
-            e = set()
-            ie = set()
-            displays = None
-            inv_displays = None
-            #TODO: this loop does not take advantage of the fact that
-            #   taxo_nontriv_splits are splits from a tree (hence compatible with each other)
-            for tb, tid in taxo_nontriv_splits.items():
-                sp_result = compare_bits_as_splits(b, tb, taxon_mask)
-                if sp_result == SplitComparison.UNROOTED_INCOMPATIBLE:
-                    any_root_incompat_set.add(tid)
-                    nii.add(tid)
-                    ii.add(tid)
-                elif sp_result == SplitComparison.UNROOTED_COMPAT:
-                    nii.add(tid)
-                elif sp_result == SplitComparison.ROOTED_COMPAT:
-                    ii.add(tid)
-                elif sp_result == SplitComparison.UNROOTED_EQUIVALENT:
-                    ie.add(tid)
-                    inv_displays = tid
-                elif sp_result == SplitComparison.ROOTED_EQUIVALENT:
-                    e.add(tid)
-                    displays = tid
-            edge._not_inverted_incompat = _get_cached_set(nii, _taxo_node_id_set_cache)
-            edge._inverted_incompat = _get_cached_set(ii, _taxo_node_id_set_cache)
-            edge._equiv = _get_cached_set(e, _taxo_node_id_set_cache)
-            edge._inverted_equiv = _get_cached_set(ie, _taxo_node_id_set_cache)
-            edge._displays = displays
-            edge._inverted_displays = inv_displays
-            curr_root_incompat_set.update(nii)
-            # create a set to be filled in in the loop below (for each internal node)
-            node._inc_contrib_rootward = set()
-            node._displays_contrib_rootward = set()
-    pproot = pruned_phylo.root
-    pproot._incompat_if_rooted_below = set()
-    pproot._inc_contrib_rootward = set()
-    pproot._displays_contrib_rootward = set()
-    for node in reversed(non_root_pp_preorder):
-        edge = node.edge
-        if node.is_leaf:
-            edge._inc_contrib_rootward = _EMPTY_SET
-            node._displays_contrib_rootward = _EMPTY_SET
+            incompat[0] += 1
+            if is_edge:
+                # the split may span a path of nodes of degree 2
+                while xparent[p] > 0 and len(xchildren[xparent[p]]) == 1:
+                    p = xparent[p]
+                disp[1][p] += 1
+                incompat[1][p] -= 1
+                incompat[2][xparent[p]] -= 1
+            else:
+                incompat[2][p] -= 1
+                for c in full:
+                    incompat[1][c] -= 1
+    _LOG.debug('# nontrivial taxa = {}'.format(num_taxa))
+    node_scores, edge_scores = [None] * num_x, [None] * num_x
+    acc_incompat, acc_disp = [0] * num_x, [0] * num_x
+    for v in range(1, num_x):
+        par = xparent[v]
+        ai = acc_incompat[par] + incompat[1][v]
+        ad = acc_disp[par] + disp[1][v]
+        acc_incompat[v], acc_disp[v] = ai, ad
+        edge_scores[v] = (disp[0] + ad + disp[3][v], incompat[0] + ai + incompat[3][v])
+        if xchildren[v]:
+            node_scores[v] = (disp[0] + ad + disp[2][v], incompat[0] + ai + incompat[2][v])
+    x_of = [0] * len(pnodes)
+    for xi, i in enumerate(order):
+        x_of[i] = xi
+    best_score, best_rootings = None, []
+    for i, nd in enumerate(pnodes):
+        if not nd.is_leaf:
+            best_score = _check_for_opt_score(nd, node_scores[x_of[i]], (nd, False), best_score, best_rootings)
+        if i > 0:
+            xi, xp = x_of[i], x_of[pindex[nd.parent]]
+            score = edge_scores[xi] if xparent[xi] == xp else edge_scores[xp]
+            best_score = _check_for_opt_score(nd.edge, score, (nd, True), best_score, best_rootings)
+    current_score = pnodes[0].rooting_here_score
+    _LOG.debug('best_score = {}'.format(best_score))
+    _LOG.debug('best_rootings = {}'.format(best_rootings))
+    _LOG.debug('current score = {}'.format(current_score))
+    _LOG.debug('any_root_incompat (size={}) = {}'.format(len(any_root_incompat), any_root_incompat))
+    return {'current_score': current_score,
+            'best_score': best_score,
+            'best_rootings': best_rootings,
+            'any_root_incompat': any_root_incompat,
+            'num_tips': num_leaves}
+
+ROOTING_TABLE_COLUMNS = ('study_id',
+                         'tree_id',
+                         'num_tips',
+                         'current_disp',
+                         'current_incompat',
+                         'best_disp',
+                         'best_incompat',
+                         'num_best_rootings',
+                         'best_rooting',
+                         'num_any_root_incompat',
+                         'status')
+
+def rooting_table_row(study_id, tree_id, result):
+    '''Returns a dict with the ROOTING_TABLE_COLUMNS keys for the `result` of
+    evaluate_tree_rooting. best_rooting is the first of the best rootings,
+    written as the node ID followed by "@node" or "@edge" (the edge between the
+    node and its parent).
+    '''
+    row = dict([(k, None) for k in ROOTING_TABLE_COLUMNS])
+    row['study_id'] = study_id
+    row['tree_id'] = tree_id
+    if result is None:
+        row['status'] = 'no taxonomic information'
+        return row
+    row['num_tips'] = result['num_tips']
+    row['current_disp'], row['current_incompat'] = result['current_score']
+    row['best_disp'], row['best_incompat'] = result['best_score']
+    best = result['best_rootings']
+    row['num_best_rootings'] = len(best)
+    nd, on_edge = best[0]
+    row['best_rooting'] = '{i}@{w}'.format(i=nd._id, w='edge' if on_edge else 'node')
+    row['num_any_root_incompat'] = len(result['any_root_incompat'])
+    row['status'] = 'ok'
+    return row
+
+def evaluate_study_rootings(study_id, nexson, ott, tree_id=None, taxonomy_cache=None):
+    '''Returns a list of rooting_table_row dicts for the trees of a study
+    (or the tree `tree_id`).
+    '''
+    rows = []
+    for tid, tree, otus in extract_tree_nexson(nexson, tree_id=tree_id):
+        tree_proxy = NexsonTreeProxy(tree=tree, tree_id=tid, otus=otus)
+        try:
+            result = evaluate_tree_rooting(nexson, ott, tree_proxy, taxonomy_cache=taxonomy_cache)
+        except Exception as x:
+            row = rooting_table_row(study_id, tid, None)
+            row['status'] = '{t}: {m}'.format(t=type(x).__name__, m=str(x))
         else:
-            par = node.parent
-            iaobc = set(edge._not_inverted_incompat)
-            iaobc.update(node._inc_contrib_rootward)
-            edge._inc_contrib_rootward = _get_cached_set(iaobc, _taxo_node_id_set_cache)
-            par._inc_contrib_rootward.update(edge._inc_contrib_rootward)
-            par._displays_contrib_rootward.update(node._displays_contrib_rootward)
-            if edge._displays is not None:
-                par._displays_contrib_rootward.add(edge._displays)
+            row = rooting_table_row(study_id, tid, result)
+        rows.append(row)
+    return rows
 
-    _LOG.debug('# root _inc_contrib_rootward = {}'.format(pruned_phylo.root._inc_contrib_rootward))
-    _LOG.debug('# curr_root_incompat_set = {}'.format(curr_root_incompat_set))
-    pproot.rooting_here_incompat = _get_cached_set(pproot._inc_contrib_rootward, _taxo_node_id_set_cache)
-    pproot.rooting_here_incompat_score = len(pproot.rooting_here_incompat)
-    pproot.rooting_here_displays = _get_cached_set(pproot._displays_contrib_rootward, _taxo_node_id_set_cache)
-    pproot.rooting_here_disp_score = len(pproot.rooting_here_displays)
-    pproot.rooting_here_score = (pproot.rooting_here_disp_score, pproot.rooting_here_incompat_score)
-    pproot._inc_contrib_tipward = _EMPTY_SET
-    pproot._disp_contrib_tipward = _EMPTY_SET
-    best_score = pproot.rooting_here_score
-    best_rootings = [pproot]
-    # now sweep up
-    for node in non_root_pp_preorder:
-        edge = node.edge
-        parent = node.parent
-        sib_inc_union = set()
-        sib_disp = set()
-        for sib in node.sib_iter():
-            sib_inc_union.update(sib.edge._inc_contrib_rootward)
-            sib_disp.update(sib._displays_contrib_rootward)
-            if sib.edge._displays is not None:
-                sib_disp.add(sib.edge._displays)
-        # if we are visiting an internal node, we have to figure out the cost of
-        #  rooting at the node too...
-        if not node.is_leaf:
-            icu = set()
-            icu.update(edge._inverted_incompat)
-            icu.update(sib_inc_union)
-            icu.update(parent._inc_contrib_tipward)
-            node._inc_contrib_tipward = _get_cached_set(icu, _taxo_node_id_set_cache)
-            dci = set(sib_disp)
-            if edge._inverted_displays is not None:
-                dci.add(edge._displays)
-            dci.update(parent._disp_contrib_tipward)
-            node._disp_contrib_tipward = _get_cached_set(dci, _taxo_node_id_set_cache)
+# The OTT wrapper (and its id -> parent dict) of the worker processes of
+#   evaluate_corpus_rootings. It is set by the initializer of the pool, so
+#   it is pickled for every worker unless the workers are forked.
+_WORKER_OTT = None
+_WORKER_TAXONOMY_CACHE = {}
+MAX_CACHED_TAXONOMIES = 2000
 
-            rhi = set()
-            rhi.update(icu)
-            rhi.update(node._inc_contrib_rootward)
-            node.rooting_here_incompat = _get_cached_set(rhi, _taxo_node_id_set_cache)
-            rhd = set(node._displays_contrib_rootward)
-            rhd.update(node._disp_contrib_tipward)
-            node.rooting_here_displays = _get_cached_set(rhd, _taxo_node_id_set_cache)
-            best_score, best_rootings = _check_for_opt_score(node, best_score, best_rootings)
-        # figure out the # of conflicts if rooting on this edge...
-        rhi = set()
-        rhi.update(edge._inverted_incompat)
-        rhi.update(sib_inc_union)
-        edge.rooting_here_incompat = _get_cached_set(rhi, _taxo_node_id_set_cache)
-        rhd = set(parent._disp_contrib_tipward)
-        rhd.update(parent.rooting_here_displays)
-        if edge._inverted_displays is not None:
-            rhd.add(edge._inverted_displays)
-        edge.rooting_here_displays = _get_cached_set(rhd, _taxo_node_id_set_cache)
-        best_score, best_rootings = _check_for_opt_score(edge, best_score, best_rootings)
+def _set_worker_ott(ott):
+    global _WORKER_OTT
+    prev = _WORKER_OTT
+    _WORKER_OTT = ott
+    return prev
 
-    _LOG.debug('best_score = {}'.format(best_score))
-    _LOG.debug('best_rootings = {}'.format(best_rootings))
-    _LOG.debug('current score = {}'.format(pproot.rooting_here_score))
-    _LOG.debug('any_root_incompat_set (size={}) = {}'.format(len(any_root_incompat_set), any_root_incompat_set))
+def _evaluate_study_file_in_worker(args):
+    study_id, filepath, tree_id = args
+    if len(_WORKER_TAXONOMY_CACHE) > MAX_CACHED_TAXONOMIES:
+        _WORKER_TAXONOMY_CACHE.clear()
+    try:
+        with open(filepath, 'rb') as fo:
+            nexson = json_loads(fo.read())
+        return evaluate_study_rootings(study_id,
+                                       nexson,
+                                       _WORKER_OTT,
+                                       tree_id=tree_id,
+                                       taxonomy_cache=_WORKER_TAXONOMY_CACHE)
+    except Exception as x:
+        row = rooting_table_row(study_id, tree_id, None)
+        row['status'] = '{t}: {m}'.format(t=type(x).__name__, m=str(x))
+        return [row]
 
-def _check_for_opt_score(entity, best, best_list):
-    incompat = len(entity.rooting_here_incompat)
-    ds = len(entity.rooting_here_displays)
-    entity.rooting_here_incompat_score = incompat
-    entity.rooting_here_disp_score = ds
-    entity.rooting_here_score = (entity.rooting_here_disp_score, entity.rooting_here_incompat_score)
-    high_disp, low_incompat = best
-    if ds > high_disp:
-        best = entity.rooting_here_score
-        best_list = [entity]
-    elif ds == high_disp:
-        if incompat < low_incompat:
-            best = entity.rooting_here_score
-            best_list = [entity]
-        elif incompat == low_incompat:
-            best_list.append(entity)
-    return best, best_list
-def _get_cached_set(s, dict_frozensets):
-    fs = frozenset(s)
-    return dict_frozensets.setdefault(fs, fs)
+def evaluate_corpus_rootings(study_filepath_iter, ott, num_processes=1, tree_id=None):
+    '''Evaluates the rootings of all of the trees of the (study ID, filepath)
+    pairs in `study_filepath_iter` (e.g. Phylesystem().iter_study_filepaths())
+    and returns a list of rooting_table_row dicts, sorted by study and tree ID.
+
+    Each study is a job for a multiprocessing.Pool of `num_processes`. The
+    taxonomy is read once, before the pool is created, and handed to each
+    worker by the initializer of the pool (forked workers share it, others
+    receive a pickled copy). Every worker reuses the induced taxonomies of
+    tip sets that it has already seen.
+    '''
+    ott.ott_id2par_ott_id # pylint: disable=W0104
+    jobs = [(study_id, filepath, tree_id) for study_id, filepath in study_filepath_iter]
+    rows = []
+    try:
+        for study_rows in imap_with_worker_state(_evaluate_study_file_in_worker,
+                                                 jobs,
+                                                 _set_worker_ott,
+                                                 ott,
+                                                 num_processes=num_processes,
+                                                 ordered=False):
+            rows.extend(study_rows)
+    finally:
+        # the cache of this process is only filled by the serial path
+        _WORKER_TAXONOMY_CACHE.clear()
+    rows.sort(key=lambda r: (r['study_id'], r['tree_id'] or ''))
+    return rows
 
+def write_rooting_table(rows, out):
+    '''Writes rooting_table_row dicts to the stream `out` as tab-separated values'''
+    out.write('\t'.join(ROOTING_TABLE_COLUMNS) + '\n')
+    for row in rows:
+        v = [row[k] for k in ROOTING_TABLE_COLUMNS]
+        out.write('\t'.join(['' if i is None else str(i) for i in v]) + '\n')
+
+def _count_leaves_outside(xt, taxo_lca, t, t_last):
+    '''Number of leaves below each node of `xt` that are not in the taxon t'''
+    counts = [0] * len(xt.parent)
+    for v in range(len(counts) - 1, 0, -1):
+        if not xt.children[v]:
+            if not t <= taxo_lca[v] <= t_last:
+                counts[v] = 1
+        counts[xt.parent[v]] += counts[v]
+    return counts
+
+def _check_for_opt_score(entity, score, rooting, best, best_list):
+    disp, incompat = score
+    entity.rooting_here_disp_score = disp
+    entity.rooting_here_incompat_score = incompat
+    entity.rooting_here_score = score
+    if best is None or disp > best[0] or (disp == best[0] and incompat < best[1]):
+        del best_list[:]
+        best_list.append(rooting)
+        return score
+    if score == best:
+        best_list.append(rooting)
+    return best
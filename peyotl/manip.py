@@ -2,7 +2,7 @@
 '''Simple manipulations of data structure in peyotl
 '''
 from __future__ import absolute_import, print_function, division
-from peyotl.nexson_syntax.helper import _add_uniq_value_to_dict_bf
+from peyotl.nexson_syntax.helper import _add_uniq_value_to_dict_bf, _get_index_list_of_values
 from peyotl.nexson_syntax import BY_ID_HONEY_BADGERFISH, \
                                  convert_nexson_format, \
                                  detect_nexson_version, \
@@ -13,30 +13,37 @@ from peyotl.nexson_syntax import BY_ID_HONEY_BADGERFISH, \
 from peyotl.nexson_syntax.inspect import count_num_trees
 from peyotl.utility import get_logger
 _LOG = get_logger(__name__)
+def _iter_by_id_groups(nex, group_by_id_key, order_key):
+    group_by_id = nex.get(group_by_id_key, {})
+    group_order = nex.get(order_key, [])
+    if len(group_order) < len(group_by_id):
+        group_order = list(group_by_id.keys())
+        group_order.sort()
+    for group_id in group_order:
+        yield group_id, group_by_id[group_id]
+
 def iter_otus(nexson, nexson_version=None):
     '''generator over all otus in all otus group elements.
     yields a tuple of 3 items:
         otus group ID,
         otu ID,
         the otu obj
+    The blob is read in its own NexSON version (0.0, 1.0 or 1.2), so it is
+        not modified, and the otu objs are in the syntax of that version.
     '''
     if nexson_version is None:
         nexson_version = detect_nexson_version(nexson)
     nex = get_nexml_el(nexson)
-    if not _is_by_id_hbf(nexson_version):
-        convert_nexson_format(nexson_blob, BY_ID_HONEY_BADGERFISH) #TODO shouldn't modify...
-    otus_group_by_id = nex['otusById']
-    group_order = nex.get('^ot:otusElementOrder', [])
-    if len(group_order) < len(otus_group_by_id):
-        group_order = list(otus_group_by_id.keys())
-        group_order.sort()
-    for otus_group_id in group_order:
-        otus_group = otus_group_by_id[otus_group_id]
-        otu_by_id = otus_group['otuById']
-        ti_order = list(otu_by_id.keys())
-        for otu_id in ti_order:
-            otu = otu_by_id[otu_id]
-            yield otus_group_id, otu_id, otu
+    if _is_by_id_hbf(nexson_version):
+        for otus_group_id, otus_group in _iter_by_id_groups(nex, 'otusById', '^ot:otusElementOrder'):
+            otu_by_id = otus_group.get('otuById', {})
+            for otu_id, otu in otu_by_id.items():
+                yield otus_group_id, otu_id, otu
+    else:
+        for otus_group in _get_index_list_of_values(nex, 'otus'):
+            otus_group_id = otus_group['@id']
+            for otu in _get_index_list_of_values(otus_group, 'otu'):
+                yield otus_group_id, otu['@id'], otu
 
 def iter_trees(nexson, nexson_version=None):
     '''generator over all trees in all trees elements.
@@ -44,19 +51,15 @@ def iter_trees(nexson, nexson_version=None):
         trees element ID,
         tree ID,
         the tree obj
+    The blob is read in its own NexSON version (0.0, 1.0 or 1.2), so it is
+        not modified, and the tree objs are in the syntax of that version.
     '''
     if nexson_version is None:
         nexson_version = detect_nexson_version(nexson)
     nex = get_nexml_el(nexson)
     if _is_by_id_hbf(nexson_version):
-        trees_group_by_id = nex['treesById']
-        group_order = nex.get('^ot:treesElementOrder', [])
-        if len(group_order) < len(trees_group_by_id):
-            group_order = list(trees_group_by_id.keys())
-            group_order.sort()
-        for trees_group_id in group_order:
-            trees_group = trees_group_by_id[trees_group_id]
-            tree_by_id = trees_group['treeById']
+        for trees_group_id, trees_group in _iter_by_id_groups(nex, 'treesById', '^ot:treesElementOrder'):
+            tree_by_id = trees_group.get('treeById', {})
             ti_order = trees_group.get('^ot:treeElementOrder', [])
             if len(ti_order) < len(tree_by_id):
                 ti_order = list(tree_by_id.keys())
@@ -65,9 +68,9 @@ def iter_trees(nexson, nexson_version=None):
                 tree = tree_by_id[tree_id]
                 yield trees_group_id, tree_id, tree
     else:
-        for trees_group in nex.get('trees', []):
+        for trees_group in _get_index_list_of_values(nex, 'trees'):
             trees_group_id = trees_group['@id']
-            for tree in trees_group.get('tree', []):
+            for tree in _get_index_list_of_values(trees_group, 'tree'):
                 tree_id = tree['@id']
                 yield trees_group_id, tree_id, tree
 
@@ -15,10 +15,85 @@ from peyotl.nexson_syntax import BY_ID_HONEY_BADGERFISH, \
                                  detect_nexson_version, \
                                  get_nexml_el, \
                                  read_as_json
+from peyotl.phylo.compact_tree import CompactNode, CompactTree
+from peyotl.phylo.entities import MISSING_OTT_ID
 from peyotl.utility.str_util import is_str_type
 from peyotl.utility import get_logger
+from array import array
 import weakref
+try:
+    import numpy
+except ImportError:
+    numpy = None
 _LOG = get_logger(__name__)
+
+# the value of missing OTU indices in the columns of NexsonTreeColumns (missing
+#   OTT IDs are MISSING_OTT_ID)
+MISSING_INDEX = -1
+# OTT IDs are stored as 64-bit ints where the array module supports them
+#   ('l' is only 32 bits wide on some platforms)
+try:
+    array('q')
+    _OTT_ID_TYPECODE = 'q'
+except ValueError:
+    _OTT_ID_TYPECODE = 'l'
+
+def _array_as_numpy(a):
+    '''Returns a numpy array that shares the memory of the array.array `a`'''
+    if numpy is None:
+        raise ImportError('The "numpy" package is required for numpy columns')
+    return numpy.frombuffer(a, dtype='i{s:d}'.format(s=a.itemsize))
+
+class NexsonOTUColumns(object):
+    '''The OTUs of a study as parallel columns: otu_ids and original_labels
+    (lists) and ott_ids (an array with MISSING_OTT_ID for unmapped OTUs).
+    otu_index maps an OTU ID to its row.
+    '''
+    def __init__(self, nexml_el):
+        self.otu_ids = []
+        self.original_labels = []
+        self.ott_ids = array(_OTT_ID_TYPECODE)
+        self.otu_index = {}
+        ogd = nexml_el['otusById']
+        for og_id in nexml_el['^ot:otusElementOrder']:
+            for otu_id, otu in ogd[og_id]['otuById'].items():
+                self.otu_index[otu_id] = len(self.otu_ids)
+                self.otu_ids.append(otu_id)
+                self.original_labels.append(otu.get('^ot:originalLabel'))
+                ott_id = otu.get('^ot:ottId')
+                self.ott_ids.append(MISSING_OTT_ID if ott_id is None else ott_id)
+    def __len__(self):
+        return len(self.otu_ids)
+    def as_numpy(self):
+        '''Returns a dict of column name -> numpy array for the numeric columns (requires numpy)'''
+        return {'ott_ids': _array_as_numpy(self.ott_ids)}
+
+class NexsonTreeColumns(object):
+    '''The nodes of a tree (in preorder) as parallel columns: node_ids (a list)
+    and the arrays parent and first_child (node indices, -1 for none),
+    otu_index (the row of the node's OTU in the NexsonOTUColumns of the study,
+    or MISSING_INDEX) and ott_ids (MISSING_OTT_ID for nodes without an OTT ID).
+    '''
+    def __init__(self, view, otu_columns=None):
+        self.node_ids = view._labels
+        self.parent = view._parent
+        self.first_child = view._first_child
+        self.ott_ids = array(_OTT_ID_TYPECODE, [MISSING_OTT_ID if i is None else i for i in view._ott_ids])
+        if otu_columns is None:
+            self.otu_index = None
+        else:
+            oi = otu_columns.otu_index
+            self.otu_index = array('i', [MISSING_INDEX if i is None else oi[i] for i in view._otu_ids])
+    def __len__(self):
+        return len(self.node_ids)
+    def as_numpy(self):
+        '''Returns a dict of column name -> numpy array for the numeric columns (requires numpy)'''
+        d = {'parent': _array_as_numpy(self.parent),
+             'first_child': _array_as_numpy(self.first_child),
+             'ott_ids': _array_as_numpy(self.ott_ids)}
+        if self.otu_index is not None:
+            d['otu_index'] = _array_as_numpy(self.otu_index)
+        return d
 def otu_iter_nexson_proxy(nexson_proxy, otu_sort=None):
     '''otu_sort can be None (not sorted or stable), True (sorted by ID lexigraphically)
     or a key function for a sort function on list of otuIDs
@@ -31,9 +106,9 @@ def otu_iter_nexson_proxy(nexson_proxy, otu_sort=None):
     og_order = nexml_el['^ot:otusElementOrder']
     ogd = nexml_el['otusById']
     for og_id in og_order:
-        og = ogd[og_id]
+        og = ogd[og_id]['otuById']
         if otu_sort is None:
-            for k, v in og:
+            for k, v in og.items():
                 yield nexson_proxy._create_otu_proxy(k, v)
         else:
             key_list = list(og.keys())
@@ -109,6 +184,21 @@ class NexsonProxy(object):
         self._otu_cache = {}
         self._tree_cache = {}
         self._wr = None
+        self._otu_columns = None
+    def otu_columns(self):
+        '''Returns the NexsonOTUColumns of the study (built on the first call)'''
+        if self._otu_columns is None:
+            self._otu_columns = NexsonOTUColumns(self._nexml_el)
+        return self._otu_columns
+    def tree_columns(self, tree_id):
+        '''Returns the NexsonTreeColumns of a tree (built on the first call), or None
+        if there is no tree with the ID `tree_id`. The otu_index column refers to
+        the rows of otu_columns().
+        '''
+        tree = self.get_tree(tree_id)
+        if tree is None:
+            return None
+        return tree.columns()
     def otu_iter(self):
         return iter(otu_iter_nexson_proxy(self))
     def tree_iter(self):
@@ -233,6 +323,8 @@ class NexsonTreeProxy(object):
         self._edge_by_target = None
         self._wr = None
         self._node_cache = {}
+        self._compact_view = None
+        self._columns = None
     def get_nexson_node(self, node_id):
         return self._node_by_source_id[node_id]
     def get_node(self, node_id):
@@ -288,6 +380,112 @@ class NexsonTreeProxy(object):
         return iter(nexson_tree_preorder_iter(self))
     def nodes(self):
         return [i for i in iter(self)]
+    def compact_view(self):
+        '''Returns a NexsonTreeView of this tree (built on the first call)'''
+        if self._compact_view is None:
+            self._compact_view = NexsonTreeView(self._nexson_tree, self._otus, tree_id=self._tree_id)
+        return self._compact_view
+    def columns(self):
+        '''Returns the NexsonTreeColumns of this tree (built on the first call).
+        The otu_index column is only filled if the tree belongs to a NexsonProxy.
+        '''
+        if self._columns is None:
+            otu_columns = None if self._nexson_proxy is None else self._nexson_proxy.otu_columns()
+            self._columns = NexsonTreeColumns(self.compact_view(), otu_columns)
+        return self._columns
+
+class NexsonNodeHandle(CompactNode):
+    '''View of node `index` of a NexsonTreeView. Handles are created on each
+    access and hold no more than the view and the index.
+    '''
+    __slots__ = ()
+    @property
+    def node_id(self):
+        return self._tree._labels[self._index]
+    @property
+    def edge_id(self):
+        return self._tree._edge_ids[self._index]
+    @property
+    def otu_id(self):
+        return self._tree._otu_ids[self._index]
+    @property
+    def ott_id(self):
+        return self._tree._ott_ids[self._index]
+    @property
+    def node(self):
+        return self._tree.get_nexson_node(self._index)
+    @property
+    def edge(self):
+        return self._tree.get_nexson_edge(self._index)
+    @property
+    def otu(self):
+        '''The NexSON otu of the node (or None)'''
+        otu_id = self._tree._otu_ids[self._index]
+        return None if otu_id is None else self._tree._otus[otu_id]
+    def get(self, key, default=None):
+        return self.node.get(key, default)
+    def __getitem__(self, key):
+        return self.node[key]
+    def keys(self):
+        return self.node.keys()
+
+class NexsonTreeView(CompactTree):
+    '''A read-only view of a NexSON 1.2 tree with the nodes numbered in preorder.
+    The parent, first child and next sib of each node, and its node, edge, otu
+    and OTT IDs are stored in arrays that are built once, so iterating over the
+    tree (which yields NexsonNodeHandle objects) does not allocate anything
+    that outlives the iteration. `otus` is the otuById dict of the tree's otus.
+    '''
+    _node_class = NexsonNodeHandle
+    def __init__(self, tree, otus, tree_id=None):
+        CompactTree.__init__(self)
+        self._nexson_tree = tree
+        self._otus = otus
+        self._tree_id = tree_id
+        self._edge_ids = []
+        self._otu_ids = []
+        self._ott_ids = []
+        first_child, next_sib = self._first_child, self._next_sib
+        last_child = array('i')
+        ebsid = tree['edgeBySourceId']
+        nbid = tree['nodeById']
+        stack = [(tree['^ot:rootNodeId'], None, -1)]
+        while stack:
+            node_id, edge_id, par = stack.pop()
+            i = self._new_node(par, node_id)
+            last_child.append(-1)
+            if par >= 0:
+                prev = last_child[par]
+                if prev < 0:
+                    first_child[par] = i
+                else:
+                    next_sib[prev] = i
+                last_child[par] = i
+            self._edge_ids.append(edge_id)
+            otu_id = nbid[node_id].get('@otu')
+            self._otu_ids.append(otu_id)
+            self._ott_ids.append(None if otu_id is None else otus[otu_id].get('^ot:ottId'))
+            daughter_edges = ebsid.get(node_id)
+            if daughter_edges:
+                for e_id, edge in reversed(list(daughter_edges.items())):
+                    stack.append((edge['@target'], e_id, i))
+    @property
+    def tree_id(self):
+        return self._tree_id
+    def get_node(self, node_id):
+        return self.find_node(node_id)
+    def get_nexson_node(self, index):
+        return self._nexson_tree['nodeById'][self._labels[index]]
+    def get_nexson_edge(self, index):
+        p = self._parent[index]
+        if p < 0:
+            return None
+        return self._nexson_tree['edgeBySourceId'][self._labels[p]][self._edge_ids[index]]
+    def edge_info(self, index):
+        '''The "@length" of the edge of the node (or None)'''
+        edge = self.get_nexson_edge(index)
+        return None if edge is None else edge.get('@length')
+
 def nexson_child_iter(edict, nexson_tree_proxy):
     for edge_id, edge in edict.items():
         yield nexson_tree_proxy._create_node_proxy_from_edge(edge_id, edge)
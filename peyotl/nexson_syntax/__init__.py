@@ -37,6 +37,7 @@ from peyotl.nexson_syntax.direct2badgerfish_nexson import Direct2BadgerfishNexso
 from peyotl.nexson_syntax.nexson2nexml import Nexson2Nexml
 from peyotl.nexson_syntax.nexml2nexson import Nexml2Nexson
 from peyotl.nexson_syntax.inspect import count_num_trees
+from peyotl.nexson_syntax.fragment_index import NexsonFragmentIndex
 from peyotl.utility import get_logger
 import xml.dom.minidom
 import codecs
@@ -387,7 +388,28 @@ class PhyloSchema(object):
 
     def serialize(self, src, output_dest=None, src_schema=None):
         return self.convert(src, serialize=True, output_dest=output_dest, src_schema=src_schema)
+    def _can_use_fragment_index(self, fragment_index):
+        '''Returns True if the requested content can be read from a NexsonFragmentIndex
+        without parsing the whole study.
+        '''
+        if not fragment_index.supports_fragments:
+            return False
+        if self.format_code == PhyloSchema.NEXSON:
+            if self.content == 'tree':
+                return not self.cull_nonmatching
+            return self.content in ('otus', 'otu', 'meta')
+        return self.content in ('tree', 'subtree') and (self.content_id is not None)
     def convert(self, src, serialize=None, output_dest=None, src_schema=None):
+        '''`src` is usually a NexSON blob, but it can also be a NexsonFragmentIndex
+        in which case tree, subtree, otus, otu and meta content is read from the
+        study file without parsing the rest of the study.
+        '''
+        fragment_index = None
+        if isinstance(src, NexsonFragmentIndex):
+            if self._can_use_fragment_index(src):
+                fragment_index = src
+            else:
+                src = src.read_study()
         if src_schema is None:
             src_format = PhyloSchema.NEXSON
             current_format = None
@@ -419,17 +441,29 @@ class PhyloSchema(object):
                                               sort_arbitrary=False)
 
                 else:
-                    i_t_o_list = extract_tree_nexson(d, self.content_id, current_format)
+                    if fragment_index is not None:
+                        i_t_o_list = fragment_index.read_tree_nexson(self.content_id)
+                    else:
+                        i_t_o_list = extract_tree_nexson(d, self.content_id, current_format)
                     d = {}
                     for ito_tup in i_t_o_list:
                         i, t = ito_tup[0], ito_tup[1]
                         d[i] = t
             elif self.content == 'meta':
-                strip_to_meta_only(d, current_format)
+                if fragment_index is not None:
+                    d = fragment_index.read_meta_nexson()
+                else:
+                    strip_to_meta_only(d, current_format)
             elif self.content == 'otus':
-                d = extract_otus_nexson(d, self.content_id, current_format)
+                if fragment_index is not None:
+                    d = fragment_index.read_otus_nexson(self.content_id)
+                else:
+                    d = extract_otus_nexson(d, self.content_id, current_format)
             elif self.content == 'otu':
-                d = extract_otu_nexson(d, self.content_id, current_format)
+                if fragment_index is not None:
+                    d = fragment_index.read_otu_nexson(self.content_id)
+                else:
+                    d = extract_otu_nexson(d, self.content_id, current_format)
             elif self.content == 'otumap':
                 if self.content_id is None:
                     r = extract_otu_nexson(d, None, current_format)
@@ -481,7 +515,16 @@ class PhyloSchema(object):
                     ci, subtree_id = self.content_id, None
             else:
                 ci, subtree_id = None, None
-            response = extract_tree(src, ci, self, subtree_id=subtree_id)
+            if fragment_index is not None:
+                i_t_o_list = fragment_index.read_tree_nexson(ci)
+            else:
+                i_t_o_list = extract_tree_nexson(src, ci, None)
+            if output_dest and self.format_code == PhyloSchema.NEXUS:
+                # stream the trees rather than building the whole document in memory
+                write_trees_as_nexus(i_t_o_list, self, output_dest, subtree_id=subtree_id)
+                output_dest.write('\n')
+                return None
+            response = _convert_tree_list(i_t_o_list, self, subtree_id=subtree_id)
             # these formats are always serialized...
             if output_dest:
                 output_dest.write(response)
@@ -778,9 +821,8 @@ def quote_newick_name(s, needs_quotes_pattern=_NEWICK_NEEDING_QUOTING):
         return u"'{}'".format(s)
     return s
 
-def _write_newick_leaf_label(out, node, otu_group, label_key, leaf_labels, unlabeled_counter, needs_quotes_pattern):
-    '''`leaf_labels` is a (list, dict) pair where the list is the order encountered,
-    and the dict maps name to index in the list
+def _newick_leaf_label(node, otu_group, label_key, unlabeled_counter, needs_quotes_pattern):
+    '''Returns a (label, unlabeled_counter) pair for the leaf `node`
     '''
     otu_id = node['@otu']
     otu = otu_group[otu_id]
@@ -792,123 +834,204 @@ def _write_newick_leaf_label(out, node, otu_group, label_key, leaf_labels, unlab
         label = label.format(n=unlabeled_counter, o=o)
     else:
         label = quote_newick_name(label, needs_quotes_pattern)
-    if leaf_labels is not None:
-        if label not in leaf_labels[1]:
-            leaf_labels[1][label] = len(leaf_labels[0])
-            leaf_labels[0].append(label)
-    out.write(label)
-    return unlabeled_counter
-
-def _write_newick_internal_label(out, node, otu_group, label_key, needs_quotes_pattern):
+    return label, unlabeled_counter
+
+def _newick_internal_label(node, otu_group, label_key, needs_quotes_pattern):
     otu_id = node.get('@otu')
     if otu_id is None:
-        return
+        return None
     otu = otu_group[otu_id]
     label = otu.get(label_key)
     if label is not None:
         label = quote_newick_name(label, needs_quotes_pattern)
-        out.write(label)
+    return label
 
-def _write_newick_edge_len(out, edge):
-    if edge is None:
+def _add_leaf_labels(leaf_labels, label_list):
+    '''`leaf_labels` is a (list, dict) pair where the list is the order encountered,
+    and the dict maps name to index in the list
+    '''
+    if leaf_labels is None:
         return
-    e_len = edge.get('@length')
-    if e_len is not None:
-        out.write(':{e}'.format(e=e_len))
+    ll, ld = leaf_labels
+    for label in label_list:
+        if label not in ld:
+            ld[label] = len(ll)
+            ll.append(label)
 
-def convert_tree_to_newick(tree,
-                           otu_group,
-                           label_key,
-                           leaf_labels,
-                           needs_quotes_pattern,
-                           subtree_id=None,
-                           bracket_ingroup=False):
-    assert label_key in PhyloSchema._NEWICK_PROP_VALS #pylint: disable=W0212
-    unlabeled_counter = 0
+def _sorted_child_edges(outgoing_edges):
+    '''Returns the (edge_id, edge) pairs of `outgoing_edges` sorted by edge ID.
+    Sorting produces a consistent rotation of the tree.
+    '''
+    te = list(outgoing_edges.items())
+    te.sort()
+    return te
+
+def _newick_root_id(tree, subtree_id):
+    '''Returns the (root_id, ingroup_node_id) pair for a newick export of `tree`.
+    ingroup_node_id is None when the ingroup itself is being exported.
+    '''
     ingroup_node_id = tree.get('^ot:inGroupClade')
     if subtree_id:
         if subtree_id == 'ingroup':
-            root_id = ingroup_node_id
-            ingroup_node_id = None # turns of the comment pre-ingroup-marker
+            return ingroup_node_id, None # turns of the comment pre-ingroup-marker
+        return subtree_id, ingroup_node_id
+    return tree['^ot:rootNodeId'], ingroup_node_id
+
+def _newick_leaf_labels(tree, otu_group, label_key, needs_quotes_pattern, subtree_id=None):
+    '''Returns the list of leaf labels in the order in which convert_tree_to_newick
+    emits them (or None if the root of the requested tree is not found) without
+    rendering the newick string.
+    '''
+    root_id = _newick_root_id(tree, subtree_id)[0]
+    edges = tree['edgeBySourceId']
+    if root_id not in edges:
+        return None
+    nodes = tree['nodeById']
+    tip_labels = []
+    unlabeled_counter = 0
+    stack = [root_id]
+    while stack:
+        node_id = stack.pop()
+        outgoing_edges = edges.get(node_id)
+        if outgoing_edges is None:
+            label, unlabeled_counter = _newick_leaf_label(nodes[node_id],
+                                                          otu_group,
+                                                          label_key,
+                                                          unlabeled_counter,
+                                                          needs_quotes_pattern)
+            tip_labels.append(label)
         else:
-            root_id = subtree_id
-    else:
-        root_id = tree['^ot:rootNodeId']
+            te = _sorted_child_edges(outgoing_edges)
+            te.reverse()
+            stack.extend([e['@target'] for i, e in te])
+    return tip_labels
+
+def _newick_text(tree,
+                 otu_group,
+                 label_key,
+                 needs_quotes_pattern,
+                 subtree_id=None,
+                 bracket_ingroup=False,
+                 tree_id=None,
+                 newick_cache=None):
+    '''Returns a (newick, leaf label list) pair for `tree` or None if the
+    root of the requested tree is not found. The newick is a unicode string.
+    See convert_tree_to_newick for the semantics of `newick_cache`.
+    '''
+    assert label_key in PhyloSchema._NEWICK_PROP_VALS #pylint: disable=W0212
+    cache_key = None
+    if (newick_cache is not None) and (tree_id is not None):
+        cache_key = (tree_id, label_key, subtree_id, bool(bracket_ingroup), needs_quotes_pattern.pattern)
+        cached = newick_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    root_id, ingroup_node_id = _newick_root_id(tree, subtree_id)
     edges = tree['edgeBySourceId']
     if root_id not in edges:
         return None
+    if not bracket_ingroup:
+        ingroup_node_id = None
     nodes = tree['nodeById']
-    curr_node_id = root_id
-    curr_edge = None
-    curr_sib_list = []
-    curr_stack = []
-    sio, out = get_utf_8_string_io_writer()
-    going_tipward = True
-    while True:
-        if going_tipward:
-            outgoing_edges = edges.get(curr_node_id)
+    unlabeled_counter = 0
+    tokens = []
+    tip_labels = []
+    # each stack frame is [incoming edge, node_id, sorted child edges, index of the next child]
+    stack = [[None, root_id, _sorted_child_edges(edges[root_id]), 0]]
+    if ingroup_node_id == root_id:
+        tokens.append('[pre-ingroup-marker]')
+    tokens.append('(')
+    while stack:
+        frame = stack[-1]
+        children, child_index = frame[2], frame[3]
+        if child_index < len(children):
+            if child_index > 0:
+                tokens.append(',')
+            frame[3] = child_index + 1
+            edge = children[child_index][1]
+            node_id = edge['@target']
+            outgoing_edges = edges.get(node_id)
             if outgoing_edges is None:
-                curr_node = nodes[curr_node_id]
-                unlabeled_counter = _write_newick_leaf_label(out,
-                                                             curr_node,
-                                                             otu_group,
-                                                             label_key,
-                                                             leaf_labels,
-                                                             unlabeled_counter,
-                                                             needs_quotes_pattern)
-                _write_newick_edge_len(out, curr_edge)
-                going_tipward = False
+                label, unlabeled_counter = _newick_leaf_label(nodes[node_id],
+                                                              otu_group,
+                                                              label_key,
+                                                              unlabeled_counter,
+                                                              needs_quotes_pattern)
+                tokens.append(label)
+                tip_labels.append(label)
+                e_len = edge.get('@length')
+                if e_len is not None:
+                    tokens.append(':{e}'.format(e=e_len))
             else:
-                te = [(i, e) for i, e in outgoing_edges.items()]
-                te.sort() # produce a consistent rotation... Necessary?
-                if bracket_ingroup and (ingroup_node_id == curr_node_id):
-                    out.write('[pre-ingroup-marker]')
-                out.write('(')
-                next_p = te.pop(0)
-                curr_stack.append((curr_edge, curr_node_id, curr_sib_list))
-                curr_edge, curr_sib_list = next_p[1], te
-                curr_node_id = curr_edge['@target']
-        if not going_tipward:
-            next_up_edge_id = None
-            while True:
-                if curr_sib_list:
-                    out.write(',')
-                    next_up_edge_id, next_up_edge = curr_sib_list.pop(0)
-                    break
-                if curr_stack:
-                    curr_edge, curr_node_id, curr_sib_list = curr_stack.pop(-1)
-                    curr_node = nodes[curr_node_id]
-                    out.write(')')
-                    _write_newick_internal_label(out,
-                                                 curr_node,
-                                                 otu_group,
-                                                 label_key,
-                                                 needs_quotes_pattern)
-                    _write_newick_edge_len(out, curr_edge)
-                    if bracket_ingroup and (ingroup_node_id == curr_node_id):
-                        out.write('[post-ingroup-marker]')
-                else:
-                    break
-            if next_up_edge_id is None:
-                break
-            curr_edge = next_up_edge
-            curr_node_id = curr_edge['@target']
-            going_tipward = True
-    out.write(';')
+                if ingroup_node_id == node_id:
+                    tokens.append('[pre-ingroup-marker]')
+                tokens.append('(')
+                stack.append([edge, node_id, _sorted_child_edges(outgoing_edges), 0])
+        else:
+            stack.pop()
+            edge, node_id = frame[0], frame[1]
+            tokens.append(')')
+            label = _newick_internal_label(nodes[node_id], otu_group, label_key, needs_quotes_pattern)
+            if label is not None:
+                tokens.append(label)
+            if edge is not None:
+                e_len = edge.get('@length')
+                if e_len is not None:
+                    tokens.append(':{e}'.format(e=e_len))
+            if ingroup_node_id == node_id:
+                tokens.append('[post-ingroup-marker]')
+    tokens.append(';')
+    r = (u''.join(tokens), tip_labels)
+    if cache_key is not None:
+        newick_cache[cache_key] = r
+    return r
+
+def convert_tree_to_newick(tree,
+                           otu_group,
+                           label_key,
+                           leaf_labels,
+                           needs_quotes_pattern,
+                           subtree_id=None,
+                           bracket_ingroup=False,
+                           tree_id=None,
+                           newick_cache=None):
+    '''Returns the newick string for `tree` (or the subtree rooted at `subtree_id`)
+    or None if the root of the requested tree is not found.
+
+    If `newick_cache` is a dict and `tree_id` is not None, the rendered newick (and the
+        leaf labels needed by the NEXUS taxa block) are stored in `newick_cache` keyed
+        by tree_id, label_key, and subtree_id. So the cache must only be reused while
+        the trees that it describes are unchanged.
+    '''
+    r = _newick_text(tree,
+                     otu_group,
+                     label_key,
+                     needs_quotes_pattern,
+                     subtree_id=subtree_id,
+                     bracket_ingroup=bracket_ingroup,
+                     tree_id=tree_id,
+                     newick_cache=newick_cache)
+    if r is None:
+        return None
+    newick, tip_labels = r
+    _add_leaf_labels(leaf_labels, tip_labels)
+    sio, out = get_utf_8_string_io_writer()
+    out.write(newick)
     flush_utf_8_writer(out)
     return sio.getvalue()
 
-def _write_nexus_format(quoted_leaf_labels, tree_name_newick_list):
-    if not tree_name_newick_list:
-        return ''
-    f, wrapper = get_utf_8_string_io_writer()
-    wrapper.write('''#NEXUS
+_NEXUS_HEADER = u'''#NEXUS
 BEGIN TAXA;
     Dimensions NTax = {s};
     TaxLabels {l} ;
 END;
 BEGIN TREES;
-'''.format(s=len(quoted_leaf_labels), l=' '.join(quoted_leaf_labels)))
+'''
+
+def _write_nexus_format(quoted_leaf_labels, tree_name_newick_list):
+    if not tree_name_newick_list:
+        return ''
+    f, wrapper = get_utf_8_string_io_writer()
+    wrapper.write(_NEXUS_HEADER.format(s=len(quoted_leaf_labels), l=' '.join(quoted_leaf_labels)))
     for name, newick in tree_name_newick_list:
         wrapper.write('    Tree ')
         wrapper.write(name)
@@ -918,7 +1041,55 @@ BEGIN TREES;
     flush_utf_8_writer(wrapper)
     return f.getvalue()
 
-def convert_tree(tree_id, tree, otu_group, schema, subtree_id=None):
+def write_trees_as_nexus(tid_tree_otus_list, schema, output_dest, subtree_id=None, newick_cache=None):
+    '''Writes a NEXUS document holding the trees in `tid_tree_otus_list` (a list of
+    (tree_id, tree, otus group) tuples as returned by extract_tree_nexson) to the
+    `output_dest` stream, which must accept unicode.
+
+    The taxa block is gathered by a first pass over the leaves of each tree. Then each
+    tree's newick is rendered and written to `output_dest` before the next tree is
+    visited, so only one newick string is held in memory at a time.
+    Nothing is written if none of the trees could be converted.
+    Returns the number of trees written.
+    '''
+    label_key = schema.otu_label_prop
+    needs_quotes_pattern = _NEXUS_NEEDING_QUOTING
+    bracket_ingroup = schema.bracket_ingroup
+    leaf_labels = ([], {})
+    convertible = []
+    for tree_id, tree, otu_group in tid_tree_otus_list:
+        cached = None
+        if newick_cache is not None:
+            cache_key = (tree_id, label_key, subtree_id, bool(bracket_ingroup), needs_quotes_pattern.pattern)
+            cached = newick_cache.get(cache_key)
+        if cached is not None:
+            tip_labels = cached[1]
+        else:
+            tip_labels = _newick_leaf_labels(tree, otu_group, label_key, needs_quotes_pattern, subtree_id=subtree_id)
+        if tip_labels is not None:
+            _add_leaf_labels(leaf_labels, tip_labels)
+            convertible.append((tree_id, tree, otu_group))
+    if not convertible:
+        return 0
+    quoted_leaf_labels = leaf_labels[0]
+    output_dest.write(_NEXUS_HEADER.format(s=len(quoted_leaf_labels), l=' '.join(quoted_leaf_labels)))
+    for tree_id, tree, otu_group in convertible:
+        newick = _newick_text(tree,
+                              otu_group,
+                              label_key,
+                              needs_quotes_pattern,
+                              subtree_id=subtree_id,
+                              bracket_ingroup=bracket_ingroup,
+                              tree_id=tree_id,
+                              newick_cache=newick_cache)[0]
+        output_dest.write('    Tree ')
+        output_dest.write(quote_newick_name(tree_id, needs_quotes_pattern))
+        output_dest.write(' = ')
+        output_dest.write(newick)
+    output_dest.write('\nEND;\n')
+    return len(convertible)
+
+def convert_tree(tree_id, tree, otu_group, schema, subtree_id=None, newick_cache=None):
     label_key = schema.otu_label_prop
     if schema.format_str == 'nexus':
         leaf_labels = ([], {})
@@ -933,31 +1104,25 @@ def convert_tree(tree_id, tree, otu_group, schema, subtree_id=None):
                                     leaf_labels,
                                     needs_quotes_pattern,
                                     subtree_id=subtree_id,
-                                    bracket_ingroup=schema.bracket_ingroup)
+                                    bracket_ingroup=schema.bracket_ingroup,
+                                    tree_id=tree_id,
+                                    newick_cache=newick_cache)
     if schema.format_str == 'nexus':
         tl = [(quote_newick_name(tree_id, needs_quotes_pattern), newick)]
         return _write_nexus_format(leaf_labels[0], tl)
     else:
         return newick
 
-def convert_trees(tid_tree_otus_list, schema, subtree_id=None):
-    label_key = schema.otu_label_prop
+def convert_trees(tid_tree_otus_list, schema, subtree_id=None, newick_cache=None):
     if schema.format_str == 'nexus':
-        leaf_labels = ([], {})
-        needs_quotes_pattern = _NEXUS_NEEDING_QUOTING
-        conv_tree_list = []
-        for tree_id, tree, otu_group in tid_tree_otus_list:
-            newick = convert_tree_to_newick(tree,
-                                            otu_group,
-                                            label_key,
-                                            leaf_labels,
-                                            needs_quotes_pattern,
-                                            subtree_id=subtree_id,
-                                            bracket_ingroup=schema.bracket_ingroup)
-            if newick:
-                t = (quote_newick_name(tree_id, needs_quotes_pattern), newick)
-                conv_tree_list.append(t)
-        return _write_nexus_format(leaf_labels[0], conv_tree_list)
+        f, wrapper = get_utf_8_string_io_writer()
+        write_trees_as_nexus(tid_tree_otus_list,
+                             schema,
+                             wrapper,
+                             subtree_id=subtree_id,
+                             newick_cache=newick_cache)
+        flush_utf_8_writer(wrapper)
+        return f.getvalue()
     else:
         raise NotImplementedError('convert_tree for {}'.format(schema.format_str))
 def nexml_el_of_by_id(nexson, curr_version=None):
@@ -1050,19 +1215,29 @@ def extract_tree_nexson(nexson, tree_id, curr_version=None):
                     return tree_obj_otus_group_list
     return tree_obj_otus_group_list
 
-def extract_tree(nexson, tree_id, schema, subtree_id=None):
+def extract_tree(nexson, tree_id, schema, subtree_id=None, newick_cache=None):
+    '''Returns the newick or NEXUS string for the tree `tree_id` (or all trees if `tree_id` is None).
+    See convert_tree_to_newick for the semantics of `newick_cache`.
+    '''
+    i_t_o_list = extract_tree_nexson(nexson, tree_id, None)
+    return _convert_tree_list(i_t_o_list, schema, subtree_id=subtree_id, newick_cache=newick_cache)
+
+def _convert_tree_list(i_t_o_list, schema, subtree_id=None, newick_cache=None):
+    '''Returns the newick or NEXUS string for a list of (id, tree, otus_group)
+    tuples (as returned by extract_tree_nexson).
+    '''
     try:
         assert schema.format_str in ['newick', 'nexus']
     except:
         m = 'Only newick tree export with tip labeling as one of "{}" is currently supported'
         m = m.format('", "'.join(PhyloSchema._NEWICK_PROP_VALS))
         raise ValueError(m)
-    i_t_o_list = extract_tree_nexson(nexson, tree_id, None)
     if schema.format_str == 'newick':
-        tree_str_list = [convert_tree(i, t, o, schema, subtree_id=subtree_id) for i, t, o in i_t_o_list]
+        tree_str_list = [convert_tree(i, t, o, schema, subtree_id=subtree_id, newick_cache=newick_cache)
+                         for i, t, o in i_t_o_list]
         tree_str_list = [i for i in tree_str_list if i is not None]
         return '\n'.join(tree_str_list)
-    return convert_trees(i_t_o_list, schema, subtree_id=subtree_id)
+    return convert_trees(i_t_o_list, schema, subtree_id=subtree_id, newick_cache=newick_cache)
 
 _DEF_MESSAGES_OBJ = {"message": tuple()}
 def _get_supporting_file_messages_for_this_obj(o):
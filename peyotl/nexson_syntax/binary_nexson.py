@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+'''Compact binary (MessagePack) serialization of NexSON.
+
+The NexSON dict (typically by-ID, v1.2) is written as two consecutive
+MessagePack objects: a header array
+    [BINARY_NEXSON_TAG, BINARY_NEXSON_FORMAT, document keys]
+followed by the payload, which is the NexSON with every key of every
+object replaced by an integer.
+Integers below len(NEXSON_KEY_TABLE) refer to the static table of
+well-known NexSON keys ("@otu", "^ot:ottId", "nodeById"...), larger
+integers index the "document keys" list (node, edge, otu IDs and any other
+keys that are not in the static table). So each key string is stored at
+most once per document.
+
+Reading returns the same dict as decoding the JSON form of the study, so
+the result can be passed to convert_nexson_format, validated etc.
+This form is intended for on-disk caches and for transferring studies
+between services; the JSON in the phylesystem repos remains the canonical
+form.
+
+Requires the msgpack package (an optional dependency of peyotl).
+'''
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+BINARY_NEXSON_TAG = 'nexson-msgpack'
+# Bumped whenever NEXSON_KEY_TABLE or the layout changes. Keys should only
+#   ever be appended to the table.
+BINARY_NEXSON_FORMAT = 1
+NEXSON_KEY_TABLE = ('$',
+                    '@about',
+                    '@datatype',
+                    '@generator',
+                    '@href',
+                    '@id',
+                    '@label',
+                    '@length',
+                    '@nexml2json',
+                    '@nexmljson',
+                    '@otu',
+                    '@otus',
+                    '@property',
+                    '@rel',
+                    '@root',
+                    '@source',
+                    '@target',
+                    '@version',
+                    '@xmlns',
+                    '@xsi:type',
+                    '^ot:agents',
+                    '^ot:annotationEvents',
+                    '^ot:branchLengthDescription',
+                    '^ot:branchLengthMode',
+                    '^ot:branchLengthTimeUnit',
+                    '^ot:candidateTreeForSynthesis',
+                    '^ot:comment',
+                    '^ot:curatedType',
+                    '^ot:curatorName',
+                    '^ot:dataDeposit',
+                    '^ot:focalClade',
+                    '^ot:focalCladeOTTTaxonName',
+                    '^ot:inGroupClade',
+                    '^ot:isLeaf',
+                    '^ot:messages',
+                    '^ot:notIntendedForSynthesis',
+                    '^ot:originalLabel',
+                    '^ot:otusElementOrder',
+                    '^ot:ottId',
+                    '^ot:ottTaxonName',
+                    '^ot:rootNodeId',
+                    '^ot:specifiedRoot',
+                    '^ot:studyId',
+                    '^ot:studyPublication',
+                    '^ot:studyPublicationReference',
+                    '^ot:studyYear',
+                    '^ot:tag',
+                    '^ot:tipLabel',
+                    '^ot:treeElementOrder',
+                    '^ot:treesElementOrder',
+                    '^ot:unrootedTree',
+                    '^xsi:type',
+                    'edgeBySourceId',
+                    'meta',
+                    'nexml',
+                    'nodeById',
+                    'otuById',
+                    'otusById',
+                    'treeById',
+                    'treesById', )
+_KEY_TO_CODE = dict([(k, i) for i, k in enumerate(NEXSON_KEY_TABLE)])
+
+def _require_msgpack():
+    if msgpack is None:
+        raise ImportError('The "msgpack" package is required for binary NexSON serialization')
+
+def _encode_keys(obj, codes, doc_keys):
+    '''Returns a copy of the JSON-like `obj` in which each key is replaced by its
+    code in `codes`. Unseen keys are appended to `doc_keys` and given the next code.
+    '''
+    if isinstance(obj, dict):
+        r = {}
+        for k, v in obj.items():
+            c = codes.get(k)
+            if c is None:
+                c = len(codes)
+                codes[k] = c
+                doc_keys.append(k)
+            r[c] = _encode_keys(v, codes, doc_keys)
+        return r
+    if isinstance(obj, list):
+        return [_encode_keys(i, codes, doc_keys) for i in obj]
+    return obj
+
+def _unpack_payload(data, key_table):
+    def _decode_obj(pairs):
+        return {key_table[k]: v for k, v in pairs}
+    if msgpack.version < (1, 0, 0):
+        # msgpack < 1.0 has no strict_map_key argument (and accepts integer keys)
+        return msgpack.unpackb(data, raw=False, object_pairs_hook=_decode_obj)
+    return msgpack.unpackb(data, raw=False, strict_map_key=False, object_pairs_hook=_decode_obj)
+
+def dumps_binary_nexson(blob):
+    '''Returns the bytes of the binary serialization of the NexSON dict `blob`.'''
+    _require_msgpack()
+    doc_keys = []
+    payload = _encode_keys(blob, dict(_KEY_TO_CODE), doc_keys)
+    # The header is a separate msgpack object so that the key table is known
+    #   before the payload is decoded. use_bin_type=False so that python 2
+    #   str and unicode objects are both read back as text.
+    header = msgpack.packb([BINARY_NEXSON_TAG, BINARY_NEXSON_FORMAT, doc_keys], use_bin_type=False)
+    return header + msgpack.packb(payload, use_bin_type=False)
+
+def loads_binary_nexson(data):
+    '''Decodes bytes written by dumps_binary_nexson and returns the NexSON dict.
+    Raises ValueError if `data` is not binary NexSON of the supported format.
+    '''
+    _require_msgpack()
+    unpacker = msgpack.Unpacker(raw=False)
+    unpacker.feed(data)
+    try:
+        header = unpacker.unpack()
+    except Exception:
+        raise ValueError('Not binary NexSON')
+    if not isinstance(header, list) or len(header) != 3 or header[0] != BINARY_NEXSON_TAG:
+        raise ValueError('Not binary NexSON')
+    if header[1] != BINARY_NEXSON_FORMAT:
+        raise ValueError('Binary NexSON format {} is not supported'.format(header[1]))
+    key_table = list(NEXSON_KEY_TABLE)
+    key_table.extend(header[2])
+    return _unpack_payload(data[unpacker.tell():], key_table)
+
+def write_binary_nexson(blob, filepath):
+    '''Writes the binary serialization of `blob` to `filepath`'''
+    data = dumps_binary_nexson(blob)
+    with open(filepath, 'wb') as fo:
+        fo.write(data)
+
+def read_binary_nexson(filepath):
+    '''Returns the NexSON dict stored in the binary NexSON file `filepath`'''
+    with open(filepath, 'rb') as fo:
+        return loads_binary_nexson(fo.read())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+'''Byte-offset index of the fragments (trees, otus groups and otus) of a
+by-ID (v1.2) NexSON study file.
+
+Building the index scans the raw bytes of the file once without decoding
+the JSON. Requests for a tree, an otus group, an otu or the study
+metadata then only read and parse the bytes of the fragments that they need.
+The index can be persisted to a "sidecar" file so that it is only rebuilt
+when the study file changes (as judged by its size and modification time).
+'''
+from peyotl.nexson_syntax.helper import detect_nexson_version, \
+                                        get_nexml_el, \
+                                        _is_by_id_hbf
+from peyotl.utility.input_output import read_as_json, write_as_json
+from peyotl.utility.json_backend import json_loads
+from peyotl.utility import get_logger
+import json
+import os
+import re
+_LOG = get_logger(__name__)
+
+# Bumped whenever the layout of the persisted index changes
+FRAGMENT_INDEX_FORMAT = 1
+
+# Matches a JSON string (with an optional ":" suffix which marks it as a key)
+#   or an opening/closing bracket. Numbers, true/false/null and
+#   separators are skipped, because they never change the nesting.
+_JSON_STRUCTURE_PAT = re.compile(br'"[^"\\]*(?:\\.[^"\\]*)*"(\s*:)?|[\[\]{}]')
+_NEXML_KEY = b'"nexml"'
+_OTUS_BY_ID_KEY = b'"otusById"'
+_OTU_BY_ID_KEY = b'"otuById"'
+_TREES_BY_ID_KEY = b'"treesById"'
+_TREE_BY_ID_KEY = b'"treeById"'
+_OPENERS = frozenset([b'[', b'{'])
+
+def _decode_key(raw_key):
+    return json.loads(raw_key.decode('utf-8'))
+
+def _scan_nexson_spans(raw):
+    '''Returns (otus_spans, otu_list_spans, otu_spans, tree_spans) for the
+    bytes `raw` of a by-ID NexSON document:
+        otus_spans maps otus group ID -> [start, end]
+        otu_list_spans maps otus group ID -> [start, end] of its otuById object
+        otu_spans maps otu ID -> [otus group ID, start, end]
+        tree_spans maps tree ID -> [trees group ID, start, end]
+    offsets are byte offsets usable as raw[start:end]
+    '''
+    otus_spans, otu_list_spans, otu_spans, tree_spans = {}, {}, {}, {}
+    stack = [] # (raw key of the container, start offset) pairs
+    pending_key = None
+    for m in _JSON_STRUCTURE_PAT.finditer(raw):
+        start = m.start()
+        c = raw[start:start + 1]
+        if c == b'"':
+            if m.group(1):
+                pending_key = raw[start:m.start(1)]
+            else:
+                pending_key = None
+        elif c in _OPENERS:
+            stack.append((pending_key, start))
+            pending_key = None
+        else:
+            key, key_start = stack.pop()
+            pending_key = None
+            depth = len(stack)
+            if depth < 3 or depth > 5 or stack[1][0] != _NEXML_KEY:
+                continue
+            group_key = stack[2][0]
+            if depth == 3:
+                if group_key == _OTUS_BY_ID_KEY:
+                    otus_spans[_decode_key(key)] = [key_start, m.end()]
+            elif depth == 4:
+                if group_key == _OTUS_BY_ID_KEY and key == _OTU_BY_ID_KEY:
+                    otu_list_spans[_decode_key(stack[3][0])] = [key_start, m.end()]
+            else:
+                parent_key = stack[4][0]
+                if group_key == _OTUS_BY_ID_KEY and parent_key == _OTU_BY_ID_KEY:
+                    otu_spans[_decode_key(key)] = [_decode_key(stack[3][0]), key_start, m.end()]
+                elif group_key == _TREES_BY_ID_KEY and parent_key == _TREE_BY_ID_KEY:
+                    tree_spans[_decode_key(key)] = [_decode_key(stack[3][0]), key_start, m.end()]
+    return otus_spans, otu_list_spans, otu_spans, tree_spans
+
+def _stub_out_spans(raw, replacements):
+    '''Returns a copy of `raw` with each (start, end, stub) in `replacements` substituted'''
+    replacements.sort()
+    frags = []
+    prev = 0
+    for start, end, stub in replacements:
+        frags.append(raw[prev:start])
+        frags.append(stub)
+        prev = end
+    frags.append(raw[prev:])
+    return b''.join(frags)
+
+def _meta_bytes(raw, index):
+    '''Returns `raw` with the content of every otuById object replaced by {}
+    and every tree replaced by null.
+    '''
+    r = [(s, e, b'{}') for s, e in index['otu_lists'].values()]
+    r.extend([(t[1], t[2], b'null') for t in index['trees'].values()])
+    return _stub_out_spans(raw, r)
+
+def index_nexson_fragments(raw):
+    '''Returns a dict describing the fragments of the NexSON document
+    whose utf-8 encoded bytes are `raw`.
+    If the document is not by-ID NexSON, only the 'nexml2json' key is
+    meaningful, and no fragments are indexed.
+    '''
+    otus_spans, otu_list_spans, otu_spans, tree_spans = _scan_nexson_spans(raw)
+    index = {'format': FRAGMENT_INDEX_FORMAT,
+             'otus': otus_spans,
+             'otu_lists': otu_list_spans,
+             'otu': otu_spans,
+             'trees': tree_spans,
+             'tree2otus': {}}
+    meta = json_loads(_meta_bytes(raw, index))
+    nexson_version = detect_nexson_version(meta)
+    index['nexml2json'] = nexson_version
+    if not _is_by_id_hbf(nexson_version):
+        for k in ('otus', 'otu_lists', 'otu', 'trees'):
+            index[k] = {}
+        return index
+    trees_groups = get_nexml_el(meta).get('treesById', {})
+    tree2otus = index['tree2otus']
+    for tree_id, tree_span in tree_spans.items():
+        tree2otus[tree_id] = trees_groups[tree_span[0]]['@otus']
+    return index
+
+class NexsonFragmentIndex(object):
+    '''Provides the fragments of the NexSON study stored at `filepath` by
+    reading and parsing only the bytes needed.
+
+    If `index_filepath` is not None, the index is read from (and written to)
+    that "sidecar" file. The index is built lazily on first use, and rebuilt
+    if the study file's size or modification time differ from those recorded
+    in the index.
+
+    The read_* methods return the same structures as the corresponding
+    extract_* functions in peyotl.nexson_syntax. They should only be used
+    if `supports_fragments` is True; read_study works for any version.
+    '''
+    def __init__(self, filepath, index_filepath=None):
+        self.filepath = filepath
+        self.index_filepath = index_filepath
+        self._index = None
+    def _file_stamp(self):
+        s = os.stat(self.filepath)
+        return s.st_size, s.st_mtime
+    def _read_raw(self):
+        with open(self.filepath, 'rb') as fo:
+            return fo.read()
+    def _read_span(self, start, end):
+        with open(self.filepath, 'rb') as fo:
+            fo.seek(start)
+            return fo.read(end - start)
+    def _parse_span(self, start, end):
+        return json_loads(self._read_span(start, end))
+    def _load_sidecar(self, stamp):
+        if self.index_filepath is None or not os.path.exists(self.index_filepath):
+            return None
+        try:
+            index = read_as_json(self.index_filepath)
+        except:
+            _LOG.exception('Could not read fragment index "{}"'.format(self.index_filepath))
+            return None
+        if index.get('format') != FRAGMENT_INDEX_FORMAT:
+            return None
+        if index.get('size') != stamp[0] or index.get('mtime') != stamp[1]:
+            return None
+        return index
+    def rebuild(self):
+        '''Scans the study file and (if `index_filepath` was given) writes the sidecar.
+        Returns the index dict.
+        '''
+        stamp = self._file_stamp()
+        index = index_nexson_fragments(self._read_raw())
+        index['size'], index['mtime'] = stamp
+        if self.index_filepath is not None:
+            par_dir = os.path.split(self.index_filepath)[0]
+            if par_dir and not os.path.exists(par_dir):
+                os.makedirs(par_dir)
+            write_as_json(index, self.index_filepath)
+        self._index = index
+        return index
+    @property
+    def index(self):
+        stamp = self._file_stamp()
+        index = self._index
+        if index is None or index['size'] != stamp[0] or index['mtime'] != stamp[1]:
+            index = self._load_sidecar(stamp)
+            if index is None:
+                index = self.rebuild()
+            self._index = index
+        return index
+    @property
+    def nexson_version(self):
+        return self.index['nexml2json']
+    @property
+    def supports_fragments(self):
+        return _is_by_id_hbf(self.nexson_version)
+    def read_study(self):
+        return read_as_json(self.filepath)
+    def read_meta_nexson(self):
+        '''Returns the study with the otus removed from every otus group and
+        every tree set to None (the by-ID form of strip_to_meta_only).
+        '''
+        index = self.index
+        meta = json_loads(_meta_bytes(self._read_raw(), index))
+        for otus_group in get_nexml_el(meta).get('otusById', {}).values():
+            if 'otuById' in otus_group:
+                del otus_group['otuById']
+        return meta
+    def read_otu_group(self, otus_id):
+        '''Returns the otuById dict of the otus group `otus_id` (or None).'''
+        span = self.index['otu_lists'].get(otus_id)
+        if span is None:
+            return None
+        return self._parse_span(span[0], span[1])
+    def read_otus_nexson(self, otus_id):
+        index = self.index
+        if otus_id is None:
+            return dict([(i, self._parse_span(s[0], s[1])) for i, s in index['otus'].items()])
+        span = index['otus'].get(otus_id)
+        if span is None:
+            return None
+        return {otus_id: self._parse_span(span[0], span[1])}
+    def read_otu_nexson(self, otu_id):
+        index = self.index
+        if otu_id is None:
+            r = {}
+            for otus_id in index['otu_lists'].keys():
+                r.update(self.read_otu_group(otus_id))
+            return r
+        span = index['otu'].get(otu_id)
+        if span is None:
+            return None
+        return {otu_id: self._parse_span(span[1], span[2])}
+    def read_tree_nexson(self, tree_id):
+        '''Returns a list of (id, tree, otus_group) tuples for the
+        specified tree_id (all trees if tree_id is None)
+        '''
+        index = self.index
+        if tree_id is None:
+            tree_id_list = list(index['trees'].keys())
+        elif tree_id in index['trees']:
+            tree_id_list = [tree_id]
+        else:
+            return []
+        otu_groups = {}
+        tree_obj_otus_group_list = []
+        for tid in tree_id_list:
+            span = index['trees'][tid]
+            otus_id = index['tree2otus'][tid]
+            otu_group = otu_groups.get(otus_id)
+            if otu_group is None:
+                otu_group = self.read_otu_group(otus_id)
+                otu_groups[otus_id] = otu_group
+            tree_obj_otus_group_list.append((tid, self._parse_span(span[1], span[2]), otu_group))
+        return tree_obj_otus_group_list
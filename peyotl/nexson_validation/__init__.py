@@ -6,6 +6,8 @@ from peyotl.nexson_validation.warning_codes import NexsonWarningCodes
 from peyotl.nexson_validation.logger import FilteringLogger, \
                                             ValidationLogger
 from peyotl.nexson_validation.adaptor import create_validation_adaptor
+from peyotl.nexson_validation.validation_cache import ValidationCache
+from peyotl.nexson_validation.validation_profile import ValidationProfile
 
 def validate_nexson(obj, warning_codes_to_skip=None, retain_deprecated=True, **kwargs):
     '''Takes an `obj` that is a NexSON object.
@@ -15,6 +17,23 @@ def validate_nexson(obj, warning_codes_to_skip=None, retain_deprecated=True, **k
     `retain_deprecated` if False, then `obj` may be modified to replace
         deprecated constructs with new syntax. If it is True, the `obj` will
         not be modified.
+    `validation_cache` (optional keyword argument) a ValidationCache. If it holds
+        the results for parts of a previously validated version of the study,
+        those parts are not re-checked (only used for by-ID NexSON).
+    `tree_validation_processes` (optional keyword argument) for by-ID NexSON, the
+        number of processes used to check the trees (or pass a multiprocessing.Pool
+        as `tree_validation_pool`). The log is the same as that of a serial run.
+    `compact_log` (optional keyword argument) if True, the log stores messages
+        in its compact form (see DefaultRichLogger).
+    `max_messages_per_code` (optional keyword argument) if not None, the log
+        stores at most this many messages for each code (the rest are counted).
+    `validation_profile` (optional keyword argument) True or a ValidationProfile to
+        which the time spent in each phase of validation is added. The profile
+        is stored as the `profile` attribute of the validation log.
+    `errors_only` (optional keyword argument) if True, warnings are not recorded
+        and the checks that can only produce warnings are skipped.
+    `fail_fast` (optional keyword argument) if True, validation stops at the
+        first error (so the log holds at most one error).
     Returns the pair:
         validatation_log, adaptor
     `validatation_log` will be an instance of type nexson_validation.logger.DefaultRichLogger
@@ -23,11 +42,26 @@ def validate_nexson(obj, warning_codes_to_skip=None, retain_deprecated=True, **k
         it holds a reference to `obj` and the bookkeepping data necessary to attach
         the log message to `obj` if
     '''
+    compact = kwargs.pop('compact_log', False)
+    max_messages_per_code = kwargs.pop('max_messages_per_code', None)
     if warning_codes_to_skip:
-        v = FilteringLogger(codes_to_skip=list(warning_codes_to_skip), store_messages=True)
+        v = FilteringLogger(codes_to_skip=list(warning_codes_to_skip),
+                            store_messages=True,
+                            compact=compact,
+                            max_messages_per_code=max_messages_per_code)
     else:
-        v = ValidationLogger(store_messages=True)
+        v = ValidationLogger(store_messages=True,
+                             compact=compact,
+                             max_messages_per_code=max_messages_per_code)
     v.retain_deprecated = retain_deprecated
+    v.errors_only = kwargs.pop('errors_only', False)
+    v.fail_fast = kwargs.pop('fail_fast', False)
+    profile = kwargs.get('validation_profile')
+    if profile is not None:
+        if not isinstance(profile, ValidationProfile):
+            profile = ValidationProfile() if profile else None
+            kwargs['validation_profile'] = profile
+        v.profile = profile
     n = create_validation_adaptor(obj, v, **kwargs)
     return v, n
 
@@ -38,11 +72,16 @@ def ot_validate(nexson, **kwargs):
         the object of class NexSON which was created from nexson. This object may
             alias parts of the nexson dict that is passed in as an argument.
 
-    Currently the only kwargs used is 'max_num_trees_per_study'
+    The kwargs are passed to validate_nexson. If the `annotate` kwarg is False,
+    the annotation is not prepared and None is returned in its place (which is
+    useful with `errors_only` and `fail_fast` when only the validity matters).
     '''
     # stub function for hooking into NexSON validation
     codes_to_skip = [NexsonWarningCodes.UNVALIDATED_ANNOTATION] #pylint: disable=E1101
+    annotate = kwargs.pop('annotate', True)
     v_log, adaptor = validate_nexson(nexson, codes_to_skip, **kwargs)
+    if not annotate:
+        return None, v_log, adaptor
     annotation = v_log.prepare_annotation(author_name='api.opentreeoflife.org/validate',
                                           description='Open Tree NexSON validation')
     return annotation, v_log, adaptor
@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 from peyotl.nexson_validation.helper import _NEXEL, errorReturn
-from peyotl.nexson_validation.schema import check_raw_dict
+from peyotl.nexson_validation.schema import add_schema_attributes, check_raw_dict
 from peyotl.nexson_validation.err_generator import gen_MissingCrucialContentWarning, \
                                                    gen_MultipleRootsWarning, \
                                                    gen_NodeWithMultipleParents, \
@@ -11,15 +11,67 @@ from peyotl.nexson_validation.err_generator import gen_MissingCrucialContentWarn
                                                    gen_UnreachableNodeWarning, \
                                                    gen_WrongValueTypeWarning
 from peyotl.utility.str_util import is_str_type
-from peyotl.nexson_validation._validation_base import NexsonValidationAdaptor
+from peyotl.nexson_validation._validation_base import NexsonValidationAdaptor, \
+                                                     _ValidationContext
+from peyotl.nexson_validation.logger import ValidationLogger
+from peyotl.nexson_validation.validation_cache import ValidationCache
+from peyotl.nexson_validation.warning_codes import NexsonWarningCodes
 from peyotl.nexson_syntax.helper import BY_ID_HONEY_BADGERFISH
 from peyotl.utility import get_logger
+import multiprocessing
 _LOG = get_logger(__name__)
 
 class ByIdHBFValidationAdaptor(NexsonValidationAdaptor):
+    '''In addition to the kwargs of NexsonValidationAdaptor:
+        'tree_validation_pool' a multiprocessing.Pool (or other object with a `map`
+            method that runs in other processes) used to check the trees, or
+        'tree_validation_processes' the number of processes in a pool created to
+            check the trees of this study.
+    The log is the same as that of validating the trees serially.
+    '''
     def __init__(self, obj, logger, **kwargs):
         self._syntax_version = BY_ID_HONEY_BADGERFISH
-        NexsonValidationAdaptor.__init__(self, obj, logger, **kwargs)
+        self._validation_cache = kwargs.get('validation_cache')
+        self._tree_validation_pool = kwargs.get('tree_validation_pool')
+        own_pool = None
+        num_processes = kwargs.get('tree_validation_processes')
+        if self._tree_validation_pool is None and num_processes and num_processes > 1:
+            own_pool = multiprocessing.Pool(num_processes)
+            self._tree_validation_pool = own_pool
+        if self._tree_validation_pool is not None and self._validation_cache is None:
+            # the results of the workers are merged through a cache that is only used for this study
+            self._validation_cache = ValidationCache()
+        try:
+            NexsonValidationAdaptor.__init__(self, obj, logger, **kwargs)
+        finally:
+            self._tree_validation_pool = None
+            if own_pool is not None:
+                own_pool.close()
+                own_pool.join()
+
+    def _validate_trees_in_pool(self, tg_nex_id, tree_group_obj, otus_group_id, vc):
+        '''Checks the trees of a trees group that are not in the validation cache
+        in the worker processes, and adds the results to the cache. The serial loop over
+        the trees then merges the results in order (and checks a tree in this process
+        if the IDs that it uses have already been seen elsewhere in the study).
+        '''
+        cache = self._validation_cache
+        logged = [c for c in NexsonWarningCodes.numeric_codes_registered if self._logger.is_logging_type(c)]
+        anc = [(_id_of(o), nid) for o, nid in vc.anc_list]
+        anc.append((_id_of(tree_group_obj), tg_nex_id))
+        otu_ids = list(self._otu_group_by_id[otus_group_id]['otuById'].keys())
+        keys, args = [], []
+        for tree_id, tree_obj in tree_group_obj['treeById'].items():
+            key = self._tree_cache_key(tree_id, tg_nex_id, otus_group_id, tree_obj)
+            if key not in cache:
+                keys.append(key)
+                args.append((self._nexson_version, logged, anc, otus_group_id, otu_ids, tree_id, tree_obj))
+        if len(args) < 2:
+            return
+        for key, result in zip(keys, self._tree_validation_pool.map(_validate_tree_in_worker, args)):
+            entry, repeated_id = result
+            if not repeated_id:
+                cache.put(key, entry)
     def _post_key_check_validate_otus_obj(self, og_nex_id, otus_group, vc):
         otu_obj = otus_group.get('otuById', {})
         if not isinstance(otu_obj, dict):
@@ -89,6 +141,8 @@ class ByIdHBFValidationAdaptor(NexsonValidationAdaptor):
                               obj_nex_id=tg_nex_id,
                               key_list=[otus_el])
             return errorReturn('no "@otus" in trees group')
+        if self._tree_validation_pool is not None:
+            self._validate_trees_in_pool(tg_nex_id, tree_group_obj, otus_el, vc)
         for t_nex_id, tree_obj in tree_by_id.items():
             vc.push_context(_NEXEL.TREE, (tree_group_obj, tg_nex_id))
             try:
@@ -420,3 +474,59 @@ class ByIdHBFValidationAdaptor(NexsonValidationAdaptor):
             self._generate_ott_warnings(otus, tree_list, (nex_obj, obj_nex_id), vc)
         return True
 
+
+def _id_of(obj):
+    try:
+        return obj.get('@id')
+    except:
+        return None
+
+class _WorkerLogger(ValidationLogger):
+    def __init__(self, logged_codes):
+        ValidationLogger.__init__(self)
+        self._logged_codes = frozenset(logged_codes)
+    def is_logging_type(self, t):
+        return t in self._logged_codes
+
+class _TreeWorkerValidationAdaptor(ByIdHBFValidationAdaptor):
+    '''Checks one tree without the rest of the study (in a worker process)'''
+    def __init__(self, nexson_version, logged_codes, otus_group_id, otu_ids): #pylint: disable=W0231
+        self._syntax_version = BY_ID_HONEY_BADGERFISH
+        self._raw = None
+        self._nexml = None
+        self._pyid_to_nexson_add = {}
+        self._logger = _WorkerLogger(logged_codes)
+        self._repeated_id = False
+        self._otuid2ottid_byogid = {}
+        self._ottid2otuid_list_byogid = {}
+        self._dupottid_by_ogid_tree_id = {}
+        self._max_num_trees_per_study = None
+        self._nexson_id_to_obj = {}
+        self._nexson_version = nexson_version
+        # only the otu IDs are needed by the tree checks
+        self._otu_group_by_id = {otus_group_id: {'otuById': dict.fromkeys(otu_ids)}}
+        self._otu_by_otug = {otus_group_id: {}}
+        self._otu_ids_digest = {}
+        self._recorded_ids = None
+        self._recorded_otuid2leaf = None
+        self._validation_cache = None
+        self._tree_validation_pool = None
+    def validate_tree(self, anc, otus_group_id, tree_id, tree_obj):
+        vc = _ValidationContext(self, self._logger)
+        try:
+            add_schema_attributes(vc, self._nexson_version)
+            # placeholders for the nexml, trees group and trees elements above the tree
+            for element_type, id_pair in zip((_NEXEL.NEXML, _NEXEL.TREES, _NEXEL.TREE), anc):
+                vc.push_context(element_type, ({'@id': id_pair[0]}, id_pair[1]))
+            return self._record_validation(self._tree_validator(tree_id, tree_obj, vc, otus_group_id),
+                                           self._get_recorded_tree_state)
+        finally:
+            vc.adaptor = None
+
+def _validate_tree_in_worker(args):
+    '''Called in the worker processes by ByIdHBFValidationAdaptor._validate_trees_in_pool.
+    Returns the (validation cache entry, repeated_id) pair for the tree.
+    '''
+    nexson_version, logged_codes, anc, otus_group_id, otu_ids, tree_id, tree_obj = args
+    adaptor = _TreeWorkerValidationAdaptor(nexson_version, logged_codes, otus_group_id, otu_ids)
+    return adaptor.validate_tree(anc, otus_group_id, tree_id, tree_obj)
@@ -1,8 +1,13 @@
 #!/usr/bin/env python
 import json
 from peyotl.nexson_validation.helper import SeverityCodes, _NEXEL, errorReturn
+from peyotl.nexson_validation.logger import _FirstErrorFound
 from peyotl.nexson_validation.schema import add_schema_attributes
+from peyotl.nexson_validation.validation_cache import nexson_content_digest, \
+                                                      validation_cache_key
+from peyotl.nexson_validation.warning_codes import NexsonWarningCodes
 from peyotl.nexson_validation.err_generator import factory2code, \
+                                                   message_adaptor_by_name, \
                                                    gen_MissingExpectedListWarning, \
                                                    gen_MaxSizeExceededWarning, \
                                                    gen_MissingMandatoryKeyWarning, \
@@ -132,7 +137,7 @@ class LazyAddress(object):
     def get_full_path(self):
         if self._full_path is None:
             if self.par_addr is None:
-                assert self.code == _NEXEL.TOP_LEVEL
+                # the ancestors of an element are not always known (see _event_address)
                 self._full_path = {}
             else:
                 #_LOG.debug('par ' + str(self.par_addr.path))
@@ -154,7 +159,6 @@ class LazyAddress(object):
                     self._path = {'@idref': self.obj_nex_id}
                 else:
                     if self.par_addr is None:
-                        assert self.code == _NEXEL.TOP_LEVEL
                         self._path = {}
                     else:
                         #_LOG.debug('par ' + str(self.par_addr.path))
@@ -165,9 +169,10 @@ class LazyAddress(object):
             else:
                  #_LOG.debug('c = ' + str(self.code))
                 if self.par_addr is None:
-                    if self.code not in [None, _NEXEL.TOP_LEVEL]:
-                        _LOG.debug('code = ' + _NEXEL.CODE_TO_STR[self.code])
-                        assert self.code == _NEXEL.TOP_LEVEL
+                    # if an event is the first for an element whose ancestors were
+                    #   not all on the anc list, the chain of addresses does not
+                    #   reach the top level. The path is then relative to the
+                    #   outermost known ancestor.
                     self._path = {}
                 else:
                     #_LOG.debug('par ' + str(self.par_addr.path))
@@ -183,6 +188,35 @@ class LazyAddress(object):
                     del self._path['@idref']
         return self._path
 
+class _CachedAddress(object):
+    '''Address of a message restored from a ValidationCache (only the path is stored)'''
+    def __init__(self, path):
+        self.path = path
+    def write_path_suffix_str(self, out):
+        out.write(' in ')
+        out.write(self.path)
+
+def _as_hashable(data):
+    '''Converts the lists in message data read from a ValidationCache back to tuples'''
+    if isinstance(data, list):
+        return tuple([_as_hashable(i) for i in data])
+    return data
+
+class _MessageRecorder(object):
+    '''Stands in for the logger while an element is validated, so that the
+    messages about the element can be stored in a ValidationCache.
+    '''
+    def __init__(self, logger):
+        self.logger = logger
+        self.messages = []
+    def is_logging_type(self, t):
+        return self.logger.is_logging_type(t)
+    def has_error(self):
+        return self.logger.has_error()
+    def register_new_messages(self, err_tup, severity):
+        self.messages.append([severity, type(err_tup[0]).__name__, err_tup[2].path, err_tup[3]])
+        self.logger.register_new_messages(err_tup, severity)
+
 class _ValidationContext(object):
     '''Holds references to the adaptor and logger
     '''
@@ -283,9 +317,33 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
         and annotations to be relatively light weight, and yet easy
         to efficiently add back to the orignal NexSON object.
 
-    Currently the only kwargs used is 'max_num_trees_per_study'
+    Currently the only kwargs used are 'max_num_trees_per_study',
+    'validation_cache' (a ValidationCache, which is only used by the adaptor
+    for by-ID NexSON) and 'validation_profile' (a ValidationProfile which
+    will hold the times spent in each phase of the validation).
     '''
+    _validation_cache = None
+    # True if the logger does not register warnings (see DefaultRichLogger)
+    _errors_only = False
     def __init__(self, obj, logger, **kwargs):
+        profile = kwargs.get('validation_profile')
+        if profile is None:
+            self._validate_study_or_stop(obj, logger, **kwargs)
+            return
+        profile.instrument(self)
+        profile.start_study()
+        try:
+            self._validate_study_or_stop(obj, logger, **kwargs)
+        finally:
+            profile.end_study()
+            profile.uninstrument(self)
+    def _validate_study_or_stop(self, obj, logger, **kwargs):
+        try:
+            self._validate_study(obj, logger, **kwargs)
+        except _FirstErrorFound:
+            pass # fail_fast logger
+    def _validate_study(self, obj, logger, **kwargs):
+        self._errors_only = getattr(logger, 'errors_only', False)
         self._raw = obj
         self._nexml = None
         self._pyid_to_nexson_add = {}
@@ -328,6 +386,9 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
         # in the finally clause
         self._otu_group_by_id = {}
         self._otu_by_otug = {}
+        self._otu_ids_digest = {}
+        self._recorded_ids = None
+        self._recorded_otuid2leaf = None
 
         try:
             # a little duck-punching
@@ -352,6 +413,7 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
             del vc
             del self._otu_group_by_id
             del self._otu_by_otug
+            del self._otu_ids_digest
 
     def _fill_otu_ottid_maps(self, otus_group_id):
         if self._otuid2ottid_byogid.get(otus_group_id) is None:
@@ -374,6 +436,11 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
         # See if there are any otus that we need to flag as occurring in a tree
         # multiple_times
         #
+        if self._errors_only:
+            return # only used for warnings
+        if self._recorded_ids is not None:
+            # stored with the cached validation of the tree, see _validate_tree
+            self._recorded_otuid2leaf = otuid2leaf
         pair = self._fill_otu_ottid_maps(otus_group_id)
         ottid2otuid_list = pair[1]
         dup_dict = {}
@@ -396,6 +463,8 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
 
 
     def _generate_ott_warnings(self, ogid2og_map, used_tree_id_list, nex_tuple, vc):
+        if self._errors_only:
+            return
         for ogid, by_tree in self._dupottid_by_ogid_tree_id.items():
             ottid2otuid_list = self._ottid2otuid_list_byogid[ogid]
             dup_ottid_set = set()
@@ -481,6 +550,8 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
             self._pyid_to_nexson_add[pyid] = addr
         return addr, pyid
     def _warn_event(self, element_type, obj, err_type, anc, obj_nex_id, *valist, **kwargs):
+        if self._errors_only:
+            return
         c = factory2code[err_type]
         if not self._logger.is_logging_type(c):
             return
@@ -520,6 +591,8 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
         return pc
 
     def _check_meta_id(self, nid, meta_obj, k, container_obj, vc): #pylint: disable=W0613
+        if self._recorded_ids is not None:
+            self._recorded_ids.append(nid)
         robj = self._nexson_id_to_obj.setdefault(nid, meta_obj)
         if robj is meta_obj:
             return True
@@ -532,6 +605,8 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
         self._repeated_id = True
         return False
     def _register_nexson_id(self, nid, nobj, vc):
+        if self._recorded_ids is not None:
+            self._recorded_ids.append(nid)
         robj = self._nexson_id_to_obj.setdefault(nid, nobj)
         if robj is nobj:
             return True
@@ -557,8 +632,11 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
         anc_list = vc.anc_list
         #_LOG.debug('using schema type = ' + vc.schema_name())
         using_hbf_meta = vc._using_hbf_meta #pylint: disable=W0212
+        all_valid = schema.all_valid
         _by_warn_type = {}
         for obj_nex_id, obj in id_obj_list:
+            if all_valid(obj):
+                continue
             wrong_type = []
             unrec_meta_keys = []
             unrec_non_meta_keys = []
@@ -694,7 +772,19 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
             if nid is not None:
                 if not self._register_nexson_id(nid, nex_obj, vc):
                     return False
-            if not self._validate_obj_by_schema(nex_obj, nid, vc):
+            if self._validation_cache is None:
+                valid = self._validate_obj_by_schema(nex_obj, nid, vc)
+            else:
+                # the nexml schema only checks the type of the otus and trees containers
+                shallow = dict(nex_obj)
+                for k in ('otusById', 'treesById'):
+                    if k in shallow:
+                        shallow[k] = type(shallow[k]).__name__
+                key = self._cache_key('nexml', [nid], nexson_content_digest(shallow))
+                valid = self._validate_element_with_cache(key,
+                                                          nex_obj,
+                                                          lambda: self._validate_obj_by_schema(nex_obj, nid, vc))[0]
+            if not valid:
                 return False
             return self._post_key_check_validate_nexml_obj(nex_obj, nid, vc)
         finally:
@@ -705,12 +795,28 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
         for el in otu_group_id_obj_list:
             ogid, og = el
             self._otu_group_by_id[ogid] = og
-            if not self._validate_obj_by_schema(og, ogid, vc):
-                return False
-            if not self._post_key_check_validate_otus_obj(ogid, og, vc):
+            if self._validation_cache is None:
+                valid = self._validate_otus_group(ogid, og, vc)
+            else:
+                key = self._cache_key('otus', [ogid], nexson_content_digest(og))
+                otu_obj = og.get('otuById')
+                if isinstance(otu_obj, dict):
+                    # the checks of the trees only depend on which otu IDs are in the group
+                    self._otu_ids_digest[ogid] = nexson_content_digest(sorted(otu_obj.keys()))
+                valid, replayed = self._validate_element_with_cache(key,
+                                                                    og,
+                                                                    lambda: self._validate_otus_group(ogid, og, vc))
+                if replayed and valid:
+                    self._otu_by_otug[ogid] = og.get('otuById', {})
+            if not valid:
                 return False
         return True
 
+    def _validate_otus_group(self, ogid, og, vc):
+        if not self._validate_obj_by_schema(og, ogid, vc):
+            return False
+        return self._post_key_check_validate_otus_obj(ogid, og, vc)
+
     def _validate_trees_group_list(self, trees_group_id_obj_list, vc):
         if not self._register_nexson_id_list(trees_group_id_obj_list, vc):
             return False
@@ -723,6 +829,38 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
         return True
 
     def _validate_tree(self, tree_id, tree_obj, vc, otus_group_id=None):
+        if self._validation_cache is None:
+            return self._validate_tree_uncached(tree_id, tree_obj, vc, otus_group_id)
+        key = self._tree_cache_key(tree_id, vc.anc_list[-1][1], otus_group_id, tree_obj)
+        valid, replayed = self._validate_element_with_cache(key,
+                                                            tree_obj,
+                                                            self._tree_validator(tree_id, tree_obj, vc, otus_group_id),
+                                                            self._get_recorded_tree_state)
+        if replayed:
+            otuid2leaf_list = self._validation_cache_entry['state']
+            if otuid2leaf_list is not None:
+                # the OTT IDs of the otus may have changed, so this is not cached
+                self._detect_multilabelled_tree(otus_group_id=otus_group_id,
+                                                tree_id=tree_id,
+                                                otuid2leaf=dict(otuid2leaf_list))
+        return valid
+
+    def _tree_cache_key(self, tree_id, tg_nex_id, otus_group_id, tree_obj):
+        context = [tree_id, tg_nex_id, otus_group_id, self._otu_ids_digest.get(otus_group_id)]
+        return self._cache_key('tree', context, nexson_content_digest(tree_obj))
+
+    def _tree_validator(self, tree_id, tree_obj, vc, otus_group_id):
+        def _validate():
+            self._recorded_otuid2leaf = None
+            return self._validate_tree_uncached(tree_id, tree_obj, vc, otus_group_id)
+        return _validate
+
+    def _get_recorded_tree_state(self):
+        if self._recorded_otuid2leaf is None:
+            return None
+        return [[otuid, nd_id] for otuid, nd_id in self._recorded_otuid2leaf.items()]
+
+    def _validate_tree_uncached(self, tree_id, tree_obj, vc, otus_group_id=None):
         if not self._register_nexson_id(tree_id, tree_obj, vc):
             return False
         if not self._validate_obj_by_schema(tree_obj, tree_id, vc):
@@ -732,6 +870,75 @@ class NexsonValidationAdaptor(NexsonAnnotationAdder): #pylint: disable=R0921
                                                   vc,
                                                   otus_group_id=otus_group_id)
 
+    def _cache_key(self, element_kind, context, content_digest):
+        logged = [c for c in NexsonWarningCodes.numeric_codes_registered if self._logger.is_logging_type(c)]
+        if self._errors_only:
+            # entries of errors-only runs lack the warnings
+            logged.append('errors-only')
+        return validation_cache_key(element_kind,
+                                    [self._nexson_version, logged] + context,
+                                    content_digest)
+
+    def _validate_element_with_cache(self, key, obj, validate, get_state=None):
+        '''Returns (valid, replayed). If the ValidationCache has an entry for `key`
+        (and none of the IDs registered when it was created are in use), the
+        IDs and messages of the entry are registered. Otherwise `validate` is
+        called, and the IDs that it registers and the messages that it generates
+        are stored in the cache (along with the result of `get_state` if supplied).
+        The entry used is available as self._validation_cache_entry
+        '''
+        cache = self._validation_cache
+        entry = cache.get(key)
+        if entry is not None and self._replay_cache_entry(entry, obj):
+            self._validation_cache_entry = entry
+            return entry['valid'], True
+        entry, repeated_id = self._record_validation(validate, get_state)
+        # A repeated ID depends on the rest of the study, so the outcome is not reusable
+        if not repeated_id:
+            cache.put(key, entry)
+        self._validation_cache_entry = entry
+        return entry['valid'], False
+
+    def _record_validation(self, validate, get_state=None):
+        '''Calls `validate` and returns (entry, repeated_id) where entry is
+        the dict stored in a ValidationCache, and repeated_id is True if
+        a repeated ID was found.
+        '''
+        recorder = _MessageRecorder(self._logger)
+        self._logger = recorder
+        self._recorded_ids = []
+        prev_repeated_id = self._repeated_id
+        self._repeated_id = False
+        try:
+            valid = validate()
+            repeated_id = self._repeated_id
+        finally:
+            self._logger = recorder.logger
+            ids = self._recorded_ids
+            self._recorded_ids = None
+            self._repeated_id = prev_repeated_id or self._repeated_id
+        entry = {'valid': valid,
+                 'ids': ids,
+                 'messages': recorder.messages,
+                 'state': get_state() if get_state is not None else None}
+        return entry, repeated_id
+
+    def _replay_cache_entry(self, entry, obj):
+        id_registry = self._nexson_id_to_obj
+        for nid in entry['ids']:
+            if nid in id_registry:
+                return False
+        for nid in entry['ids']:
+            id_registry[nid] = obj
+        for severity, adaptor_name, path, data in entry['messages']:
+            err_tup = (message_adaptor_by_name[adaptor_name],
+                       (NexsonValidationAdaptor._LIST_ADDR_INCR, None),
+                       _CachedAddress(path),
+                       _as_hashable(data))
+            NexsonValidationAdaptor._LIST_ADDR_INCR += 1
+            self._logger.register_new_messages(err_tup, severity)
+        return True
+
     def _register_nexson_id_list(self, id_obj_list, vc):
         for obj_id, obj in id_obj_list:
             if not self._register_nexson_id(obj_id, obj, vc):
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+'''Validation of every study in a corpus (e.g. all of phylesystem), with
+a persistent cache of the results so that only the studies that have
+changed since the previous run are validated again.
+
+Results are keyed by the git blob SHA of the study file (computed from
+the bytes of the file, so no git commands are run) and a tag that
+identifies the validator version and settings.
+'''
+from peyotl.nexson_validation.helper import VERSION
+from peyotl.nexson_validation.warning_codes import NexsonWarningCodes
+from peyotl.nexson_validation.validation_profile import ValidationProfile
+from peyotl.nexson_syntax.helper import detect_nexson_version
+from peyotl.utility.input_output import read_as_json, write_as_json
+from peyotl.utility.json_backend import json_loads
+from peyotl.utility import get_logger
+import hashlib
+import multiprocessing
+import os
+_LOG = get_logger(__name__)
+
+def git_blob_sha(raw):
+    '''Returns the SHA that git uses for a blob with the content `raw` (bytes)'''
+    h = hashlib.sha1()
+    h.update('blob {l:d}\0'.format(l=len(raw)).encode('ascii'))
+    h.update(raw)
+    return h.hexdigest()
+
+# Incremented when the summaries of validate_study_file change, so that cached
+#   summaries are not reused. 2: repeated messages are no longer counted
+#   once the per-code cap of the logger is reached.
+_SUMMARY_FORMAT = 2
+
+def _cache_tag(codes_to_skip):
+    skipped = ','.join([NexsonWarningCodes.facets[c] for c in sorted(codes_to_skip)])
+    return 'v{v}.{f:d}:skip={s}'.format(v=VERSION, f=_SUMMARY_FORMAT, s=skipped)
+
+def validate_study_file(filepath, codes_to_skip=None, profile=False):
+    '''Returns a JSON-serializable summary of the validation of the NexSON
+    study at `filepath`: the counts of the messages of each code in the
+    "errors" and "warnings" dicts, "has_error" and "nexml2json". If the file
+    cannot be read or validated, the summary has an "exception" string instead.
+    If `profile` is True, the summary also has the ValidationProfile.as_dict()
+    of the validation as "profile".
+    '''
+    # imported here to avoid a circular import with peyotl.nexson_validation
+    from peyotl.nexson_validation import validate_nexson
+    try:
+        with open(filepath, 'rb') as fo:
+            nexson = json_loads(fo.read())
+        nexson_version = detect_nexson_version(nexson)
+        # only the counts are needed, so no messages are stored
+        v_log = validate_nexson(nexson,
+                                codes_to_skip,
+                                max_messages_per_code=0,
+                                validation_profile=bool(profile))[0]
+    except Exception as x:
+        return {'exception': '{t}: {m}'.format(t=type(x).__name__, m=str(x))}
+    r = v_log.get_code_counts()
+    r['has_error'] = v_log.has_error()
+    r['nexml2json'] = nexson_version
+    if profile:
+        r['profile'] = v_log.profile.as_dict()
+    return r
+
+def _validate_study_file_in_worker(args):
+    study_id, filepath, codes_to_skip, profile = args
+    return study_id, validate_study_file(filepath, codes_to_skip, profile)
+
+class CorpusValidationCache(object):
+    '''Persistent map of (git blob SHA, validator tag) -> study validation summary.
+    Stored as JSON at `filepath`. Only the entries used since the cache
+    was loaded are written by `save`, so studies that have changed or
+    been deleted do not accumulate.
+    '''
+    def __init__(self, filepath=None):
+        self.filepath = filepath
+        self._stored = {}
+        self._used = {}
+        if filepath is not None and os.path.exists(filepath):
+            try:
+                self._stored = read_as_json(filepath).get('results', {})
+            except:
+                _LOG.exception('Could not read the validation cache "{}"'.format(filepath))
+    @staticmethod
+    def _key(sha, tag):
+        return sha + ':' + tag
+    def get(self, sha, tag):
+        k = CorpusValidationCache._key(sha, tag)
+        r = self._used.get(k)
+        if r is None:
+            r = self._stored.get(k)
+            if r is not None:
+                self._used[k] = r
+        return r
+    def put(self, sha, tag, result):
+        self._used[CorpusValidationCache._key(sha, tag)] = result
+    def save(self):
+        if self.filepath is None:
+            return
+        par_dir = os.path.split(self.filepath)[0]
+        if par_dir and not os.path.exists(par_dir):
+            os.makedirs(par_dir)
+        write_as_json({'results': self._used}, self.filepath, indent=None)
+
+def summarize_corpus_validation(study_results):
+    '''Takes a dict of study ID -> summary (from validate_study_file) and
+    returns the aggregated report: the number of studies, of studies with
+    errors and of studies that could not be validated, the total number of
+    messages for each code (in "errors" and "warnings"), the number of
+    studies with at least one message for each code (in "studies_with_error"
+    and "studies_with_warning") and the per-study summaries (in "studies").
+    '''
+    totals = {'errors': {}, 'warnings': {}}
+    num_studies_with = {'errors': {}, 'warnings': {}}
+    num_with_errors = 0
+    num_failed = 0
+    for result in study_results.values():
+        if 'exception' in result:
+            num_failed += 1
+            continue
+        if result['has_error']:
+            num_with_errors += 1
+        for k in ('errors', 'warnings'):
+            t = totals[k]
+            n = num_studies_with[k]
+            for code, count in result[k].items():
+                t[code] = t.get(code, 0) + count
+                n[code] = n.get(code, 0) + 1
+    return {'validator_version': VERSION,
+            'num_studies': len(study_results),
+            'num_studies_with_errors': num_with_errors,
+            'num_studies_not_validated': num_failed,
+            'errors': totals['errors'],
+            'warnings': totals['warnings'],
+            'studies_with_error': num_studies_with['errors'],
+            'studies_with_warning': num_studies_with['warnings'],
+            'studies': study_results}
+
+def validate_corpus(study_filepath_iter,
+                    cache_filepath=None,
+                    num_processes=1,
+                    codes_to_skip=None,
+                    profile=False):
+    '''Validates each study of the (study ID, filepath) pairs in `study_filepath_iter`
+    (for example, Phylesystem().iter_study_filepaths()) and returns the report
+    created by summarize_corpus_validation. The report also has the number of
+    studies that were validated in this call ("num_validated") and the number
+    found in the cache ("num_cached").
+
+    If `cache_filepath` is not None, results are looked up (and stored) in a
+    CorpusValidationCache at that path, so only changed studies are validated.
+    If `num_processes` > 1, studies are validated in a multiprocessing.Pool.
+    `codes_to_skip` defaults to [NexsonWarningCodes.UNVALIDATED_ANNOTATION]
+    If `profile` is True, the report has the merged ValidationProfile.as_dict()
+    of the studies that were validated (not those from the cache) as "profile".
+    '''
+    if codes_to_skip is None:
+        codes_to_skip = [NexsonWarningCodes.UNVALIDATED_ANNOTATION] #pylint: disable=E1101
+    codes_to_skip = list(codes_to_skip)
+    tag = _cache_tag(codes_to_skip)
+    cache = CorpusValidationCache(cache_filepath)
+    study_results = {}
+    study_sha = {}
+    to_validate = []
+    for study_id, filepath in study_filepath_iter:
+        try:
+            with open(filepath, 'rb') as fo:
+                sha = git_blob_sha(fo.read())
+        except Exception as x:
+            study_results[study_id] = {'exception': '{t}: {m}'.format(t=type(x).__name__, m=str(x))}
+            continue
+        study_sha[study_id] = sha
+        r = cache.get(sha, tag)
+        if r is None:
+            to_validate.append((study_id, filepath, codes_to_skip, profile))
+        else:
+            study_results[study_id] = r
+    num_cached = len(study_results)
+    if num_processes > 1 and len(to_validate) > 1:
+        pool = multiprocessing.Pool(num_processes)
+        try:
+            validated = pool.imap_unordered(_validate_study_file_in_worker, to_validate)
+            for study_id, r in validated:
+                study_results[study_id] = r
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for study_id, r in [_validate_study_file_in_worker(a) for a in to_validate]:
+            study_results[study_id] = r
+    corpus_profile = ValidationProfile() if profile else None
+    for args in to_validate:
+        study_id = args[0]
+        r = study_results[study_id]
+        if 'profile' in r:
+            # timings are not cached or reported per study
+            corpus_profile.merge(r.pop('profile'))
+        if 'exception' not in r:
+            cache.put(study_sha[study_id], tag, r)
+    cache.save()
+    for study_id, sha in study_sha.items():
+        study_results[study_id]['sha'] = sha
+    report = summarize_corpus_validation(study_results)
+    report['num_validated'] = len(to_validate)
+    report['num_cached'] = num_cached
+    if corpus_profile is not None:
+        report['profile'] = corpus_profile.as_dict()
+    return report
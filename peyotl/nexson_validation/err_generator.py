@@ -205,6 +205,26 @@ UnrecognizedKeyWarning = UnrecognizedKeyWarningType()
 WrongValueTypeWarning = WrongValueTypeWarningType()
 MaxSizeExceededWarning = MaxSizeExceededWarningType()
 
+# maps the class name of each MessageTupleAdaptor to the shared instance
+message_adaptor_by_name = dict([(type(i).__name__, i) for i in (InvalidKeyWarning,
+                                                                MissingCrucialContentWarning,
+                                                                MissingExpectedListWarning,
+                                                                MissingMandatoryKeyWarning,
+                                                                MissingOptionalKeyWarning,
+                                                                MultipleRootsWarning,
+                                                                MultipleTipsToSameOttIdWarning,
+                                                                NodeWithMultipleParents,
+                                                                NoRootWarning,
+                                                                ReferencedIDNotFoundWarning,
+                                                                RepeatedIDWarning,
+                                                                RepeatedOTUWarning,
+                                                                TreeCycleWarning,
+                                                                UnparseableMetaWarning,
+                                                                UnreachableNodeWarning,
+                                                                UnrecognizedKeyWarning,
+                                                                WrongValueTypeWarning,
+                                                                MaxSizeExceededWarning)])
+
 def gen_InvalidKeyWarning(addr, pyid, logger, severity, **kwargs):
     _key_list_warning(InvalidKeyWarning, kwargs['key_list'], addr, pyid, logger, severity)
 
@@ -7,6 +7,7 @@ from peyotl.nexson_validation.warning_codes import NexsonWarningCodes
 from peyotl.utility import get_logger
 from functools import cmp_to_key
 _LOG = get_logger(__name__)
+import json
 import platform
 import sys
 
@@ -20,23 +21,83 @@ def _err_warn_summary(w):
         _add_value_to_dict_bf(d, key, r)
     return d
 
-def _create_message_list(key, w, severity): #pylint: disable=W0613
-    d = []
+def _iter_messages(w, severity):
     for el in w:
         msg_adapt_inst = el[0]
         r = msg_adapt_inst.as_dict(el)
         r['@severity'] = severity
-        d.append(r)
-    return d
+        yield r
+
+def _create_message_list(key, w, severity): #pylint: disable=W0613
+    return list(_iter_messages(w, severity))
+
+class _CodeMessages(object):
+    '''Column-wise store of the messages of one code and severity, used
+    by loggers in compact mode in place of a set of message tuples.
+    Iterating yields the stored message tuples. len() is the number of
+    messages registered, which can exceed the number stored if the
+    logger has a `max_messages_per_code`.
+    '''
+    __slots__ = ('count', 'adaptors', 'pyids', 'addresses', 'data', '_seen')
+    def __init__(self):
+        self.count = 0
+        self.adaptors = []
+        self.pyids = []
+        self.addresses = []
+        self.data = []
+        self._seen = set()
+    def add(self, err_tup, data, max_stored):
+        '''Counts and stores the message unless it is a repeat. Once `max_stored`
+        messages are stored, new messages are only counted (their keys are
+        still kept, so that repeats are not counted twice).
+        '''
+        key = (err_tup[0], err_tup[1], data)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        self.count += 1
+        if max_stored is not None and len(self.data) >= max_stored:
+            return
+        self.adaptors.append(err_tup[0])
+        self.pyids.append(err_tup[1])
+        self.addresses.append(err_tup[2])
+        self.data.append(data)
+    @property
+    def num_stored(self):
+        return len(self.data)
+    def __len__(self):
+        return self.count
+    def __iter__(self):
+        for t in zip(self.adaptors, self.pyids, self.addresses, self.data):
+            yield t
 
 _LIST_0 = [0]
 _LIST_1 = [0]
 def _msg_data_cmp(x, y):
     xl = x.get('data', _LIST_0)
     yl = y.get('data', _LIST_1)
+    # some adaptors report data as tuples, others as lists
+    if isinstance(xl, tuple):
+        xl = list(xl)
+    if isinstance(yl, tuple):
+        yl = list(yl)
     if xl == yl:
         return 0
-    return -1 if xl < yl else 1
+    try:
+        return -1 if xl < yl else 1
+    except TypeError:
+        # unorderable under python 3 (e.g. dicts)
+        xs = json.dumps(xl, sort_keys=True)
+        ys = json.dumps(yl, sort_keys=True)
+        return -1 if xs < ys else 1
+
+def _idref_sort_key(idref):
+    '''Messages about lists of objects have a list as their @idref. Lists sort
+    before strings (as they do under python 2)
+    '''
+    if idref is None:
+        return None
+    return (0, idref) if isinstance(idref, list) else (1, idref)
 
 def _msg_cmp(x, y):
     xr = x.get('refersTo')
@@ -48,8 +109,8 @@ def _msg_cmp(x, y):
             return 1
     if yr is None:
         return -1
-    xri = xr.get('@idref')
-    yri = yr.get('@idref')
+    xri = _idref_sort_key(xr.get('@idref'))
+    yri = _idref_sort_key(yr.get('@idref'))
     #_LOG.debug('xri = "{x}" yri = "{y}"'.format(x=xri, y=yri))
     if xri is None:
         if yri is None:
@@ -75,8 +136,28 @@ def _msg_cmp(x, y):
 
 _msg_key_func = cmp_to_key(_msg_cmp)
 
+class _FirstErrorFound(Exception):
+    '''Raised by a logger in fail_fast mode when the first error is registered
+    (caught by the validation adaptor)
+    '''
+    pass
+
 class DefaultRichLogger(object):
-    def __init__(self, store_messages=False):
+    '''Holds the warnings and errors found during validation.
+
+    By default each message is stored in a set for its code and a set for
+    the object that it is about. If `compact` is True, only per-code
+    _CodeMessages columns are kept and message data are interned, which uses much
+    less memory for studies with thousands of messages. If `max_messages_per_code`
+    is not None (which implies `compact`), at most that many messages of each code
+    and severity are kept; the rest are only counted (see get_code_counts and
+    get_omitted_message_counts).
+
+    If the `errors_only` attribute is True, warnings are not registered, and the
+    validation adaptors skip the checks that can only produce warnings. If the
+    `fail_fast` attribute is True, validation stops at the first error.
+    '''
+    def __init__(self, store_messages=False, compact=False, max_messages_per_code=None):
         self.out = sys.stderr
         self.store_messages_as_obj = store_messages
         self._warn_by_type = {}
@@ -86,6 +167,13 @@ class DefaultRichLogger(object):
         self.prefix = ''
         self.retain_deprecated = False
         self.codes_to_skip = set()
+        self.max_messages_per_code = max_messages_per_code
+        self.compact = compact or (max_messages_per_code is not None)
+        self._interned_data = {}
+        # ValidationProfile of the run (if validate_nexson was asked to profile)
+        self.profile = None
+        self.errors_only = False
+        self.fail_fast = False
     def has_error(self):
         return bool(self._err_by_type)
     @property
@@ -98,7 +186,29 @@ class DefaultRichLogger(object):
         #pylint: disable=W0613,R0201
         return True
     def register_new_messages(self, err_tup, severity):
+        if self.errors_only and severity == SeverityCodes.WARNING:
+            return
+        if self.fail_fast:
+            # a check may catch the exception and carry on, so nothing is
+            #   recorded after the first error.
+            if self._err_by_type:
+                raise _FirstErrorFound()
+            self._register_message(err_tup, severity)
+            if severity != SeverityCodes.WARNING:
+                raise _FirstErrorFound()
+            return
+        self._register_message(err_tup, severity)
+    def _register_message(self, err_tup, severity):
         c = err_tup[0].code
+        if self.compact:
+            by_type = self._warn_by_type if severity == SeverityCodes.WARNING else self._err_by_type
+            m = by_type.get(c)
+            if m is None:
+                m = _CodeMessages()
+                by_type[c] = m
+            data = self._interned_data.setdefault(err_tup[3], err_tup[3])
+            m.add(err_tup, data, self.max_messages_per_code)
+            return
         pyid = err_tup[1]
         if severity == SeverityCodes.WARNING:
             x = self._warn_by_type.setdefault(c, set())
@@ -111,6 +221,29 @@ class DefaultRichLogger(object):
             x = self._err_by_obj.setdefault(pyid, set())
             x.add(err_tup)
 
+    def get_code_counts(self):
+        '''Returns a dict with "errors" and "warnings" dicts mapping the name
+        of each NexsonWarningCodes facet to the number of messages with that code.
+        '''
+        r = {}
+        for k, by_type in (('errors', self._err_by_type), ('warnings', self._warn_by_type)):
+            r[k] = dict([(NexsonWarningCodes.facets[c], len(m)) for c, m in by_type.items() if m])
+        return r
+
+    def get_omitted_message_counts(self):
+        '''Returns a dict like that of get_code_counts, but only for the codes for
+        which messages were counted but not stored (because of `max_messages_per_code`).
+        '''
+        r = {}
+        for k, by_type in (('errors', self._err_by_type), ('warnings', self._warn_by_type)):
+            d = {}
+            if self.compact:
+                for c, m in by_type.items():
+                    if m.count > m.num_stored:
+                        d[NexsonWarningCodes.facets[c]] = m.count - m.num_stored
+            r[k] = d
+        return r
+
     def get_err_warn_summary_dict(self, sort=True):
         w = {}
         for wm in self._warn_by_type.values():
@@ -129,20 +262,30 @@ class DefaultRichLogger(object):
                     v.sort(key=_msg_key_func)
         return {'warnings': w, 'errors': e}
 
+    def iter_nexson_messages(self):
+        '''Generates the dicts of create_nexson_message_list one at a time (unsorted,
+        errors before warnings), so that large logs can be written without building the list.
+        '''
+        for em in self._err_by_type.values():
+            for r in _iter_messages(em, 'ERROR'):
+                yield r
+        for wm in self._warn_by_type.values():
+            for r in _iter_messages(wm, 'WARNING'):
+                yield r
+
     def create_nexson_message_list(self, sort=True):
+        if not sort:
+            return list(self.iter_nexson_messages())
         em_list = []
         for key, em in self._err_by_type.items():
             d = _create_message_list(key, em, 'ERROR')
             em_list.extend(d)
-        if sort:
-            em_list.sort(key=_msg_key_func)
         wm_list = []
         for key, em in self._warn_by_type.items():
             d = _create_message_list(key, em, 'WARNING')
             wm_list.extend(d)
-        if sort:
-            em_list.sort(key=_msg_key_func)
-            wm_list.sort(key=_msg_key_func)
+        em_list.sort(key=_msg_key_func)
+        wm_list.sort(key=_msg_key_func)
         em_list.extend(wm_list)
         return em_list
 
@@ -206,12 +349,23 @@ class DefaultRichLogger(object):
 
 
 class ValidationLogger(DefaultRichLogger):
-    def __init__(self, store_messages=False):
-        DefaultRichLogger.__init__(self, store_messages=store_messages)
+    def __init__(self, store_messages=False, compact=False, max_messages_per_code=None):
+        DefaultRichLogger.__init__(self,
+                                   store_messages=store_messages,
+                                   compact=compact,
+                                   max_messages_per_code=max_messages_per_code)
 
 class FilteringLogger(ValidationLogger):
-    def __init__(self, codes_to_register=None, codes_to_skip=None, store_messages=False):
-        ValidationLogger.__init__(self, store_messages=store_messages)
+    def __init__(self,
+                 codes_to_register=None,
+                 codes_to_skip=None,
+                 store_messages=False,
+                 compact=False,
+                 max_messages_per_code=None):
+        ValidationLogger.__init__(self,
+                                  store_messages=store_messages,
+                                  compact=compact,
+                                  max_messages_per_code=max_messages_per_code)
         self.codes_to_skip = set()
         if codes_to_register:
             self.registered = set(codes_to_register)
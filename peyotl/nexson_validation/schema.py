@@ -3,7 +3,8 @@ from peyotl.nexson_syntax.helper import extract_meta, \
                                         _is_badgerfish_version, \
                                         _is_by_id_hbf, \
                                         _is_direct_hbf
-from peyotl.utility.str_util import is_str_type
+from peyotl.nexson_validation.logger import _FirstErrorFound
+from peyotl.utility.str_util import is_str_type, UNICODE
 from peyotl.utility import get_logger
 _LOG = get_logger(__name__)
 #pylint: disable=W0613,W0212
@@ -103,6 +104,7 @@ class _SchemaFragment(object):
         x.sort()
         self.EXPECTED_META_KEY_TUPLE = tuple(x)
         self.USING_HBF_META = using_hbf_meta
+        self.all_valid = _compile_all_valid_check(self)
 
 
 __TRUE_VAL = (True, None)
@@ -151,6 +153,8 @@ def check_href(x, obj, k, vc):
         h = x.get('@href')
         if is_str_type(h):
             return __TRUE_VAL
+    except _FirstErrorFound:
+        raise
     except:
         pass
     return __FALSE_HREF
@@ -290,6 +294,53 @@ class _VT(object):
 
 _SchemaFragment._VT = _VT
 
+_STR_TYPES = tuple(set([str, UNICODE]))
+# The value types that each check function accepts without calling
+#   _check_id (or having any other side effect).
+#   Checks that are not listed here are never short-circuited.
+_PURE_CHECK_TYPES = {check_raw_bool: (bool, ),
+                     check_hbf_meta_bool: (bool, ),
+                     check_raw_dict: (dict, ),
+                     check_hbf_meta_dict: (dict, ),
+                     check_raw_int: (int, ),
+                     check_hbf_meta_int: (int, ),
+                     check_raw_float: (float, int),
+                     check_hbf_meta_float: (float, int),
+                     check_raw_list: (list, ),
+                     check_hbf_meta_list: (list, ),
+                     check_list_or_dict: (list, dict),
+                     check_raw_str: _STR_TYPES,
+                     check_hbf_meta_str: _STR_TYPES,
+                     check_raw_str_repeatable: _STR_TYPES,
+                     check_hbf_meta_str_repeatable: _STR_TYPES,
+                    }
+
+def _compile_all_valid_check(schema):
+    '''Returns a function that takes an object and returns True only if
+    validating the object against `schema` would emit no messages and have
+    no side effects: all required and expected keys are present, every key
+    is allowed, and the type of every value is one that its check accepts
+    without registering meta IDs. A False return means that the detailed
+    per-key validation must be run (it does not imply that the object is invalid).
+    '''
+    allowed = schema.ALLOWED_KEY_SET
+    present = frozenset(tuple(schema.REQUIRED_KEY_SET) + tuple(schema.EXPECETED_KEY_SET))
+    k2types = {}
+    for k, check in schema.K2VT.items():
+        k2types[k] = frozenset(_PURE_CHECK_TYPES.get(check, ()))
+    if not schema.USING_HBF_META:
+        # badgerfish meta elements are always checked by the detailed validation
+        k2types['meta'] = frozenset()
+    def all_valid(obj):
+        keys = frozenset(obj.keys())
+        if not (keys <= allowed and present <= keys):
+            return False
+        for k, v in obj.items():
+            if type(v) not in k2types[k]:
+                return False
+        return True
+    return all_valid
+
 # In the "schema definitions" below, the names are concatenations:
 # first:
 #   _ to make the vars private
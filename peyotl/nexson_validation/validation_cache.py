@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+'''ValidationCache class which holds the validation results of parts
+of a NexSON study, so that a new version of a study can be validated
+without repeating the checks of the trees, otus groups and metadata
+that did not change.
+'''
+from peyotl.nexson_validation.helper import VERSION
+from peyotl.utility.json_backend import json_dumps
+from collections import OrderedDict
+import hashlib
+import json
+
+def nexson_content_digest(obj):
+    '''Returns a hex digest of the JSON content of `obj`'''
+    return hashlib.sha1(json_dumps(obj, sort_keys=True).encode('utf-8')).hexdigest()
+
+def validation_cache_key(element_kind, context, content_digest):
+    '''Returns the key for the results of validating an element.
+    `context` is a JSON-serializable list of everything (other than the
+    element's own content) that the checks of the element depend upon.
+    '''
+    s = json.dumps([VERSION, element_kind, context, content_digest])
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+class ValidationCache(object):
+    '''Stores the outcome of validating the elements (the nexml metadata,
+    each otus group and each tree) of by-ID NexSON, keyed by a digest of the
+    element's content and of the context its validation depends on.
+
+    Pass the same ValidationCache as the `validation_cache` keyword argument
+    of validate_nexson (or ot_validate) when validating successive versions
+    of a study: elements that are unchanged since a previous call are not
+    re-checked, and their stored messages are merged into the log, which is
+    the same as the log of a full validation.
+
+    The entries are JSON-serializable, so a cache can be persisted with
+        write_as_json(cache.as_dict(), filepath)
+    and restored with
+        ValidationCache(entries=read_as_json(filepath))
+    If `max_entries` is not None, the least recently used entries beyond
+    that number are discarded.
+    '''
+    def __init__(self, entries=None, max_entries=None):
+        self._entries = OrderedDict()
+        if entries:
+            for k in sorted(entries.keys()):
+                self._entries[k] = entries[k]
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._trim()
+    def __len__(self):
+        return len(self._entries)
+    def __contains__(self, key):
+        return key in self._entries
+    def _trim(self):
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    def get(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries[key] = entry
+        return entry
+    def put(self, key, entry):
+        self._entries.pop(key, None)
+        self._entries[key] = entry
+        self._trim()
+    def clear(self):
+        self._entries.clear()
+    def as_dict(self):
+        return dict(self._entries)
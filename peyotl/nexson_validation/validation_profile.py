@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+'''Opt-in instrumentation of NexSON validation.
+
+A ValidationProfile records the number of calls and the wall time spent in
+each phase of validation (schema checks, parsing of badgerfish meta elements,
+ID registration, OTT ID duplicate detection...) for each type of element
+(see _NEXEL.CODE_TO_STR). Pass one as the `validation_profile` argument of
+validate_nexson; it is also available as the `profile` attribute of the log.
+
+Profiles can be merged (and round-tripped through as_dict/from_dict) so that
+the timings for a whole corpus can be collected, see validate_corpus.
+'''
+from peyotl.nexson_validation.helper import _NEXEL
+from timeit import default_timer
+
+# (adaptor method name, phase, element type or function of the call args -> element type)
+_INSTRUMENTED_METHODS = (
+    ('_validate_id_obj_list_by_schema', 'schema', lambda a, kw: a[1].curr_element_type),
+    ('_bf_meta_list_to_dict', 'bf_meta', lambda a, kw: a[2].curr_element_type),
+    ('_register_nexson_id', 'id_registry', lambda a, kw: a[2].curr_element_type),
+    ('_warn_event', 'messages', lambda a, kw: a[0]),
+    ('_error_event', 'messages', lambda a, kw: a[0]),
+    ('_post_key_check_validate_nexml_obj', 'post_key_check', _NEXEL.NEXML),
+    ('_post_key_check_validate_otus_obj', 'post_key_check', _NEXEL.OTUS),
+    ('_post_key_check_validate_otu_id_obj_list', 'post_key_check', _NEXEL.OTU),
+    ('_post_key_check_validate_tree_group', 'post_key_check', _NEXEL.TREES),
+    ('_post_key_check_validate_tree', 'post_key_check', _NEXEL.TREE),
+    ('_validate_otu_key_if_present', 'otu_refs', _NEXEL.NODE),
+    ('_detect_multilabelled_tree', 'ott_duplicates', _NEXEL.TREE),
+    ('_generate_ott_warnings', 'ott_duplicates', _NEXEL.OTUS),
+    # only present in the by-ID adaptor. Checks run in the worker processes are not profiled
+    ('_validate_trees_in_pool', 'tree_pool', _NEXEL.TREES),
+)
+
+class ValidationProfile(object):
+    '''Call counts and wall times keyed by (element type name, phase).
+    "seconds" is inclusive (it contains the time of the phases that
+    ran within the call) and "self_seconds" excludes them, so the
+    self_seconds of all phases sum to the total validation time.
+    '''
+    def __init__(self):
+        self.num_studies = 0
+        self._records = {} # (element type name, phase) -> [calls, seconds, self_seconds]
+        self._stack = [] # [start time, time spent in nested phases] pairs
+    def _start(self):
+        self._stack.append([default_timer(), 0.0])
+    def _stop(self, element_type, phase):
+        start, nested = self._stack.pop()
+        elapsed = default_timer() - start
+        if self._stack:
+            self._stack[-1][1] += elapsed
+        key = (_NEXEL.CODE_TO_STR.get(element_type, str(element_type)), phase)
+        r = self._records.get(key)
+        if r is None:
+            r = [0, 0.0, 0.0]
+            self._records[key] = r
+        r[0] += 1
+        r[1] += elapsed
+        r[2] += elapsed - nested
+    def _wrap(self, method, phase, element_type):
+        if callable(element_type):
+            get_element_type = element_type
+        else:
+            get_element_type = lambda a, kw: element_type
+        def timed(*valist, **kwargs):
+            self._start()
+            try:
+                return method(*valist, **kwargs)
+            finally:
+                self._stop(get_element_type(valist, kwargs), phase)
+        return timed
+    def instrument(self, adaptor):
+        '''Replaces the checks of `adaptor` with timed versions (as instance attributes).'''
+        for name, phase, element_type in _INSTRUMENTED_METHODS:
+            method = getattr(adaptor, name, None)
+            if method is not None:
+                setattr(adaptor, name, self._wrap(method, phase, element_type))
+    def uninstrument(self, adaptor): #pylint: disable=R0201
+        for name in set([i[0] for i in _INSTRUMENTED_METHODS]):
+            adaptor.__dict__.pop(name, None)
+    def start_study(self):
+        self.num_studies += 1
+        self._start()
+    def end_study(self):
+        self._stop(_NEXEL.TOP_LEVEL, 'total')
+    def merge(self, other):
+        '''Adds the counts and times of `other` (a ValidationProfile or a dict from as_dict) to self.'''
+        if not isinstance(other, ValidationProfile):
+            other = ValidationProfile.from_dict(other)
+        self.num_studies += other.num_studies
+        for key, o in other._records.items(): #pylint: disable=W0212
+            r = self._records.get(key)
+            if r is None:
+                self._records[key] = list(o)
+            else:
+                for i in range(3):
+                    r[i] += o[i]
+        return self
+    def get(self, element_type_name, phase):
+        '''Returns a dict with "calls", "seconds" and "self_seconds" (or None)'''
+        r = self._records.get((element_type_name, phase))
+        if r is None:
+            return None
+        return {'calls': r[0], 'seconds': r[1], 'self_seconds': r[2]}
+    def as_dict(self):
+        d = {}
+        for (et, phase), r in self._records.items():
+            d.setdefault(et, {})[phase] = {'calls': r[0], 'seconds': r[1], 'self_seconds': r[2]}
+        return {'num_studies': self.num_studies, 'timings': d}
+    @staticmethod
+    def from_dict(d):
+        p = ValidationProfile()
+        p.num_studies = d.get('num_studies', 0)
+        for et, by_phase in d.get('timings', {}).items():
+            for phase, r in by_phase.items():
+                p._records[(et, phase)] = [r['calls'], r['seconds'], r['self_seconds']] #pylint: disable=W0212
+        return p
+    def as_rows(self):
+        '''Returns a list of (element type name, phase, calls, seconds, self_seconds)
+        tuples sorted by decreasing self_seconds.
+        '''
+        rows = [(k[0], k[1], r[0], r[1], r[2]) for k, r in self._records.items()]
+        rows.sort(key=lambda x: (-x[4], x[0], x[1]))
+        return rows
+    def write_table(self, out):
+        out.write('{e:<14} {p:<16} {c:>10} {s:>12} {t:>12}\n'.format(e='element',
+                                                                   p='phase',
+                                                                   c='calls',
+                                                                   s='seconds',
+                                                                   t='self'))
+        for et, phase, calls, secs, self_secs in self.as_rows():
+            out.write('{e:<14} {p:<16} {c:>10d} {s:12.4f} {t:12.4f}\n'.format(e=et,
+                                                                           p=phase,
+                                                                           c=calls,
+                                                                           s=secs,
+                                                                           t=self_secs))
@@ -1,8 +1,8 @@
 #!/usr/bin/env python
 from __future__ import absolute_import, print_function, division
-from peyotl.phylo.entities import OTULabelStyleEnum
+from peyotl.phylo.entities import OTULabelStyleEnum, MISSING_OTT_ID
 from peyotl.nexson_syntax import quote_newick_name
-from peyotl.phylo.tree import create_tree_from_id2par
+from peyotl.phylo.tree import create_tree_from_id2par, IndexedTree
 from peyotl.utility.str_util import is_str_type
 from peyotl.utility import get_config_object, get_logger
 import pickle
@@ -82,10 +82,13 @@ def write_newick_ott(out, ott, ott_id2children, root_ott_id, label_style, prune_
             out.write(')')
             last_children.remove(ott_id)
     out.write(';')
+def _transitional_children(node):
+    return node.children
+
 class _TransitionalNode(object):
     def __init__(self, ott_id=None, par=None):
         self.par = par
-        #self.ott_id = ott_id
+        self.ott_id = ott_id
         self.children = None
         self.preorder_number = None
         if par is not None:
@@ -95,37 +98,45 @@ class _TransitionalNode(object):
             self.children = [c]
         else:
             self.children.append(c)
-    def number_tree(self, n):
-        self.preorder_number = n
-        if self.children is None:
-            return n + 1
-        n += 1
-        for c in self.children:
-            n = c.number_tree(n)
-        return n
+    def indexed_tree(self):
+        '''Returns an IndexedTree of the subtree of this node (numbered without recursion)'''
+        return IndexedTree.from_children(self, _transitional_children)
+    def number_tree(self, n, indexed=None):
+        '''Sets the preorder_number of the nodes in this subtree (starting with
+        `n` for this node). Returns the next unused number.
+        '''
+        if indexed is None:
+            indexed = self.indexed_tree()
+        for i, node in enumerate(indexed.order):
+            node.preorder_number = n + i
+        return n + len(indexed)
     def fill_preorder2tuples(self, r_sib_pn, preorder2tuples):
-        ppn = self.par.preorder_number
-        pn = self.preorder_number
-        if self.children is None:
-            t = (ppn, r_sib_pn)
-        else:
-            curr_c = self.children[0]
-            left_child_pn = curr_c.preorder_number
-            for r_sib in self.children[1:]:
-                right_pn = r_sib.preorder_number
-                curr_c.fill_preorder2tuples(right_pn, preorder2tuples)
-                curr_c = r_sib
-            curr_c.fill_preorder2tuples(None, preorder2tuples)
-            right_child_pn = curr_c.preorder_number
-            t = (ppn, r_sib_pn, left_child_pn, right_child_pn)
-        assert pn not in preorder2tuples
-        preorder2tuples[pn] = t
+        '''Adds the preorder2tuple entries of this (numbered) subtree.
+        `r_sib_pn` is the preorder number of the next sib of this node.
+        '''
+        stack = [(self, r_sib_pn)]
+        while stack:
+            node, r_sib_pn = stack.pop()
+            ppn = None if node.par is None else node.par.preorder_number
+            pn = node.preorder_number
+            if node.children is None:
+                t = (ppn, r_sib_pn)
+            else:
+                children = node.children
+                t = (ppn, r_sib_pn, children[0].preorder_number, children[-1].preorder_number)
+                stack.append((children[-1], None))
+                for i in range(len(children) - 2, -1, -1):
+                    stack.append((children[i], children[i + 1].preorder_number))
+            assert pn not in preorder2tuples
+            preorder2tuples[pn] = t
     def create_leaf_set(self, leaves):
-        if self.children:
-            for c in self.children:
-                c.create_leaf_set(leaves)
-        elif self.ott_id is not None:
-            leaves.add(self.ott_id)
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.children:
+                stack.extend(node.children)
+            elif node.ott_id is not None:
+                leaves.add(node.ott_id)
 
 _CACHES = {'ottid2parentottid': ('ottID2parentOttId', 'ott ID-> parent\'s ott ID. root maps to -1', ),
            'ottid2preorder': ('ottID2preorder', 'ott ID -> preorder #', ),
@@ -556,13 +567,14 @@ class OTT(object):
         tt = make_tree_from_taxonomy(id2par)
         _LOG.debug('preorder numbering nodes')
         root = tt[root_ott_id]
-        root.number_tree(0)
+        indexed = root.indexed_tree()
+        root.number_tree(0, indexed=indexed)
         _LOG.debug('creating ott_id <--> preorder maps')
         ott_id2preorder = {}
         preorder2ott_id = {}
-        for ott_id, node in tt.items():
-            ott_id2preorder[ott_id] = node.preorder_number
-            preorder2ott_id[node.preorder_number] = ott_id
+        for preorder_number, node in enumerate(indexed.order):
+            ott_id2preorder[node.ott_id] = preorder_number
+            preorder2ott_id[preorder_number] = node.ott_id
         ott_id2preorder['root_ott_id'] = root_ott_id
         ott_id2preorder['root'] = root.preorder_number
         preorder2ott_id['root'] = root_ott_id
@@ -582,10 +594,7 @@ class OTT(object):
         _write_pickle(out_dir, 'taxonomicSources', sources)
 
         _LOG.debug('creating tree representation with preorder # to tuples')
-        preorder2tuples = {}
-        root.par = _TransitionalNode() # fake parent of root
-        root.par.preorder_number = None
-        root.fill_preorder2tuples(None, preorder2tuples)
+        preorder2tuples = indexed.preorder2tuples()
         preorder2tuples['root'] = root.preorder_number
         _write_pickle(out_dir, 'preorder2tuple', preorder2tuples)
     def _write_root_properties(self, out_dir, name, ott_id):
@@ -624,8 +633,8 @@ class OTT(object):
             lineage.append(n)
             n = i2pi.get(n)
         return lineage
-    def induced_tree(self, ott_id_list):
-        return create_tree_from_id2par(self.ott_id2par_ott_id, ott_id_list)
+    def induced_tree(self, ott_id_list, compact_paths=False):
+        return create_tree_from_id2par(self.ott_id2par_ott_id, ott_id_list, compact_paths=compact_paths)
 
 if _PICKLE_AS_JSON:
     def _write_pickle(directory, fn, obj):
@@ -647,29 +656,34 @@ else:
         return pickle.load(open(fp, 'rb'))
 
 def _generate_parent(id2par, par_ott_id, ott2transitional):
-    par = ott2transitional.get(par_ott_id)
-    if par is not None:
-        return par
+    '''Returns the node for `par_ott_id`, creating it (and any of its ancestors
+    that are not in `ott2transitional`) if needed. Returns None for NONE_PAR.
+    '''
     if par_ott_id == NONE_PAR:
         return None
-    gp_id = id2par[par_ott_id]
-    gp = ott2transitional.get(gp_id)
-    if gp is None:
-        gp = _generate_parent(id2par, gp_id, ott2transitional)
-        if gp is None:
-            root = _TransitionalNode(ott_id=gp_id)
-            ott2transitional[gp_id] = root
-            return root
-    par = _TransitionalNode(ott_id=par_ott_id, par=gp)
-    ott2transitional[par_ott_id] = par
-    return par
+    missing = []
+    curr_id = par_ott_id
+    anc = ott2transitional.get(curr_id)
+    while anc is None:
+        missing.append(curr_id)
+        curr_id = id2par[curr_id]
+        if curr_id == NONE_PAR:
+            break
+        anc = ott2transitional.get(curr_id)
+    for ott_id in reversed(missing):
+        anc = _TransitionalNode(ott_id=ott_id, par=anc)
+        ott2transitional[ott_id] = anc
+    return anc
 
 def make_tree_from_taxonomy(id2par):
+    '''Returns a dict of OTT ID -> _TransitionalNode for the taxonomy in the
+    OTT ID -> parent OTT ID dict `id2par` (the root maps to NONE_PAR).
+    '''
     ott2transitional = {}
     for ott_id, par_ott_id in id2par.items():
-        par = _generate_parent(id2par, par_ott_id, ott2transitional)
-        nd = _TransitionalNode(ott_id=ott_id, par=par)
-        ott2transitional[ott_id] = nd
+        if ott_id not in ott2transitional:
+            par = _generate_parent(id2par, par_ott_id, ott2transitional)
+            ott2transitional[ott_id] = _TransitionalNode(ott_id=ott_id, par=par)
     return ott2transitional
 
 def make_ott_to_children(id2par):
@@ -694,38 +708,72 @@ class TaxonomyDes2AncLineage(object):
     def __repr__(self):
         return 'TaxonomyDes2AncLineage({l})'.format(l=repr(self._des_to_anc_list))
 
-def create_pruned_and_taxonomy_for_tip_ott_ids(tree_proxy, ott):
+def _tip_ott_id2par_from_columns(columns):
+    '''Returns (tip ott_ids, id2par) for the NexsonTreeColumns of a tree, with the
+    same content as the node loop of create_pruned_and_taxonomy_for_tip_ott_ids,
+    but without creating a proxy for every node.
+    '''
+    ott_ids = []
+    id2par = {}
+    node_ids, parent, first_child = columns.node_ids, columns.parent, columns.first_child
+    for index, ott_id in enumerate(columns.ott_ids):
+        p = parent[index]
+        parent_id = None if p < 0 else node_ids[p]
+        if first_child[index] >= 0:
+            id2par[node_ids[index]] = parent_id
+        elif ott_id != MISSING_OTT_ID:
+            ott_ids.append(ott_id)
+            id2par[ott_id] = parent_id
+    return ott_ids, id2par
+
+def create_pruned_and_taxonomy_for_tip_ott_ids(tree_proxy, ott, compact_paths=False, taxonomy_cache=None):
     '''returns a pair of trees:
         the first is that is a pruned version of tree_proxy created by pruning
             any leaf that has no ott_id and every internal that does not have
             any descendant with an ott_id. Nodes of out-degree 1 are suppressed
             as part of the TreeWithPathsInEdges-style.
         the second is the OTT induced tree for these ott_ids
+    If `compact_paths` is True, the path sets of both trees are freed (see
+        TreeWithPathsInEdges.compact_paths).
+    `taxonomy_cache` can be a dict (frozenset of ott_ids -> induced tree) that
+        is used to share the induced trees of trees with the same tips. The
+        cached trees are returned as is, so they must not be modified.
     '''
     # create and id2par that has ott IDs only at the tips (we are
     #   ignoring mappings at internal nodes.
     # OTT IDs are integers, and the nodeIDs are strings - so we should not get clashes.
     #TODO consider prefix scheme
-    ott_ids = []
-    ottId2OtuPar = {}
-    for node in tree_proxy:
-        if node.is_leaf:
-            ott_id = node.ott_id
-            if ott_id is not None:
-                ott_ids.append(ott_id)
-                assert isinstance(ott_id, int)
-                parent_id = node.parent._id
-                ottId2OtuPar[ott_id] = parent_id
-        else:
-            assert is_str_type(node._id)
-            edge = node.edge
-            if edge is not None:
-                parent_id = node.parent._id
-                ottId2OtuPar[node._id] = parent_id
+    columns = getattr(tree_proxy, 'columns', None)
+    if columns is not None:
+        ott_ids, ottId2OtuPar = _tip_ott_id2par_from_columns(columns())
+    else:
+        ott_ids = []
+        ottId2OtuPar = {}
+        for node in tree_proxy:
+            if node.is_leaf:
+                ott_id = node.ott_id
+                if ott_id is not None:
+                    ott_ids.append(ott_id)
+                    assert isinstance(ott_id, int)
+                    parent_id = node.parent._id
+                    ottId2OtuPar[ott_id] = parent_id
             else:
-                ottId2OtuPar[node._id] = None
-    pruned_phylo = create_tree_from_id2par(ottId2OtuPar, ott_ids)
-    taxo_tree = ott.induced_tree(ott_ids)
+                assert is_str_type(node._id)
+                edge = node.edge
+                if edge is not None:
+                    parent_id = node.parent._id
+                    ottId2OtuPar[node._id] = parent_id
+                else:
+                    ottId2OtuPar[node._id] = None
+    pruned_phylo = create_tree_from_id2par(ottId2OtuPar, ott_ids, compact_paths=compact_paths)
+    if taxonomy_cache is None:
+        taxo_tree = ott.induced_tree(ott_ids, compact_paths=compact_paths)
+    else:
+        k = frozenset(ott_ids)
+        taxo_tree = taxonomy_cache.get(k)
+        if taxo_tree is None:
+            taxo_tree = ott.induced_tree(ott_ids, compact_paths=compact_paths)
+            taxonomy_cache[k] = taxo_tree
     return pruned_phylo, taxo_tree
 
 
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 from peyotl.utility.str_util import is_str_type
 from peyotl.nexson_syntax import write_as_json
+from peyotl.nexson_syntax.fragment_index import NexsonFragmentIndex
 from peyotl.utility import get_logger
 import tempfile #@TEMPORARY for deprecated write_study
 import locket
@@ -242,6 +243,31 @@ class GitAction(object):
             return content, head_sha, d
         return content, head_sha
 
+    def path_for_fragment_index(self, study_id):
+        '''Returns the filepath of the fragment index "sidecar" for study_id.
+        These are kept in the .git dir, so that they are never committed.
+        '''
+        return os.path.join(self.git_dir, 'peyotl-fragment-index', study_id + '.json')
+
+    def return_study_fragment_index(self, study_id, branch='master', commit_sha=None):
+        """Return the
+            blob[0] NexsonFragmentIndex for the given study_id (None if the study does not exist),
+            blob[1] the SHA1 of the HEAD of branch (or `commit_sha`)
+        The caller should hold the lock until it is done reading from the index, because
+            the index reads from the working tree.
+        """
+        if commit_sha is None:
+            self.checkout(branch)
+            head_sha = get_HEAD_SHA1(self.git_dir)
+        else:
+            self.checkout(commit_sha)
+            head_sha = commit_sha
+        study_filepath = self.path_for_study(study_id)
+        if not os.path.exists(study_filepath):
+            return None, head_sha
+        index_filepath = self.path_for_fragment_index(study_id)
+        return NexsonFragmentIndex(study_filepath, index_filepath=index_filepath), head_sha
+
     def branch_exists(self, branch):
         """Returns true or false depending on if a branch exists"""
         try:
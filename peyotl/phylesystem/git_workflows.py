@@ -48,6 +48,11 @@ def validate_and_convert_nexson(nexson, output_version, allow_invalid, **kwargs)
     `output_version` is the version of nexson syntax to be used after validation.
     if `allow_invalid` is False, and the nexson validation has errors, then
         a GitWorkflowError will be generated before conversion.
+    `kwargs` are passed to ot_validate. Passing a long-lived ValidationCache as
+        `validation_cache` means that only the trees, otus groups and metadata
+        that differ from the previously validated version of a study are re-checked.
+        Passing `annotate=False, errors_only=True, fail_fast=True` is the quickest
+        way to check that a study has no errors (the annotation returned is None).
     '''
     try:
         if TRACE_FILES:
@@ -59,6 +64,8 @@ def validate_and_convert_nexson(nexson, output_version, allow_invalid, **kwargs)
         msg = 'exception in ot_validate: ' + traceback.format_exc()
         raise GitWorkflowError(msg)
     if (not allow_invalid) and validation_log.has_error():
+        if annotation is None:
+            raise GitWorkflowError('ot_validation failed: ' + json.dumps(validation_log.create_nexson_message_list()))
         raise GitWorkflowError('ot_validation failed: ' + json.dumps(annotation))
     nexson = convert_nexson_format(nexson, output_version)
     if TRACE_FILES:
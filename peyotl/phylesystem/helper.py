@@ -1,12 +1,4 @@
 from peyotl.utility import expand_path, get_logger, get_config_setting_kwargs
-import json
-try:
-    import anyjson
-except:
-    class Wrapper(object):
-        pass
-    anyjson = Wrapper()
-    anyjson.loads = json.loads
 from peyotl.phylesystem.git_actions import get_filepath_for_namespaced_id, \
                                            get_filepath_for_simple_id
 import os
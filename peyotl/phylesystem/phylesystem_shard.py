@@ -1,14 +1,7 @@
 from peyotl.utility import get_logger, get_config_setting_kwargs, write_to_filepath
 from peyotl.phylesystem.helper import DIGIT_PATTERN, create_id2study_info, diagnose_repo_study_id_convention
 from peyotl.utility.input_output import read_as_json, write_as_json
-import json
-try:
-    import anyjson
-except:
-    class Wrapper(object):
-        pass
-    anyjson = Wrapper()
-    anyjson.loads = json.loads
+from peyotl.utility.json_backend import json_loads
 from peyotl.phylesystem.git_actions import GitAction, ID_PATTERN
 from peyotl.nexson_syntax import detect_nexson_version
 import codecs
@@ -288,7 +281,7 @@ class PhylesystemShard(PhylesystemShardBase):
             fp = self.study_index.values()[0][2]
         _LOG.debug('diagnose_repo_nexml2json with fp={}'.format(fp))
         with codecs.open(fp, mode='r', encoding='utf-8') as fo:
-            fj = json.load(fo)
+            fj = json_loads(fo.read())
             return detect_nexson_version(fj)
 
     def _create_git_action_for_global_resource(self):
@@ -398,7 +391,7 @@ class PhylesystemShard(PhylesystemShardBase):
             if not self._is_alias(study_id):
                 with codecs.open(fp, 'r', 'utf-8') as fo:
                     try:
-                        nex_obj = anyjson.loads(fo.read())
+                        nex_obj = json_loads(fo.read())
                         yield (study_id, nex_obj)
                     except Exception:
                         pass
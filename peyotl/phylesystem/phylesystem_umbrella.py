@@ -3,14 +3,7 @@ try:
     from cStringIO import StringIO
 except ImportError:
     from io import StringIO
-import json
-try:
-    import anyjson
-except:
-    class Wrapper(object):
-        pass
-    anyjson = Wrapper()
-    anyjson.loads = json.loads
+from peyotl.utility.json_backend import json_loads
 try:
     from dogpile.cache.api import NO_VALUE
 except:
@@ -302,11 +295,30 @@ class _Phylesystem(_PhylesystemBase):
             content = blob[0]
             if content is None:
                 raise KeyError('Study {} not found'.format(study_id))
-            nexson = anyjson.loads(blob[0])
+            nexson = json_loads(blob[0])
             if return_WIP_map:
                 return nexson, blob[1], blob[2]
             return nexson, blob[1]
 
+    def return_study_content(self,
+                             study_id,
+                             schema,
+                             branch='master',
+                             commit_sha=None):
+        '''Returns (content, head_sha) where content is the result of converting the
+        study with the PhyloSchema `schema`.
+        Tree, subtree, otus, otu and meta content of by-ID NexSON studies is read
+        through a NexsonFragmentIndex, so the rest of the study is not parsed.
+        '''
+        ga = self.create_git_action(study_id)
+        with ga.lock():
+            fragment_index, head_sha = ga.return_study_fragment_index(study_id,
+                                                                      branch=branch,
+                                                                      commit_sha=commit_sha)
+            if fragment_index is None:
+                raise KeyError('Study {} not found'.format(study_id))
+            return schema.convert(fragment_index), head_sha
+
     def get_blob_sha_for_study_id(self, study_id, head_sha):
         ga = self.create_git_action(study_id)
         studypath = ga.path_for_study(study_id)
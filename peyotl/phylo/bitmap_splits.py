@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+'''Splits (leaf sets of the subtrees of a tree) stored as rows of a packed
+matrix of numpy.uint64 words, for trees with too many leaves for the
+arbitrary-precision ints of TreeWithPathsInEdges.add_bits4subtree_ids.
+
+SplitBitmaps.compare(bitmap) compares one split with every split in the set
+at once, returning the SplitComparison value (as an integer) that
+compare_bits_as_splits would return for each. Rows can also be looked up
+by value (index_of), using the bytes of the bitmap as the hash key.
+
+    leaf2bit, taxo_splits = tree_split_bitmaps(taxo_tree)
+    phylo_leaf2bit, phylo_splits = tree_split_bitmaps(phylo, leaf2bit)
+    codes = taxo_splits.compare(phylo_splits.bitmap(0))
+
+Requires the numpy package (an optional dependency of peyotl).
+'''
+from peyotl.phylo.compat import SplitComparison
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_WORD_BITS = 64
+_WORD_MASK = (1 << _WORD_BITS) - 1
+_UNROOTED_INCOMPATIBLE = SplitComparison.UNROOTED_INCOMPATIBLE.value
+_UNROOTED_COMPAT = SplitComparison.UNROOTED_COMPAT.value
+_ROOTED_COMPAT = SplitComparison.ROOTED_COMPAT.value
+_UNROOTED_EQUIVALENT = SplitComparison.UNROOTED_EQUIVALENT.value
+_ROOTED_EQUIVALENT = SplitComparison.ROOTED_EQUIVALENT.value
+
+if numpy is not None:
+    _POPCOUNT8 = numpy.array([bin(i).count('1') for i in range(256)], dtype=numpy.uint8)
+
+def _require_numpy():
+    if numpy is None:
+        raise ImportError('The "numpy" package is required for bitmap splits')
+
+def num_words_for(num_leaves):
+    return max(1, (num_leaves + _WORD_BITS - 1) // _WORD_BITS)
+
+def int_to_bitmap(bits, num_words):
+    '''Converts the python int `bits` (bit i for leaf i) to a uint64 array'''
+    _require_numpy()
+    b = numpy.zeros(num_words, dtype=numpy.uint64)
+    w = 0
+    while bits and w < num_words:
+        b[w] = numpy.uint64(bits & _WORD_MASK)
+        bits >>= _WORD_BITS
+        w += 1
+    return b
+
+def bitmap_to_int(bitmap):
+    r = 0
+    for w in reversed(range(len(bitmap))):
+        r = (r << _WORD_BITS) | int(bitmap[w])
+    return r
+
+def full_bitmap(num_leaves):
+    '''Returns the bitmap with the bits for leaves 0 ... num_leaves - 1 set'''
+    return int_to_bitmap((1 << num_leaves) - 1, num_words_for(num_leaves))
+
+def _popcounts(words):
+    '''Number of set bits in each element of the uint64 array `words`'''
+    return _POPCOUNT8[words.view(numpy.uint8)].reshape(-1, 8).sum(axis=1, dtype=numpy.int64)
+
+class SplitBitmaps(object):
+    '''A list of splits over the same leaves (a num_splits x num_words uint64 matrix).
+    `labels` (e.g. the nodes that display the splits) is a list parallel to the rows.
+    `universe` is the bitmap of all of the leaves (by default the first
+    num_leaves bits); it is the "el_universe" of compare_bits_as_splits.
+
+    `intervals` is an optional (first bit, last bit, number of bits) tuple
+    of int arrays for the rows. A row whose bits are exactly the range
+    first...last (as is every split of a tree whose leaves are numbered in
+    postorder, see tree_split_bitmaps) is compared from the counts of bits
+    of the other split, without reading the row itself.
+    '''
+    def __init__(self, num_leaves, rows=None, labels=None, universe=None, intervals=None):
+        _require_numpy()
+        self.num_leaves = num_leaves
+        self.num_words = num_words_for(num_leaves)
+        if rows is None:
+            rows = numpy.zeros((0, self.num_words), dtype=numpy.uint64)
+        assert rows.shape[1] == self.num_words
+        self._rows = rows
+        self.labels = labels
+        self.universe = full_bitmap(num_leaves) if universe is None else universe
+        self.universe_size = int(_popcounts(self.universe).sum())
+        self._key2index = None
+        self._sizes = None
+        self._interval_rows, self._general_rows = None, numpy.arange(len(rows))
+        if intervals is not None:
+            first, last, sizes = [numpy.asarray(i, dtype=numpy.int64) for i in intervals]
+            self._sizes = sizes
+            is_interval = (last - first + 1) == sizes
+            self._interval_rows = numpy.nonzero(is_interval)[0]
+            self._general_rows = numpy.nonzero(~is_interval)[0]
+            first, last = first[self._interval_rows], last[self._interval_rows]
+            self._first_word = first // _WORD_BITS
+            self._last_word = last // _WORD_BITS
+            ones = numpy.full(len(first), _WORD_MASK, dtype=numpy.uint64)
+            self._first_mask = numpy.left_shift(ones, (first % _WORD_BITS).astype(numpy.uint64))
+            self._last_mask = numpy.right_shift(ones, (_WORD_BITS - 1 - last % _WORD_BITS).astype(numpy.uint64))
+            self._one_word = self._first_word == self._last_word
+            self._both_masks = numpy.where(self._one_word, self._first_mask & self._last_mask, self._first_mask)
+    @staticmethod
+    def from_ints(num_leaves, bit_ints, labels=None):
+        '''Builds the set from python int bitmasks (e.g. the bits4subtree_ids of nodes)'''
+        num_words = num_words_for(num_leaves)
+        rows = numpy.zeros((len(bit_ints), num_words), dtype=numpy.uint64)
+        for i, b in enumerate(bit_ints):
+            rows[i] = int_to_bitmap(b, num_words)
+        return SplitBitmaps(num_leaves, rows=rows, labels=labels)
+    def __len__(self):
+        return self._rows.shape[0]
+    @property
+    def rows(self):
+        return self._rows
+    def bitmap(self, index):
+        return self._rows[index]
+    @staticmethod
+    def key(bitmap):
+        '''Hashable form of a bitmap'''
+        return bitmap.tobytes()
+    def index_of(self, bitmap):
+        '''Returns the index of the first row equal to `bitmap` (or None)'''
+        if self._key2index is None:
+            k2i = {}
+            for i in range(len(self)):
+                k2i.setdefault(self._rows[i].tobytes(), i)
+            self._key2index = k2i
+        return self._key2index.get(bitmap.tobytes())
+    @property
+    def sizes(self):
+        '''Number of leaves in each split'''
+        if self._sizes is None:
+            self._sizes = _popcounts(self._rows.reshape(-1)).reshape(self._rows.shape).sum(axis=1)
+        return self._sizes
+    def _compare_intervals(self, bitmap, n_bitmap):
+        # bits of the bitmap in words [0, k) for each k
+        prefix = numpy.zeros(self.num_words + 1, dtype=numpy.int64)
+        numpy.cumsum(_popcounts(bitmap), out=prefix[1:])
+        fw, lw = self._first_word, self._last_word
+        n_inter = _popcounts(bitmap[fw] & self._both_masks)
+        inner = ~self._one_word
+        n_inter[inner] += prefix[lw[inner]] - prefix[fw[inner] + 1]
+        n_inter[inner] += _popcounts(bitmap[lw[inner]] & self._last_mask[inner])
+        return self._codes_from_counts(n_inter, self._sizes[self._interval_rows], n_bitmap)
+    def _codes_from_counts(self, n_inter, n_row, n_bitmap):
+        # The comparison is decided by the sizes of the splits and of their
+        #   intersection (both splits are subsets of the universe).
+        disjoint = n_inter == 0
+        row_in_bitmap = n_inter == n_row
+        bitmap_in_row = n_inter == n_bitmap
+        covers_universe = (n_row + (n_bitmap - self.universe_size)) == n_inter
+        result = numpy.full(len(n_inter), _UNROOTED_INCOMPATIBLE, dtype=numpy.uint8)
+        result[covers_universe] = _UNROOTED_COMPAT
+        nested = (row_in_bitmap | bitmap_in_row) & ~disjoint
+        result[nested] = _ROOTED_COMPAT
+        result[nested & row_in_bitmap & bitmap_in_row] = _ROOTED_EQUIVALENT
+        result[disjoint] = _UNROOTED_COMPAT
+        result[disjoint & covers_universe] = _UNROOTED_EQUIVALENT
+        return result
+    def _compare_rows(self, rows, bitmap):
+        inter = rows & bitmap
+        disjoint = ~inter.any(axis=1)
+        row_in_bitmap = (inter == rows).all(axis=1)
+        bitmap_in_row = (inter == bitmap).all(axis=1)
+        covers_universe = ((rows | bitmap) == self.universe).all(axis=1)
+        result = numpy.full(len(rows), _UNROOTED_INCOMPATIBLE, dtype=numpy.uint8)
+        result[covers_universe] = _UNROOTED_COMPAT
+        nested = (row_in_bitmap | bitmap_in_row) & ~disjoint
+        result[nested] = _ROOTED_COMPAT
+        result[nested & row_in_bitmap & bitmap_in_row] = _ROOTED_EQUIVALENT
+        result[disjoint] = _UNROOTED_COMPAT
+        result[disjoint & covers_universe] = _UNROOTED_EQUIVALENT
+        return result
+    def compare(self, bitmap):
+        '''Returns an array of the SplitComparison values (as ints) of
+        compare_bits_as_splits(bitmap, row, universe) for every row.
+        '''
+        if self._interval_rows is None:
+            return self._compare_rows(self._rows, bitmap)
+        result = numpy.empty(len(self), dtype=numpy.uint8)
+        if len(self._interval_rows):
+            n_bitmap = int(_popcounts(bitmap).sum())
+            result[self._interval_rows] = self._compare_intervals(bitmap, n_bitmap)
+        if len(self._general_rows):
+            result[self._general_rows] = self._compare_rows(self._rows[self._general_rows], bitmap)
+        return result
+    def incompatible_with(self, bitmap):
+        '''Returns a boolean array that is True for the rows that conflict with
+        `bitmap` on any rooting.
+        '''
+        return self.compare(bitmap) == _UNROOTED_INCOMPATIBLE
+
+def tree_split_bitmaps(tree, leaf2bit=None):
+    '''Returns (leaf2bit, SplitBitmaps) for the internal nodes of `tree` (any
+    tree with postorder_node_iter, e.g. TreeWithPathsInEdges or CompactTree).
+    The labels of the SplitBitmaps are the internal nodes, in postorder.
+    If `leaf2bit` (leaf ID -> bit index) is not supplied, the leaves are
+    numbered in postorder. Leaves that are not in a supplied leaf2bit are
+    ignored (as in add_bits4subtree_ids).
+    '''
+    _require_numpy()
+    nodes = [nd for nd in tree.postorder_node_iter()]
+    if leaf2bit is None:
+        leaf2bit = {}
+        for nd in nodes:
+            if nd.is_leaf:
+                leaf2bit[nd._id] = len(leaf2bit)
+    num_leaves = 1 + max(leaf2bit.values()) if leaf2bit else 0
+    num_words = num_words_for(num_leaves)
+    internals = [nd for nd in nodes if not nd.is_leaf]
+    node2row = {}
+    for i, nd in enumerate(internals):
+        node2row[nd] = i
+    rows = numpy.zeros((len(internals), num_words), dtype=numpy.uint64)
+    first = [num_leaves] * len(internals)
+    last = [-1] * len(internals)
+    sizes = [0] * len(internals)
+    for nd in nodes:
+        par = nd.parent
+        if par is None:
+            continue
+        pr = node2row[par]
+        if nd.is_leaf:
+            b = leaf2bit.get(nd._id)
+            if b is not None:
+                rows[pr, b // _WORD_BITS] |= numpy.uint64(1 << (b % _WORD_BITS))
+                if b < first[pr]:
+                    first[pr] = b
+                if b > last[pr]:
+                    last[pr] = b
+                sizes[pr] += 1
+        else:
+            r = node2row[nd]
+            rows[pr] |= rows[r]
+            if first[r] < first[pr]:
+                first[pr] = first[r]
+            if last[r] > last[pr]:
+                last[pr] = last[r]
+            sizes[pr] += sizes[r]
+    # empty splits (no leaf with a bit) are not intervals
+    last = [l if l >= 0 else num_leaves for l in last]
+    return leaf2bit, SplitBitmaps(num_leaves, rows=rows, labels=internals, intervals=(first, last, sizes))
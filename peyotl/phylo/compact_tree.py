@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+'''A memory-efficient, read-only tree for large newick inputs (e.g. synthetic
+trees or OTT dumps with millions of tips).
+
+Rather than one Node object per node, CompactTree stores parallel arrays
+of integers (parent, first child and next sibling indices) and a list of
+labels. Nodes are numbered in preorder, as they are created from the events
+of a NewickEventFactory. CompactNode objects are lightweight views that
+are only created when nodes are iterated over or looked up, so the
+preorder_node_iter/postorder_node_iter/leaf_ids API of TreeWithPathsInEdges
+is available; the *_index_iter methods avoid creating them.
+
+    tree = parse_newick(filepath=fp, _class=CompactTree)
+'''
+from peyotl.utility.tokenizer import NewickEvents
+from array import array
+_NO_NODE = -1
+
+class CompactNode(object):
+    '''View of node `index` of a CompactTree'''
+    __slots__ = ('_tree', '_index')
+    def __init__(self, tree, index):
+        self._tree = tree
+        self._index = index
+    def __eq__(self, other):
+        return isinstance(other, CompactNode) and other._tree is self._tree and other._index == self._index
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    def __hash__(self):
+        return hash((id(self._tree), self._index))
+    @property
+    def index(self):
+        return self._index
+    @property
+    def _id(self):
+        return self._tree._labels[self._index]
+    @property
+    def edge_info(self):
+        return self._tree.edge_info(self._index)
+    @property
+    def parent(self):
+        p = self._tree._parent[self._index]
+        return None if p == _NO_NODE else self.__class__(self._tree, p)
+    _parent = parent
+    @property
+    def is_leaf(self):
+        return self._tree._first_child[self._index] == _NO_NODE
+    @property
+    def _children(self):
+        return [self.__class__(self._tree, i) for i in self._tree.child_index_iter(self._index)]
+    def child_iter(self):
+        t = self._tree
+        return (self.__class__(t, i) for i in t.child_index_iter(self._index))
+    def children_iter(self, filter_fn=None):
+        for c in self.child_iter():
+            if filter_fn is None or filter_fn(c):
+                yield c
+    def preorder_iter(self, filter_fn=None):
+        t = self._tree
+        for i in t.preorder_index_iter(self._index):
+            n = self.__class__(t, i)
+            if filter_fn is None or filter_fn(n):
+                yield n
+    def postorder_iter(self, filter_fn=None):
+        t = self._tree
+        for i in t.postorder_index_iter(self._index):
+            n = self.__class__(t, i)
+            if filter_fn is None or filter_fn(n):
+                yield n
+    def before_after_iter(self):
+        t = self._tree
+        for i, depth, is_entering in t.before_after_index_iter(self._index):
+            yield self.__class__(t, i), depth, is_entering
+    def leaf_iter(self):
+        t = self._tree
+        return (self.__class__(t, i) for i in t.leaf_index_iter(self._index))
+
+class CompactTree(object):
+    # the class of the node views (subclasses of CompactNode)
+    _node_class = CompactNode
+    def __init__(self, newick_events=None):
+        self._parent = array('i')
+        self._first_child = array('i')
+        self._next_sib = array('i')
+        self._labels = []
+        self._edge_info = None # dict of node index -> edge info, created if the input has any
+        self._label2index = None # built on the first call of find_node
+        if newick_events is not None:
+            self._build_from_newick_events(newick_events)
+    def _new_node(self, par, label):
+        n = len(self._parent)
+        self._parent.append(par)
+        self._first_child.append(_NO_NODE)
+        self._next_sib.append(_NO_NODE)
+        self._labels.append(label)
+        return n
+    def _set_edge_info(self, index, edge_info):
+        if self._edge_info is None:
+            self._edge_info = {}
+        self._edge_info[index] = edge_info
+    def _build_from_newick_events(self, ev):
+        iev = iter(ev)
+        assert next(iev)['type'] == NewickEvents.OPEN_SUBTREE
+        parent, first_child, next_sib = self._parent, self._first_child, self._next_sib
+        curr = self._new_node(_NO_NODE, None)
+        prev = NewickEvents.OPEN_SUBTREE
+        for event in iev:
+            t = event['type']
+            if t == NewickEvents.CLOSE_SUBTREE:
+                curr = parent[curr]
+                x = event.get('label')
+                if x is not None:
+                    self._labels[curr] = x
+            else:
+                label = event.get('label') if t == NewickEvents.TIP else None
+                if prev == NewickEvents.OPEN_SUBTREE:
+                    n = self._new_node(curr, label)
+                    first_child[curr] = n
+                else:
+                    n = self._new_node(parent[curr], label)
+                    next_sib[curr] = n
+                curr = n
+            if t != NewickEvents.OPEN_SUBTREE:
+                e = event.get('edge_info')
+                if e is not None:
+                    self._set_edge_info(curr, e)
+            prev = t
+        assert curr == 0
+    def __len__(self):
+        return len(self._parent)
+    @property
+    def root(self):
+        return self._node_class(self, 0) if self._parent else None
+    def label(self, index):
+        return self._labels[index]
+    def edge_info(self, index):
+        if self._edge_info is None:
+            return None
+        return self._edge_info.get(index)
+    def parent_index(self, index):
+        return self._parent[index]
+    def is_leaf_index(self, index):
+        return self._first_child[index] == _NO_NODE
+    def child_index_iter(self, index):
+        next_sib = self._next_sib
+        c = self._first_child[index]
+        while c != _NO_NODE:
+            yield c
+            c = next_sib[c]
+    def preorder_index_iter(self, index=0):
+        '''Indices of the nodes of the subtree rooted at `index` in preorder (no stack is used).'''
+        if not self._parent:
+            return
+        if index == 0:
+            # nodes are numbered in preorder
+            for i in range(len(self._parent)):
+                yield i
+            return
+        parent, first_child, next_sib = self._parent, self._first_child, self._next_sib
+        n = index
+        while True:
+            yield n
+            c = first_child[n]
+            if c != _NO_NODE:
+                n = c
+                continue
+            while n != index and next_sib[n] == _NO_NODE:
+                n = parent[n]
+            if n == index:
+                return
+            n = next_sib[n]
+    def postorder_index_iter(self, index=0):
+        '''Indices of the nodes of the subtree rooted at `index` in postorder (no stack is used).'''
+        if not self._parent:
+            return
+        parent, first_child, next_sib = self._parent, self._first_child, self._next_sib
+        n = index
+        while True:
+            c = first_child[n]
+            while c != _NO_NODE:
+                n = c
+                c = first_child[n]
+            yield n
+            while n != index and next_sib[n] == _NO_NODE:
+                n = parent[n]
+                yield n
+            if n == index:
+                return
+            n = next_sib[n]
+    def before_after_index_iter(self, index=0):
+        '''Yields (node index, depth, is_entering) for the subtree rooted at
+        `index` (at depth 0). Internal nodes are yielded before (is_entering=True)
+        and after (is_entering=False) their descendants; leaves only once.
+        No stack is used.
+        '''
+        if not self._parent:
+            return
+        parent, first_child, next_sib = self._parent, self._first_child, self._next_sib
+        n = index
+        depth = 0
+        while True:
+            yield n, depth, True
+            c = first_child[n]
+            if c != _NO_NODE:
+                n = c
+                depth += 1
+                continue
+            while n != index and next_sib[n] == _NO_NODE:
+                n = parent[n]
+                depth -= 1
+                yield n, depth, False
+            if n == index:
+                return
+            n = next_sib[n]
+    def leaf_index_iter(self, index=0):
+        '''Indices of the leaves of the subtree rooted at `index`, in preorder'''
+        first_child = self._first_child
+        if index == 0:
+            # nodes are numbered in preorder
+            for i in range(len(first_child)):
+                if first_child[i] == _NO_NODE:
+                    yield i
+            return
+        for i in self.preorder_index_iter(index):
+            if first_child[i] == _NO_NODE:
+                yield i
+    @property
+    def leaf_ids(self):
+        return [i for i in self.leaf_id_iter()]
+    def leaf_id_iter(self):
+        labels = self._labels
+        return (labels[i] for i in self.leaf_index_iter())
+    @property
+    def leaves(self):
+        return set(self.leaf_id_iter())
+    def find_node(self, _id):
+        if self._label2index is None:
+            self._label2index = dict([(label, i) for i, label in enumerate(self._labels) if label is not None])
+        return self._node_class(self, self._label2index[_id])
+    def postorder_node_iter(self, nd=None, filter_fn=None):
+        if nd is None:
+            nd = self.root
+        return nd.postorder_iter(filter_fn=filter_fn)
+    def preorder_node_iter(self, nd=None, filter_fn=None):
+        if nd is None:
+            nd = self.root
+        return nd.preorder_iter(filter_fn=filter_fn)
+    def __iter__(self):
+        return self.preorder_node_iter()
+    def leaf_node_iter(self, nd=None):
+        if nd is None:
+            nd = self.root
+        return nd.leaf_iter()
+    def before_after_node_iter(self, nd=None):
+        if nd is None:
+            nd = self.root
+        return nd.before_after_iter()
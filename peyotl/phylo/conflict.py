@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+'''Conflict analysis of the edges of a source tree (e.g. a NexsonTreeProxy
+of a study tree) against a reference tree (the taxonomy or a synthetic tree).
+
+Every edge of the source tree is labelled with an UnrootedConflictStatus:
+    EQUIVALENT - the split is also in the reference tree ("supported"),
+    INCOMPATIBLE - the split conflicts with a split of the reference tree,
+    RESOLVES - the split is compatible with the reference tree but not in it,
+    TRIVIAL - one side of the split has at most one leaf ("terminal"), and
+    NOT_COMPARABLE - one side of the split has no leaf that is mapped to
+        the reference tree.
+Splits are compared as unrooted bipartitions of the leaves that are mapped to
+the same OTT ID in both trees. Source leaves are mapped by their ott_id (or
+by an OTT ID in their label, see ott_id_from_label), and reference nodes by
+the OTT ID in their label (or by their key in an OTT id -> parent id dict).
+
+    reference = ConflictReference(tree=parse_newick(filepath=synth_fp, _class=CompactTree))
+    status = reference.edge_status(NexsonProxy(filepath=fp).get_tree(tree_id))
+
+The reference is induced on the mapped leaves of each source tree, and both
+trees are rooted at the same leaf. Each source clade is then mapped to its
+MRCA in the reference and vice versa, so every edge is labelled in
+O(log(degree)) time from the children of its MRCA rather than by comparing
+leaf sets.
+'''
+from peyotl.phylo.compat import UnrootedConflictStatus
+from peyotl.phylo.compact_tree import CompactTree
+from peyotl.phylo.tree import IndexedTree
+from peyotl.utility.str_util import is_str_type
+from peyotl.utility import get_logger
+from peyotl.utility.worker_pool import imap_with_worker_state
+from bisect import bisect_left, bisect_right
+import re
+_LOG = get_logger(__name__)
+
+_OTT_ID_LABEL = re.compile(r'(?:^|[_ ])ott(\d+)$')
+
+def ott_id_from_label(label):
+    '''Returns the OTT ID of a node label: an int label, a label of digits,
+    or a label that is (or ends with "_" or " " followed by) "ott" and digits.
+    Returns None for other labels.
+    '''
+    if label is None:
+        return None
+    if not is_str_type(label):
+        return label
+    if label.isdigit():
+        return int(label)
+    m = _OTT_ID_LABEL.search(label)
+    if m is None:
+        return None
+    return int(m.group(1))
+
+def node_ott_id(node):
+    '''Returns the ott_id of `node` (e.g. a NexsonNodeProxy) or the OTT ID in its label'''
+    ott_id = getattr(node, 'ott_id', None)
+    if ott_id is None:
+        ott_id = ott_id_from_label(node._id)
+    return ott_id
+
+class ConflictReference(object):
+    '''The reference tree of a conflict analysis. Either `tree` (a tree with
+    OTT IDs in the labels of its nodes, e.g. from parse_newick, or a
+    CompactTree for large synthetic trees) or `id2par` (an OTT ID -> parent
+    OTT ID dict, such as OTT().ott_id2par_ott_id) must be supplied.
+    '''
+    def __init__(self, tree=None, id2par=None):
+        # only plain containers are stored, so that the reference can be
+        #   pickled for the worker processes of corpus_edge_status
+        self._id2par = None
+        self._parents = None
+        if id2par is not None:
+            self._id2par = id2par
+            self._key_for_ott_id = dict([(i, i) for i in id2par.keys()])
+        elif isinstance(tree, CompactTree):
+            self._parents = tree._parent
+            self._key_for_ott_id = self._index_labels(tree._labels)
+        elif tree is not None:
+            nodes = [nd for nd in tree.preorder_node_iter()]
+            self._parents = IndexedTree.from_nodes(nodes).parent
+            self._key_for_ott_id = self._index_labels([nd._id for nd in nodes])
+        else:
+            raise ValueError('Either a tree or id2par must be supplied')
+    def _parent_of(self, key):
+        if self._parents is None:
+            return self._id2par.get(key)
+        p = self._parents[key]
+        return p if p >= 0 else None
+    @staticmethod
+    def _index_labels(labels):
+        key_for_ott_id = {}
+        for i, label in enumerate(labels):
+            ott_id = ott_id_from_label(label)
+            if ott_id is not None:
+                key_for_ott_id.setdefault(ott_id, i)
+        return key_for_ott_id
+    def _induced_tree(self, keys):
+        '''Returns (reference keys, lists of neighbors, leaf flags) of the nodes
+        of the part of the reference that connects the nodes with the keys in
+        `keys`. Keys of nodes that are ancestors of others are not flagged as leaves.
+        '''
+        parent_of = self._parent_of
+        par = {}
+        for k in keys:
+            while k not in par:
+                p = parent_of(k)
+                par[k] = p
+                if p is None:
+                    break
+                k = p
+        nodes = list(par.keys())
+        index = {}
+        for i, k in enumerate(nodes):
+            index[k] = i
+        nbrs = [[] for _ in nodes]
+        has_child = [False] * len(nodes)
+        for i, k in enumerate(nodes):
+            p = par[k]
+            if p is not None:
+                j = index[p]
+                nbrs[i].append(j)
+                nbrs[j].append(i)
+                has_child[j] = True
+        is_leaf = [False] * len(nodes)
+        for k in keys:
+            i = index[k]
+            is_leaf[i] = not has_child[i]
+        return nodes, nbrs, is_leaf
+    def edge_status(self, source_tree):
+        '''Returns a dict of node ID -> UnrootedConflictStatus of the edge between
+        the node and its parent, for every non-root node of `source_tree` (a
+        NexsonTreeProxy, a tree from parse_newick or a CompactTree; the node
+        IDs are assumed to be unique).
+        '''
+        snodes = [nd for nd in iter(source_tree)]
+        sindex = {}
+        for i, nd in enumerate(snodes):
+            sindex[nd] = i
+        sparent = [-1] * len(snodes)
+        nbrs = [[] for _ in snodes]
+        for i, nd in enumerate(snodes[1:], 1):
+            p = sindex[nd.parent]
+            sparent[i] = p
+            nbrs[i].append(p)
+            nbrs[p].append(i)
+        # source leaf -> key in the reference (the first of the leaves with an OTT ID is used)
+        leaf_key = {}
+        used = set()
+        for i, nd in enumerate(snodes):
+            if nd.is_leaf:
+                k = self._key_for_ott_id.get(node_ott_id(nd))
+                if k is not None and k not in used:
+                    leaf_key[i] = k
+                    used.add(k)
+        status = self._status_of_source_edges(nbrs, leaf_key)
+        result = {}
+        for i in range(1, len(snodes)):
+            s = status.get((i, sparent[i]))
+            result[snodes[i]._id] = UnrootedConflictStatus.NOT_COMPARABLE if s is None else s
+        return result
+    def _status_of_source_edges(self, nbrs, leaf_key):
+        '''Returns a dict of (source node index, neighbor index) -> status for
+        each edge of the source tree that has mapped leaves on both sides.
+        '''
+        ref_keys, ref_nbrs, ref_is_leaf = self._induced_tree(leaf_key.values())
+        ref_index = {}
+        for i, k in enumerate(ref_keys):
+            ref_index[k] = i
+        # leaves that are mapped to an ancestor of another leaf are not used
+        is_mapped = [False] * len(nbrs)
+        for i, k in leaf_key.items():
+            is_mapped[i] = ref_is_leaf[ref_index[k]]
+        mapped = [i for i in range(len(nbrs)) if is_mapped[i]]
+        if len(mapped) < 2:
+            return {}
+        # both trees are rooted at the same leaf, x0
+        x0 = mapped[0]
+        src = IndexedTree.from_adjacency(nbrs, x0, is_mapped)
+        ref = IndexedTree.from_adjacency(ref_nbrs, ref_index[leaf_key[x0]], ref_is_leaf)
+        ref_leaf = dict([(ref_keys[ref.order[r]], r) for r in range(1, len(ref)) if not ref.children[r]])
+        # ref_lca[v] is the MRCA in the reference of the leaves below source node v (and vice versa)
+        ref_lca = [0] * len(src)
+        for v in range(len(src) - 1, 0, -1):
+            ch = src.children[v]
+            if ch:
+                a = ref_lca[ch[0]]
+                for c in ch[1:]:
+                    a = ref.lca(a, ref_lca[c])
+                ref_lca[v] = a
+            else:
+                ref_lca[v] = ref_leaf[leaf_key[src.order[v]]]
+        src_leaf = dict([(ref_lca[v], v) for v in range(1, len(src)) if not src.children[v]])
+        src_lca = [0] * len(ref)
+        for r in range(len(ref) - 1, 0, -1):
+            ch = ref.children[r]
+            if ch:
+                a = src_lca[ch[0]]
+                for c in ch[1:]:
+                    a = src.lca(a, src_lca[c])
+                src_lca[r] = a
+            else:
+                src_lca[r] = src_leaf[r]
+        num_leaves = src.num_leaves[0] + 1
+        # for each reference node: the src_lca of its children (sorted) and prefix sums of their sizes
+        children_by_src_lca = {}
+        status = {}
+        for v in range(1, len(src)):
+            n = src.num_leaves[v]
+            if n <= 1 or num_leaves - n <= 1:
+                s = UnrootedConflictStatus.TRIVIAL
+            else:
+                p = ref_lca[v]
+                ch = children_by_src_lca.get(p)
+                if ch is None:
+                    srt = sorted([(src_lca[c], ref.num_leaves[c]) for c in ref.children[p]])
+                    prefix = [0]
+                    for c in srt:
+                        prefix.append(prefix[-1] + c[1])
+                    ch = ([c[0] for c in srt], prefix)
+                    children_by_src_lca[p] = ch
+                keys, prefix = ch
+                # the children of p that are within the clade of v
+                lo = bisect_left(keys, v)
+                hi = bisect_right(keys, src.last[v])
+                if prefix[hi] - prefix[lo] != n:
+                    s = UnrootedConflictStatus.INCOMPATIBLE
+                elif hi - lo == len(keys):
+                    s = UnrootedConflictStatus.EQUIVALENT
+                else:
+                    s = UnrootedConflictStatus.RESOLVES
+            i, j = src.order[v], src.order[src.parent[v]]
+            status[(i, j)] = s
+            status[(j, i)] = s
+        return status
+
+def summarize_edge_status(status):
+    '''Returns a dict of UnrootedConflictStatus name -> number of edges for a
+    dict returned by ConflictReference.edge_status
+    '''
+    counts = dict([(s.name, 0) for s in UnrootedConflictStatus])
+    for s in status.values():
+        counts[s.name] += 1
+    return counts
+
+# The reference of the worker processes of corpus_edge_status. It is set by
+#   the initializer of the pool (which pickles it unless workers are forked).
+_WORKER_REFERENCE = None
+
+def _set_worker_reference(reference):
+    global _WORKER_REFERENCE
+    prev = _WORKER_REFERENCE
+    _WORKER_REFERENCE = reference
+    return prev
+
+def _edge_status_of_study_file(args):
+    # imported here to avoid a circular import with peyotl.nexson_syntax
+    from peyotl.nexson_syntax import extract_tree_nexson
+    from peyotl.nexson_proxy import NexsonTreeProxy
+    from peyotl.utility.json_backend import json_loads
+    study_id, filepath, tree_id = args
+    results = []
+    try:
+        with open(filepath, 'rb') as fo:
+            nexson = json_loads(fo.read())
+        trees = extract_tree_nexson(nexson, tree_id=tree_id)
+    except Exception as x:
+        return [{'study_id': study_id,
+                 'tree_id': tree_id,
+                 'exception': '{t}: {m}'.format(t=type(x).__name__, m=str(x))}]
+    for tid, tree, otus in trees:
+        r = {'study_id': study_id, 'tree_id': tid}
+        try:
+            status = _WORKER_REFERENCE.edge_status(NexsonTreeProxy(tree=tree, tree_id=tid, otus=otus))
+        except Exception as x:
+            r['exception'] = '{t}: {m}'.format(t=type(x).__name__, m=str(x))
+        else:
+            r['counts'] = summarize_edge_status(status)
+            r['edges'] = dict([(k, v.name) for k, v in status.items()])
+        results.append(r)
+    return results
+
+def corpus_edge_status(study_filepath_iter, reference, num_processes=1, tree_id=None):
+    '''Labels the edges of every tree of the (study ID, filepath) pairs in
+    `study_filepath_iter` (e.g. Phylesystem().iter_study_filepaths()) against
+    the ConflictReference `reference`. Returns a list (sorted by study and tree
+    ID) of dicts with the "study_id", "tree_id", the summarize_edge_status
+    "counts" and the status name of each edge (by node ID) as "edges" (or an
+    "exception" string, if the tree could not be analyzed).
+    If `num_processes` > 1, the studies are analyzed in a multiprocessing.Pool.
+    '''
+    jobs = [(study_id, filepath, tree_id) for study_id, filepath in study_filepath_iter]
+    results = []
+    for study_results in imap_with_worker_state(_edge_status_of_study_file,
+                                                jobs,
+                                                _set_worker_reference,
+                                                reference,
+                                                num_processes=num_processes,
+                                                ordered=False):
+        results.extend(study_results)
+    results.sort(key=lambda r: (r['study_id'], r['tree_id'] or ''))
+    return results
@@ -1,5 +1,7 @@
 #!/usr/bin/env python
 from enum import Enum
+# the value that stands for a missing OTT ID in columns of integer OTT IDs
+MISSING_OTT_ID = -1
 class OTULabelStyleEnum(Enum):
     OTT_ID = 0
     CURRENT_LABEL = 1 # OTT_NAME, if mapped or ORIGINAL_LABEL
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+'''Robinson-Foulds (RF) and weighted split distances between the trees of a
+collection (e.g. all of the trees of the phylesystem that share OTT IDs).
+
+Leaves are identified by OTT ID (see node_ott_id), and each pair of trees is
+compared on the leaves that they have in common. A split is stored as a
+python int bitmask over the leaves of the collection, so splits are hashed
+and compared as whole words in the int operations:
+
+    splits = collection_tree_splits(trees)
+    with open('distances.tsv', 'w') as out:
+        write_distance_table(iter_pairwise_distances(splits, num_processes=4), out, splits)
+
+The RF distance is the number of non-trivial splits that are in only one of
+the two trees. The weighted distance sums |length in one tree - length in the
+other| over all splits (including the trivial splits of the leaves), using
+the branch lengths of CompactTree edge_info or NexSON "@length" edge
+properties (missing lengths count as 0). When a tree is pruned to the common
+leaves, the lengths of the edges that are merged are added.
+'''
+from peyotl.phylo.conflict import node_ott_id
+from peyotl.utility import get_logger
+from peyotl.utility.worker_pool import imap_with_worker_state
+_LOG = get_logger(__name__)
+
+DISTANCE_TABLE_COLUMNS = ('tree1', 'tree2', 'num_common_leaves', 'rf', 'weighted')
+
+def _popcount(bits):
+    return bin(bits).count('1')
+
+def _edge_length(node):
+    info = getattr(node, 'edge_info', None)
+    if info is None:
+        edge = getattr(node, '_edge', None)
+        if isinstance(edge, dict):
+            info = edge.get('@length')
+    if info is None:
+        return 0.0
+    try:
+        return float(info)
+    except ValueError:
+        return 0.0
+
+class TreeSplits(object):
+    '''The leaves (a bitmask) and the splits (bitmask -> summed branch length)
+    of a tree. Leaf keys (by default OTT IDs) are numbered by `key2bit`, which
+    is extended with the keys that it lacks. Only TreeSplits that were built
+    with the same key2bit dict can be compared. Leaves without a key, and
+    leaves whose key occurs more than once in the tree, are left out.
+    '''
+    def __init__(self, tree, key2bit, label=None, leaf_key_fn=node_ott_id):
+        self.label = label
+        nodes = [nd for nd in iter(tree)] # preorder
+        leaf_keys = {}
+        num_with_key = {}
+        for nd in nodes:
+            if nd.is_leaf:
+                k = leaf_key_fn(nd)
+                if k is not None:
+                    leaf_keys[nd] = k
+                    num_with_key[k] = num_with_key.get(k, 0) + 1
+        bits = {}
+        leaf_splits = {}
+        splits = {}
+        for nd in reversed(nodes):
+            b = bits.pop(nd, 0)
+            if nd.is_leaf:
+                k = leaf_keys.get(nd)
+                if k is not None and num_with_key[k] == 1:
+                    bit = key2bit.get(k)
+                    if bit is None:
+                        bit = len(key2bit)
+                        key2bit[k] = bit
+                    b = 1 << bit
+                    leaf_splits[b] = _edge_length(nd)
+            par = nd.parent
+            if par is not None:
+                bits[par] = bits.get(par, 0) | b
+                if b and not nd.is_leaf:
+                    splits[b] = splits.get(b, 0.0) + _edge_length(nd)
+            else:
+                self.leaves = b
+        self.leaf_splits = leaf_splits
+        self.splits = splits
+        self.num_leaves = len(leaf_splits)
+        self._restricted = None
+    def restricted_splits(self, common):
+        '''Returns (non-trivial, trivial) dicts of split -> length for the
+        splits of the tree pruned to the leaves in the bitmask `common`. The
+        splits are unrooted: each is the side without the lowest leaf of `common`.
+        '''
+        if common == self.leaves and self._restricted is not None:
+            return self._restricted
+        low = common & -common
+        all_but_low = common ^ low
+        nontrivial, trivial = {}, {}
+        for b, length in self.leaf_splits.items():
+            if b & common:
+                trivial[all_but_low if b == low else b] = length
+        # single bit tests rather than popcounts, as the bitmasks span all of the leaves
+        for b, length in self.splits.items():
+            s = b & common
+            if s & low:
+                s ^= common
+            if not s:
+                continue
+            d = trivial if (s == all_but_low or not (s & (s - 1))) else nontrivial
+            d[s] = d.get(s, 0.0) + length
+        if common == self.leaves:
+            self._restricted = (nontrivial, trivial)
+        return nontrivial, trivial
+
+def split_distance(one, other):
+    '''Returns (number of common leaves, RF distance, weighted distance) of
+    two TreeSplits, on the leaves that they share.
+    '''
+    common = one.leaves & other.leaves
+    n = _popcount(common)
+    if n < 2:
+        return n, 0, 0.0
+    one_nontrivial, one_trivial = one.restricted_splits(common)
+    other_nontrivial, other_trivial = other.restricted_splits(common)
+    rf = 0
+    weighted = 0.0
+    for s, length in one_nontrivial.items():
+        o = other_nontrivial.get(s)
+        if o is None:
+            rf += 1
+            weighted += length
+        else:
+            weighted += abs(length - o)
+    for s, length in other_nontrivial.items():
+        if s not in one_nontrivial:
+            rf += 1
+            weighted += length
+    for s, length in one_trivial.items():
+        weighted += abs(length - other_trivial.get(s, 0.0))
+    for s, length in other_trivial.items():
+        if s not in one_trivial:
+            weighted += length
+    return n, rf, weighted
+
+def collection_tree_splits(trees, labels=None, leaf_key_fn=node_ott_id):
+    '''Returns a list of TreeSplits (with a shared numbering of the leaves)
+    for the trees in `trees` (trees from parse_newick, CompactTrees or
+    NexsonTreeProxy objects). `labels` defaults to the index of each tree.
+    '''
+    key2bit = {}
+    result = []
+    for i, tree in enumerate(trees):
+        label = i if labels is None else labels[i]
+        result.append(TreeSplits(tree, key2bit, label=label, leaf_key_fn=leaf_key_fn))
+    return result
+
+def corpus_tree_splits(study_filepath_iter, tree_id=None):
+    '''Returns a list of TreeSplits labelled by (study ID, tree ID) for every
+    tree of the (study ID, filepath) pairs in `study_filepath_iter` (e.g.
+    Phylesystem().iter_study_filepaths()). Studies that cannot be read are
+    logged and skipped.
+    '''
+    # imported here to avoid a circular import with peyotl.nexson_syntax
+    from peyotl.nexson_syntax import extract_tree_nexson
+    from peyotl.nexson_proxy import NexsonTreeProxy
+    from peyotl.utility.json_backend import json_loads
+    key2bit = {}
+    result = []
+    for study_id, filepath in study_filepath_iter:
+        try:
+            with open(filepath, 'rb') as fo:
+                nexson = json_loads(fo.read())
+            trees = extract_tree_nexson(nexson, tree_id=tree_id)
+        except Exception as x:
+            _LOG.warn('Could not read the trees of study "{s}": {m}'.format(s=study_id, m=str(x)))
+            continue
+        for tid, tree, otus in trees:
+            proxy = NexsonTreeProxy(tree=tree, tree_id=tid, otus=otus)
+            result.append(TreeSplits(proxy, key2bit, label=(study_id, tid)))
+    return result
+
+# The TreeSplits of the worker processes of iter_pairwise_distances. They are
+#   set by the initializer of the pool (which pickles them unless workers are forked).
+_WORKER_TREE_SPLITS = None
+
+def _set_worker_tree_splits(tree_splits):
+    global _WORKER_TREE_SPLITS
+    prev = _WORKER_TREE_SPLITS
+    _WORKER_TREE_SPLITS = tree_splits
+    return prev
+
+def _distance_row(i):
+    one = _WORKER_TREE_SPLITS[i]
+    row = []
+    for j in range(i + 1, len(_WORKER_TREE_SPLITS)):
+        n, rf, weighted = split_distance(one, _WORKER_TREE_SPLITS[j])
+        row.append((i, j, n, rf, weighted))
+    return row
+
+def iter_pairwise_distances(tree_splits, num_processes=1, min_common_leaves=4):
+    '''Yields (i, j, number of common leaves, RF, weighted distance) for every
+    pair i < j of the TreeSplits in the list `tree_splits`, in order of i.
+    Pairs with fewer than `min_common_leaves` common leaves (which have no
+    non-trivial splits to compare) are not reported.
+    If `num_processes` > 1, the rows of the matrix are computed in a
+    multiprocessing.Pool. Rows are yielded as they are finished, so the
+    results can be written to disk without holding the whole matrix.
+    '''
+    rows = imap_with_worker_state(_distance_row,
+                                  list(range(len(tree_splits) - 1)),
+                                  _set_worker_tree_splits,
+                                  tree_splits,
+                                  num_processes=num_processes)
+    for row in rows:
+        for r in row:
+            if r[2] >= min_common_leaves:
+                yield r
+
+def split_distance_matrix(tree_splits, num_processes=1):
+    '''Returns (RF matrix, weighted distance matrix) as lists of lists. Pairs of
+    trees with fewer than 4 common leaves have a distance of None.
+    '''
+    n = len(tree_splits)
+    rf = [[None] * n for _ in range(n)]
+    weighted = [[None] * n for _ in range(n)]
+    for i in range(n):
+        if tree_splits[i].num_leaves >= 4:
+            rf[i][i], weighted[i][i] = 0, 0.0
+    for i, j, num_common, d, w in iter_pairwise_distances(tree_splits, num_processes=num_processes):
+        rf[i][j] = rf[j][i] = d
+        weighted[i][j] = weighted[j][i] = w
+    return rf, weighted
+
+def write_distance_table(distances, out, tree_splits=None):
+    '''Writes the (i, j, ...) tuples of iter_pairwise_distances to the stream
+    `out` as tab-separated values with the DISTANCE_TABLE_COLUMNS. If the list
+    of TreeSplits is supplied, the trees are written as their labels.
+    '''
+    out.write('\t'.join(DISTANCE_TABLE_COLUMNS) + '\n')
+    for i, j, n, rf, weighted in distances:
+        if tree_splits is not None:
+            i, j = tree_splits[i].label, tree_splits[j].label
+        out.write('\t'.join([_label_str(i), _label_str(j), str(n), str(rf), repr(weighted)]) + '\n')
+
+def _label_str(label):
+    if isinstance(label, tuple):
+        return '/'.join([str(i) for i in label])
+    return str(label)
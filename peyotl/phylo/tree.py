@@ -44,27 +44,47 @@ class Node(object):
     def is_last_child_of_parent(self):
         '''Returns True for *ROOT* and any node that is the last child of its parent'''
         return (self._parent is None) or (self._parent._children[-1] is self)
+    def before_after_iter(self):
+        '''Yields (node, depth, is_entering) for the subtree of this node (at
+        depth 0). Each internal node is yielded with is_entering=True before its
+        descendants and with is_entering=False after them. Leaves are only
+        yielded once (with is_entering=True).
+        The traversal follows the parent pointers and the child index of each
+        node, so no stack is used.
+        '''
+        node = self
+        depth = 0
+        while True:
+            yield node, depth, True
+            ch = node._children
+            if ch:
+                node = ch[0]
+                depth += 1
+                continue
+            while node is not self:
+                p = node._parent
+                i = node._child_index_in_parent + 1
+                sibs = p._children
+                if i < len(sibs):
+                    node = sibs[i]
+                    break
+                node = p
+                depth -= 1
+                yield node, depth, False
+            else:
+                return
     def before_after_apply(self, before_fn, after_fn, leaf_fn=None):
         '''Applies the functions to each node in a subtree using an traversal in which
         encountered twice: once right before its descendants, and once right
         after its last descendant
         '''
-        stack = [self]
-        while stack:
-            node = stack.pop()
-            if node.is_leaf:
-                if leaf_fn:
-                    leaf_fn(node)
-                while node.is_last_child_of_parent:
-                    node = node._parent
-                    if node:
-                        after_fn(node)
-                    else:
-                        break
-            else:
+        for node, depth, is_entering in self.before_after_iter():
+            if not is_entering:
+                after_fn(node)
+            elif node._children:
                 before_fn(node)
-                stack.extend([i for i in reversed(node._children)])
-
+            elif leaf_fn:
+                leaf_fn(node)
     def preorder_iter(self, filter_fn=None):
         """ From DendroPy
         Preorder traversal of self and its child_nodes.  Returns self
@@ -72,13 +92,26 @@ class Node(object):
         child_nodes (and their child_nodes). Filtered by filter_fn: node is
         only returned if no filter_fn is given or if filter_fn returns
         True.
+        No stack is used (see before_after_iter).
         """
-        stack = [self]
-        while stack:
-            node = stack.pop()
+        node = self
+        while True:
             if filter_fn is None or filter_fn(node):
                 yield node
-            stack.extend([i for i in reversed(node._children)])
+            ch = node._children
+            if ch:
+                node = ch[0]
+                continue
+            while node is not self:
+                p = node._parent
+                i = node._child_index_in_parent + 1
+                sibs = p._children
+                if i < len(sibs):
+                    node = sibs[i]
+                    break
+                node = p
+            else:
+                return
     def postorder_iter(self, filter_fn=None):
         """From DendroPy
         Postorder traversal of the self and its child_nodes.  Returns self
@@ -86,17 +119,49 @@ class Node(object):
         child_nodes) are visited before node.  Filtered by filter_fn:
         node is only returned if no filter_fn is given or if filter_fn
         returns True.
+        No stack is used (see before_after_iter).
         """
-        stack = [(self, False)]
-        while stack:
-            node, state = stack.pop()
-            if state:
+        node = self
+        while True:
+            ch = node._children
+            while ch:
+                node = ch[0]
+                ch = node._children
+            if filter_fn is None or filter_fn(node):
+                yield node
+            while node is not self:
+                p = node._parent
+                i = node._child_index_in_parent + 1
+                sibs = p._children
+                if i < len(sibs):
+                    node = sibs[i]
+                    break
+                node = p
                 if filter_fn is None or filter_fn(node):
                     yield node
             else:
-                stack.append((node, True))
-                if node._children:
-                    stack.extend([(n, False) for n in node.children_reversed_iter()])
+                return
+    def leaf_iter(self):
+        '''Leaves of the subtree of this node (in preorder), without visiting
+        the internal nodes more than needed to find the next leaf.
+        '''
+        node = self
+        while True:
+            ch = node._children
+            while ch:
+                node = ch[0]
+                ch = node._children
+            yield node
+            while node is not self:
+                p = node._parent
+                i = node._child_index_in_parent + 1
+                sibs = p._children
+                if i < len(sibs):
+                    node = sibs[i]
+                    break
+                node = p
+            else:
+                return
     def children_iter(self, filter_fn=None):
         if self._children:
             for i in self._children:
@@ -129,6 +194,17 @@ class NodeWithPathInEdges(Node):
         else:
             self._path_ids = []
             self._path_set = set()
+    @property
+    def path_ids(self):
+        '''IDs of the node and of the suppressed ancestors on its incoming edge'''
+        return self._path_ids
+    @property
+    def path_set(self):
+        '''The IDs in path_ids as a set (built on demand if the paths have been compacted)'''
+        try:
+            return self._path_set
+        except AttributeError:
+            return frozenset(self._path_ids)
 class _TreeWithNodeIDs(object):
     def __init__(self):
         self._id2node = {}
@@ -151,19 +227,20 @@ class _TreeWithNodeIDs(object):
     def do_full_check_of_invariants(self, testCase, **kwargs):
         _do_full_check_of_tree_invariants(self, testCase, **kwargs)
     def write_newick(self, out, **kwargs):
-        def _open_newick(node):
-            if node.is_first_child_of_parent:
-                out.write('(')
+        # a comma is needed before every node that is not the first child of its parent
+        need_comma = False
+        for node, depth, is_entering in self._root.before_after_iter():
+            if is_entering:
+                if need_comma:
+                    out.write(',')
+                if node._children:
+                    out.write('(')
+                    need_comma = False
+                    continue
             else:
-                out.write(',(')
-        def _t(node):
-            if not node.is_first_child_of_parent:
-                out.write(',')
+                out.write(')')
             _write_node_info_newick(out, node, **kwargs)
-        def _a(node):
-            out.write(')')
-            _write_node_info_newick(out, node, **kwargs)
-        self._root.before_after_apply(before_fn=_open_newick, after_fn=_a, leaf_fn=_t)
+            need_comma = True
         out.write(';\n')
 class TreeWithPathsInEdges(_TreeWithNodeIDs):
     def __init__(self, id_to_par_id=None, newick_events=None):
@@ -200,6 +277,7 @@ class TreeWithPathsInEdges(_TreeWithNodeIDs):
                     curr.add_sib(n)
                 curr = n
                 self._id2node[n._id] = n
+                self._leaves.add(n._id)
             else:
                 assert t == NewickEvents.CLOSE_SUBTREE
                 curr = curr._parent
@@ -391,6 +469,16 @@ class TreeWithPathsInEdges(_TreeWithNodeIDs):
         self._root = n
         self._add_node(n)
 
+    def compact_paths(self):
+        '''Frees the memory that is only needed while the tree is being built:
+        each node's _path_ids list becomes a tuple, and the _path_set and
+        _mrca_node_for sets are deleted (path_set recreates the set on demand).
+        Nodes cannot be added to the tree after this is called.
+        '''
+        for node in self.preorder_node_iter():
+            node._path_ids = tuple(node._path_ids)
+            node.__dict__.pop('_path_set', None)
+            node.__dict__.pop('_mrca_node_for', None)
     @property
     def leaves(self):
         return [self._id2node[i] for i in self._leaves]
@@ -404,6 +492,16 @@ class TreeWithPathsInEdges(_TreeWithNodeIDs):
         return nd.preorder_iter(filter_fn=filter_fn)
     def __iter__(self):
         return self._root.preorder_iter()
+    def leaf_node_iter(self, nd=None):
+        '''Leaf nodes below `nd` (by default, the root) found by traversal (see Node.leaf_iter)'''
+        if nd is None:
+            nd = self._root
+        return nd.leaf_iter()
+    def before_after_node_iter(self, nd=None):
+        '''(node, depth, is_entering) tuples for the subtree of `nd` (see Node.before_after_iter)'''
+        if nd is None:
+            nd = self._root
+        return nd.before_after_iter()
     def add_bits4subtree_ids(self, relevant_ids):
         '''Adds a long integer bits4subtree_ids to each node (Fails cryptically if that field is already present!)
         relevant_ids can be a dict of _id to bit representation.
@@ -449,7 +547,12 @@ class TreeWithPathsInEdges(_TreeWithNodeIDs):
             p.bits4subtree_ids |= node.bits4subtree_ids
         return relevant_ids
 
-def create_tree_from_id2par(id2par, id_list, _class=TreeWithPathsInEdges):
+def create_tree_from_id2par(id2par, id_list, _class=TreeWithPathsInEdges, compact_paths=False):
+    '''Returns the tree induced by the IDs in `id_list` from the id -> parent id
+    dict `id2par` (nodes of out-degree 1 are suppressed).
+    If `compact_paths` is True, tree.compact_paths() is called before the tree
+    is returned, which is appropriate if no more nodes will be added.
+    '''
     if not id_list:
         return None
     nn = len(id_list)
@@ -468,8 +571,157 @@ def create_tree_from_id2par(id2par, id_list, _class=TreeWithPathsInEdges):
         tree._add_node_for_id(next_id)
         curr_ind += 1
     del tree._id2par
+    if compact_paths:
+        tree.compact_paths()
     return tree
 
+class IndexedTree(object):
+    '''Parent and child lists of a tree whose nodes are numbered in preorder (so
+    the subtree of node i is nodes i...last[i]), with the depth of each node, the
+    number of leaves below it and (built on the first call of lca) a sparse
+    table of depths for constant-time MRCA queries.
+    `order` holds the input node (or the index of the node in the input) that
+    each node came from. All of the numbering is done without recursion, so
+    the depth of the tree is not limited by the recursion limit.
+    '''
+    def __init__(self, parent, children, order=None):
+        self.parent = parent
+        self.children = children
+        n = len(parent)
+        self.order = list(range(n)) if order is None else order
+        self.last = list(range(n))
+        self.num_leaves = [0] * n
+        self.depth = [0] * n
+        for i in range(1, n):
+            self.depth[i] = self.depth[parent[i]] + 1
+        for i in range(n - 1, 0, -1):
+            if not children[i]:
+                self.num_leaves[i] = 1
+            p = parent[i]
+            self.num_leaves[p] += self.num_leaves[i]
+            if self.last[i] > self.last[p]:
+                self.last[p] = self.last[i]
+        if n == 1:
+            self.num_leaves[0] = 1
+        self._table = None
+    def _build_lca_table(self):
+        # _table[k][i] is the shallowest node in i ... i + 2**k - 1
+        n = len(self.parent)
+        depth = self.depth
+        table = [list(range(n))]
+        span = 1
+        while 2 * span <= n:
+            prev = table[-1]
+            table.append([a if depth[a] <= depth[b] else b
+                          for a, b in zip(prev[:n - 2 * span + 1], prev[span:])])
+            span *= 2
+        self._table = table
+    def __len__(self):
+        return len(self.parent)
+    def subtree_size(self, i):
+        '''Number of nodes in the subtree of node i (including i)'''
+        return self.last[i] - i + 1
+    @staticmethod
+    def from_children(root, children_of):
+        '''Numbers the tree below the node `root`, where children_of(node)
+        returns the list of the children of a node (or None for a leaf).
+        The `order` of the IndexedTree is the list of the nodes in preorder.
+        '''
+        order, parent, children = [], [], []
+        stack = [(root, -1)]
+        while stack:
+            nd, p = stack.pop()
+            x = len(order)
+            order.append(nd)
+            parent.append(p)
+            children.append([])
+            if p >= 0:
+                children[p].append(x)
+            c = children_of(nd)
+            if c:
+                for child in reversed(c):
+                    stack.append((child, x))
+        return IndexedTree(parent, children, order=order)
+    def preorder2tuples(self, offset=0):
+        '''Returns a dict of the preorder number (i + offset) of each node i to
+        (parent, next sib) for leaves or (parent, next sib, first child, last child)
+        for internal nodes. The parent of the root and the next sib of a last
+        child are None.
+        '''
+        result = {}
+        parent, children = self.parent, self.children
+        next_sib = [None] * len(parent)
+        for ch in children:
+            for a, b in zip(ch, ch[1:]):
+                next_sib[a] = b + offset
+        for i in range(len(parent)):
+            p = parent[i]
+            p = None if p < 0 else p + offset
+            ch = children[i]
+            if ch:
+                result[i + offset] = (p, next_sib[i], ch[0] + offset, ch[-1] + offset)
+            else:
+                result[i + offset] = (p, next_sib[i])
+        return result
+    @staticmethod
+    def from_nodes(nodes):
+        '''`nodes` is a list of the nodes of a tree in preorder'''
+        index = {}
+        for i, nd in enumerate(nodes):
+            index[nd] = i
+        parent = [-1] * len(nodes)
+        children = [[] for _ in nodes]
+        for i, nd in enumerate(nodes[1:], 1):
+            p = index[nd.parent]
+            parent[i] = p
+            children[p].append(i)
+        return IndexedTree(parent, children)
+    @staticmethod
+    def from_adjacency(nbrs, root, is_leaf):
+        '''Returns the tree rooted at node `root` of the unrooted tree given
+        as the lists of the neighbors of nodes 0...n-1. Subtrees that do
+        not have a node for which is_leaf[i] is True are left out.
+        '''
+        order, parent = [], []
+        stack = [(root, -1, -1)]
+        while stack:
+            i, from_i, p = stack.pop()
+            x = len(order)
+            order.append(i)
+            parent.append(p)
+            for j in reversed(nbrs[i]):
+                if j != from_i:
+                    stack.append((j, i, x))
+        keep = [is_leaf[i] for i in order]
+        keep[0] = True
+        for x in range(len(order) - 1, 0, -1):
+            if keep[x]:
+                keep[parent[x]] = True
+        new_index = [-1] * len(order)
+        kept_order, kept_parent = [], []
+        for x in range(len(order)):
+            if keep[x]:
+                new_index[x] = len(kept_order)
+                kept_order.append(order[x])
+                kept_parent.append(new_index[parent[x]] if x > 0 else -1)
+        children = [[] for _ in kept_order]
+        for x in range(1, len(kept_order)):
+            children[kept_parent[x]].append(x)
+        return IndexedTree(kept_parent, children, order=kept_order)
+    def lca(self, u, v):
+        if u == v:
+            return u
+        if u > v:
+            u, v = v, u
+        if self._table is None:
+            self._build_lca_table()
+        # for u < v in preorder, the MRCA is the parent of the shallowest node in u+1 ... v
+        lo = u + 1
+        k = (v - lo + 1).bit_length() - 1
+        row = self._table[k]
+        a, b = row[lo], row[v - (1 << k) + 1]
+        return self.parent[a if self.depth[a] <= self.depth[b] else b]
+
 def _do_full_check_of_tree_invariants(tree, testCase, id2par=None, leaf_ids=None):
     post_order = [nd for nd in tree.postorder_node_iter()]
     post_order_ids = []
@@ -559,8 +811,8 @@ def _do_full_check_of_tree_invariants(tree, testCase, id2par=None, leaf_ids=None
         ptree = TreeWithPathsInEdges(newick_events=nef)
 
 def parse_newick(newick=None, stream=None, filepath=None, _class=TreeWithPathsInEdges):
-    from peyotl.utility.tokenizer import NewickEventFactory, NewickTokenizer
-    nt = NewickTokenizer(stream=stream, newick=newick, filepath=filepath)
+    from peyotl.utility.tokenizer import NewickEventFactory, ChunkedNewickTokenizer
+    nt = ChunkedNewickTokenizer(stream=stream, newick=newick, filepath=filepath)
     nef = NewickEventFactory(tokenizer=nt)
     return _class(newick_events=nef)
 def parse_id2par_dict(id2par=None,
@@ -32,3 +32,27 @@ def testing_conv_key_unicode_literal(d):
         else:
             r[k] = v
     return r
+
+def random_newick(labels, rng, prefix='', max_children=4, internal_label=None, edge_length=None):
+    '''Returns the newick of a random tree with the leaf `labels`, built by
+    repeatedly joining 2 to `max_children` randomly chosen subtrees (using the
+    random.Random `rng`).
+    Internal nodes are labelled with `prefix` followed by a number (no label
+    if `prefix` is empty), or with the return value of `internal_label()`.
+    If `edge_length` is supplied, edge_length() is the length of the edge of
+    each internal node (leaf labels must include their own lengths).
+    '''
+    nodes = list(labels)
+    while len(nodes) > 1:
+        n = rng.randint(2, min(max_children, len(nodes)))
+        children = [nodes.pop(rng.randrange(len(nodes))) for _ in range(n)]
+        if internal_label is not None:
+            label = internal_label()
+        elif prefix:
+            label = '{p}{i:d}'.format(p=prefix, i=len(nodes))
+        else:
+            label = ''
+        if edge_length is not None:
+            label = '{l}:{b:.5f}'.format(l=label, b=edge_length())
+        nodes.append('({c}){l}'.format(c=','.join(children), l=label))
+    return nodes[0] + ';'
@@ -20,14 +20,7 @@
 Path mapping for various test resources.
 """
 from peyotl.utility import pretty_timestamp, get_logger
-try:
-    import anyjson
-except:
-    import json
-    class Wrapper(object):
-        pass
-    anyjson = Wrapper()
-    anyjson.loads = json.loads
+from peyotl.utility.json_backend import json_loads
 import codecs
 import os
 _LOG = get_logger(__name__)
@@ -94,7 +87,7 @@ def nexson_obj(filename):
     '''
     with nexson_file_obj(filename) as fo:
         fc = fo.read()
-        return anyjson.loads(fc)
+        return json_loads(fc)
 
 def nexson_file_obj(filename):
     ''' Returns file object.
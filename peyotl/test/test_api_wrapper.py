@@ -0,0 +1,65 @@
+#! /usr/bin/env python
+# coding=utf-8
+from peyotl.api.phylesystem_api import _PhylesystemAPIWrapper
+from peyotl.utility.json_backend import available_json_backends, \
+                                        get_json_backend, \
+                                        set_json_backend
+from peyotl.utility.str_util import UNICODE
+import threading
+import unittest
+import json
+import os
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+class _RecordingHandler(BaseHTTPRequestHandler):
+    '''Stores the Content-Type and body of each POST in server.requests and replies with {}'''
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append((self.headers['Content-Type'], body))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+    def log_message(self, *valist): #pylint: disable=W0221
+        pass
+
+class TestPostNonLatin1(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), _RecordingHandler)
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.domain = 'http://127.0.0.1:{p:d}'.format(p=self.server.server_address[1])
+        self.prev_token = os.environ.get('GITHUB_OAUTH_TOKEN')
+        os.environ['GITHUB_OAUTH_TOKEN'] = 'bogus'
+        self.prev_backend = get_json_backend().name
+    def tearDown(self):
+        set_json_backend(self.prev_backend)
+        if self.prev_token is None:
+            del os.environ['GITHUB_OAUTH_TOKEN']
+        else:
+            os.environ['GITHUB_OAUTH_TOKEN'] = self.prev_token
+        self.server.shutdown()
+        self.server.server_close()
+    def testPostStudy(self):
+        nexson = {'nexml': {'^ot:studyPublicationReference': u'Dąbrowski, Ł. and Wiśniewski, ń'}}
+        for backend in available_json_backends():
+            set_json_backend(backend.name)
+            pa = _PhylesystemAPIWrapper(self.domain, get_from='api')
+            self.assertEqual(pa.post_study(nexson, study_id='pg_1'), {})
+            content_type, body = self.server.requests[-1]
+            self.assertTrue('charset=utf-8' in content_type)
+            self.assertEqual(json.loads(body.decode('utf-8')), {'nexson': nexson})
+    def testPostText(self):
+        pa = _PhylesystemAPIWrapper(self.domain, get_from='api')
+        data = UNICODE(u'{"label": "Wiśniewski"}')
+        self.assertEqual(pa.json_http_post(self.domain + '/x', data=data), {})
+        self.assertEqual(self.server.requests[-1][1], data.encode('utf-8'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+#! /usr/bin/env python
+from peyotl.nexson_syntax.binary_nexson import dumps_binary_nexson, \
+                                               loads_binary_nexson, \
+                                               read_binary_nexson, \
+                                               write_binary_nexson, \
+                                               msgpack
+from peyotl.nexson_syntax import convert_nexson_format, \
+                                 BY_ID_HONEY_BADGERFISH, \
+                                 DIRECT_HONEY_BADGERFISH
+from peyotl.test.support import pathmap
+import tempfile
+import unittest
+import json
+import os
+
+@unittest.skipIf(msgpack is None, 'msgpack is not installed')
+class TestBinaryNexson(unittest.TestCase):
+    def testRoundTrip(self):
+        for fn in ['10/pg_10.json', '9/v1.0.json', '9/v0.0.json']:
+            blob = pathmap.nexson_obj(fn)
+            data = dumps_binary_nexson(blob)
+            self.assertEqual(loads_binary_nexson(data), blob)
+    def testSmallerThanJSON(self):
+        blob = pathmap.nexson_obj('10/pg_10.json')
+        data = dumps_binary_nexson(blob)
+        self.assertTrue(len(data) < len(json.dumps(blob, separators=(',', ':')).encode('utf-8')))
+    def testConvert(self):
+        blob = pathmap.nexson_obj('10/pg_10.json')
+        blob = loads_binary_nexson(dumps_binary_nexson(blob))
+        expected = convert_nexson_format(pathmap.nexson_obj('10/pg_10.json'), DIRECT_HONEY_BADGERFISH)
+        self.assertEqual(convert_nexson_format(blob, DIRECT_HONEY_BADGERFISH), expected)
+        self.assertEqual(convert_nexson_format(expected, BY_ID_HONEY_BADGERFISH),
+                         pathmap.nexson_obj('10/pg_10.json'))
+    def testFile(self):
+        blob = pathmap.nexson_obj('10/pg_10.json')
+        fd, fp = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            write_binary_nexson(blob, fp)
+            self.assertEqual(read_binary_nexson(fp), blob)
+        finally:
+            os.remove(fp)
+    def testBadInput(self):
+        self.assertRaises(ValueError, loads_binary_nexson, b'')
+        self.assertRaises(ValueError, loads_binary_nexson, msgpack.packb([1, 2, 3]))
+        self.assertRaises(ValueError, loads_binary_nexson, msgpack.packb(['nexson-msgpack', 1000, []]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+#! /usr/bin/env python
+from peyotl.phylo.bitmap_splits import SplitBitmaps, \
+                                       bitmap_to_int, \
+                                       int_to_bitmap, \
+                                       tree_split_bitmaps, \
+                                       numpy
+from peyotl.phylo.compat import compare_bits_as_splits, SplitComparison
+from peyotl.phylo.tree import parse_newick
+from peyotl.phylo.compact_tree import CompactTree
+from peyotl.test.support.helper import random_newick
+import unittest
+import random
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestBitmapSplits(unittest.TestCase):
+    def testIntRoundTrip(self):
+        for b in [0, 1, (1 << 64) - 1, 1 << 64, (1 << 130) | 5]:
+            self.assertEqual(bitmap_to_int(int_to_bitmap(b, 3)), b)
+    def testCompareMatchesInts(self):
+        rng = random.Random(1)
+        for num_leaves in (5, 64, 130):
+            universe = (1 << num_leaves) - 1
+            bits = [rng.getrandbits(num_leaves) for _ in range(30)]
+            # nested, disjoint, complementary and equal splits
+            bits.extend([bits[0] & bits[1], bits[0] & ~bits[1], universe & ~bits[2], bits[3]])
+            splits = SplitBitmaps.from_ints(num_leaves, bits)
+            for b in bits:
+                expected = [compare_bits_as_splits(b, o, universe).value for o in bits]
+                self.assertEqual(list(splits.compare(int_to_bitmap(b, splits.num_words))), expected)
+                incompat = [i == SplitComparison.UNROOTED_INCOMPATIBLE.value for i in expected]
+                self.assertEqual(list(splits.incompatible_with(int_to_bitmap(b, splits.num_words))), incompat)
+    def testIndexOf(self):
+        splits = SplitBitmaps.from_ints(70, [3, 1 << 69, 3, 12])
+        self.assertEqual(splits.index_of(int_to_bitmap(3, 2)), 0)
+        self.assertEqual(splits.index_of(int_to_bitmap(12, 2)), 3)
+        self.assertEqual(splits.index_of(int_to_bitmap(1 << 69, 2)), 1)
+        self.assertEqual(splits.index_of(int_to_bitmap(5, 2)), None)
+    def testTreeSplits(self):
+        newick = '((a,(b,c)bc,d)x,(e,f)ef)r;'
+        tree = parse_newick(newick=newick)
+        id2bit = tree.add_bits4subtree_ids(None)
+        leaf2bit = dict([(i, b.bit_length() - 1) for i, b in id2bit.items()])
+        for tree_class in (CompactTree, None):
+            t = parse_newick(newick=newick) if tree_class is None else parse_newick(newick=newick, _class=tree_class)
+            l2b, splits = tree_split_bitmaps(t, leaf2bit)
+            self.assertEqual(l2b, leaf2bit)
+            by_id = dict([(nd._id, bitmap_to_int(splits.bitmap(i))) for i, nd in enumerate(splits.labels)])
+            self.assertEqual(by_id, dict([(nd._id, nd.bits4subtree_ids) for nd in tree.postorder_node_iter()
+                                          if not nd.is_leaf]))
+        l2b, splits = tree_split_bitmaps(parse_newick(newick=newick, _class=CompactTree))
+        self.assertEqual(sorted(l2b.keys()), ['a', 'b', 'c', 'd', 'e', 'f'])
+        self.assertEqual([nd._id for nd in splits.labels], ['bc', 'x', 'ef', 'r'])
+    def testCompareIntervals(self):
+        rng = random.Random(2)
+        labels = ['t{i:d}'.format(i=i) for i in range(150)]
+        tree = parse_newick(newick=random_newick(labels, rng, max_children=3))
+        # leaves numbered in postorder, so every split is an interval of bits
+        leaf2bit, splits = tree_split_bitmaps(tree)
+        tree.add_bits4subtree_ids(dict([(i, 1 << b) for i, b in leaf2bit.items()]))
+        universe = tree.root.bits4subtree_ids
+        bits = [nd.bits4subtree_ids for nd in splits.labels]
+        others = bits + [rng.getrandbits(150) for _ in range(20)] + [universe & ~bits[3]]
+        for b in others:
+            expected = [compare_bits_as_splits(b, o, universe).value for o in bits]
+            self.assertEqual(list(splits.compare(int_to_bitmap(b, splits.num_words))), expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+#! /usr/bin/env python
+from peyotl.phylo.conflict import ConflictReference, \
+                                  corpus_edge_status, \
+                                  ott_id_from_label, \
+                                  summarize_edge_status
+from peyotl.phylo.compat import compare_sets_as_splits, SplitComparison, UnrootedConflictStatus
+from peyotl.phylo.tree import parse_newick
+from peyotl.phylo.compact_tree import CompactTree
+from peyotl.nexson_proxy import NexsonProxy
+from peyotl.test.support import pathmap
+from peyotl.test.support.helper import random_newick
+import unittest
+import random
+import pickle
+
+def _leaf_sets(tree):
+    leaves = {}
+    for nd in tree.postorder_node_iter():
+        if nd.is_leaf:
+            leaves[nd] = frozenset([ott_id_from_label(nd._id)]) - frozenset([None])
+        else:
+            leaves[nd] = frozenset().union(*[leaves[c] for c in nd.child_iter()])
+    return leaves
+
+def _brute_force_status(source, reference):
+    src_leaves = _leaf_sets(source)
+    ref_leaves = _leaf_sets(reference)
+    universe = src_leaves[source.root] & ref_leaves[reference.root]
+    ref_splits = [s & universe for s in ref_leaves.values()]
+    result = {}
+    for nd, s in src_leaves.items():
+        if nd is source.root:
+            continue
+        s = s & universe
+        if not s or s == universe:
+            result[nd._id] = UnrootedConflictStatus.NOT_COMPARABLE
+        elif len(s) == 1 or len(universe) - len(s) == 1:
+            result[nd._id] = UnrootedConflictStatus.TRIVIAL
+        else:
+            cmp = set([compare_sets_as_splits(s, r, universe) for r in ref_splits if r])
+            if SplitComparison.UNROOTED_INCOMPATIBLE in cmp:
+                result[nd._id] = UnrootedConflictStatus.INCOMPATIBLE
+            elif SplitComparison.ROOTED_EQUIVALENT in cmp or SplitComparison.UNROOTED_EQUIVALENT in cmp:
+                result[nd._id] = UnrootedConflictStatus.EQUIVALENT
+            else:
+                result[nd._id] = UnrootedConflictStatus.RESOLVES
+    return result
+
+class TestConflict(unittest.TestCase):
+    def testOttIdFromLabel(self):
+        self.assertEqual(ott_id_from_label('Homo_sapiens_ott770315'), 770315)
+        self.assertEqual(ott_id_from_label('ott12'), 12)
+        self.assertEqual(ott_id_from_label('12'), 12)
+        self.assertEqual(ott_id_from_label(12), 12)
+        self.assertEqual(ott_id_from_label('Scott1'), None)
+        self.assertEqual(ott_id_from_label(None), None)
+    def testSmall(self):
+        reference = ConflictReference(tree=parse_newick(newick='((ott1,ott2)ott10,(ott3,ott4)ott11,ott5)ott12;'))
+        source = parse_newick(newick='(((ott1,ott2)a,(ott3,ott5)b)c,ott4,(x,y)d)r;')
+        status = reference.edge_status(source)
+        self.assertEqual(status['a'], UnrootedConflictStatus.EQUIVALENT)
+        self.assertEqual(status['b'], UnrootedConflictStatus.INCOMPATIBLE)
+        self.assertEqual(status['c'], UnrootedConflictStatus.TRIVIAL)
+        self.assertEqual(status['d'], UnrootedConflictStatus.NOT_COMPARABLE)
+        self.assertEqual(status['x'], UnrootedConflictStatus.NOT_COMPARABLE)
+        self.assertEqual(status['ott4'], UnrootedConflictStatus.TRIVIAL)
+        counts = summarize_edge_status(status)
+        self.assertEqual(counts['INCOMPATIBLE'], 1)
+        self.assertEqual(counts['NOT_COMPARABLE'], 3)
+        reference = ConflictReference(tree=parse_newick(newick='((ott1,ott2)ott10,ott3,ott4,ott5)ott12;'))
+        status = reference.edge_status(parse_newick(newick='(((ott1,ott2)a,ott5)b,ott3,ott4)r;'))
+        self.assertEqual(status['a'], UnrootedConflictStatus.EQUIVALENT)
+        self.assertEqual(status['b'], UnrootedConflictStatus.RESOLVES)
+    def testIdToParent(self):
+        id2par = {1: 10, 2: 10, 3: 11, 4: 11, 10: 12, 11: 12, 12: None}
+        reference = ConflictReference(id2par=id2par)
+        # ott10 is an internal node of the reference, so the leaf mapped to it is ignored
+        status = reference.edge_status(parse_newick(newick='((ott1,ott3)a,(ott2,ott4)b,ott10)r;'))
+        self.assertEqual(status['a'], UnrootedConflictStatus.INCOMPATIBLE)
+        self.assertEqual(status['ott10'], UnrootedConflictStatus.NOT_COMPARABLE)
+    def testPickle(self):
+        newick = '((ott1,ott2)ott10,(ott3,ott4)ott11,ott5)ott12;'
+        id2par = {1: 10, 2: 10, 3: 11, 4: 11, 5: 12, 10: 12, 11: 12, 12: None}
+        source = parse_newick(newick='((ott1,ott3)a,(ott2,ott4)b,ott5)r;')
+        for reference in (ConflictReference(tree=parse_newick(newick=newick)),
+                          ConflictReference(tree=parse_newick(newick=newick, _class=CompactTree)),
+                          ConflictReference(id2par=id2par)):
+            copied = pickle.loads(pickle.dumps(reference, pickle.HIGHEST_PROTOCOL))
+            self.assertEqual(copied.edge_status(source), reference.edge_status(source))
+    def testRandom(self):
+        rng = random.Random(3)
+        for rep in range(40):
+            num_leaves = rng.randint(3, 30)
+            ref_labels = ['t_ott{i:d}'.format(i=i) for i in range(num_leaves)]
+            src_labels = [i for i in ref_labels if rng.random() < 0.8]
+            src_labels.extend(['u{i:d}'.format(i=i) for i in range(rng.randint(0, 3))])
+            if len(src_labels) < 2:
+                continue
+            if rep % 2:
+                ref_newick = random_newick(ref_labels, rng, 'r')
+                src_newick = random_newick(src_labels, rng, 's')
+            else:
+                # trees that share some clades
+                groups = [[]]
+                for label in src_labels:
+                    if rng.random() < 0.3:
+                        groups.append([])
+                    groups[-1].append(label)
+                groups = [g for g in groups if g]
+                ref_parts = [i for i in ref_labels if i not in src_labels]
+                src_parts = []
+                for n, g in enumerate(groups):
+                    clade = random_newick(g, rng, 'g{n:d}_'.format(n=n))[:-1]
+                    ref_parts.append(clade)
+                    src_parts.append(clade.replace('g', 'h'))
+                ref_newick = random_newick(ref_parts, rng, 'r')
+                src_newick = random_newick(src_parts, rng, 's')
+            source = parse_newick(newick=src_newick)
+            expected = _brute_force_status(source, parse_newick(newick=ref_newick))
+            for tree_class in (None, CompactTree):
+                if tree_class is None:
+                    ref_tree = parse_newick(newick=ref_newick)
+                else:
+                    ref_tree = parse_newick(newick=ref_newick, _class=tree_class)
+                self.assertEqual(ConflictReference(tree=ref_tree).edge_status(source), expected)
+            # the reference itself neither resolves nor conflicts with any of its splits
+            status = ConflictReference(tree=parse_newick(newick=ref_newick)).edge_status(parse_newick(newick=ref_newick))
+            self.assertFalse(UnrootedConflictStatus.INCOMPATIBLE in status.values())
+            self.assertFalse(UnrootedConflictStatus.RESOLVES in status.values())
+    def testNexson(self):
+        fp = pathmap.nexson_source_path('pg_329/pg_329.json')
+        np = NexsonProxy(filepath=fp)
+        tree = np.get_tree(tree_id='tree324')
+        ott_ids = [nd.ott_id for nd in tree if nd.is_leaf and nd.ott_id is not None]
+        self.assertTrue(len(ott_ids) > 3)
+        ott_ids = sorted(set(ott_ids))
+        rng = random.Random(4)
+        reference = ConflictReference(tree=parse_newick(newick=random_newick(['ott{i:d}'.format(i=i) for i in ott_ids],
+                                                                                 rng,
+                                                                                 'r')))
+        status = reference.edge_status(tree)
+        self.assertEqual(set(status.keys()), set([nd._id for nd in tree if nd.parent is not None]))
+        # tree324 has two leaves mapped to the same OTT ID, and the view visits them in a different order
+        self.assertEqual(summarize_edge_status(reference.edge_status(tree.compact_view())),
+                         summarize_edge_status(status))
+        results = corpus_edge_status([('pg_329', fp)], reference)
+        self.assertEqual(len(results), len([t for t in np.tree_iter()]))
+        r = [i for i in results if i['tree_id'] == 'tree324'][0]
+        self.assertEqual(r['counts'], summarize_edge_status(status))
+        self.assertEqual(r['edges'], dict([(k, v.name) for k, v in status.items()]))
+        self.assertEqual(corpus_edge_status([('pg_329', fp), ('pg_329', fp)], reference, num_processes=2)[::2],
+                         results)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#! /usr/bin/env python
+from peyotl.nexson_validation.corpus import git_blob_sha, validate_corpus, validate_study_file
+from peyotl.nexson_validation import validate_nexson
+from peyotl.utility.input_output import read_as_json, write_as_json
+from peyotl.test.support import pathmap
+import unittest
+import tempfile
+import shutil
+import os
+
+STUDIES = ('9/v1.2.json', '10/pg_10.json', '9/v1.0.json')
+
+class TestCorpusValidation(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.corpus = []
+        for n, s in enumerate(STUDIES):
+            dest = os.path.join(self.tmp_dir, 'study{}.json'.format(n))
+            shutil.copyfile(pathmap.nexson_source_path(s), dest)
+            self.corpus.append(('s{}'.format(n), dest))
+        self.cache_fp = os.path.join(self.tmp_dir, 'cache', 'validation.json')
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    def testGitBlobSHA(self):
+        # `printf 'hello\n' | git hash-object --stdin`
+        self.assertEqual(git_blob_sha(b'hello\n'), 'ce013625030ba8dba906f756967f9e9ca394464a')
+    def testCounts(self):
+        study_id, fp = self.corpus[0]
+        r = validate_study_file(fp)
+        v_log = validate_nexson(read_as_json(fp))[0]
+        self.assertEqual(r['has_error'], v_log.has_error())
+        self.assertEqual(sum(r['warnings'].values()), sum([len(m) for m in v_log.warnings]))
+        report = validate_corpus([(study_id, fp)], codes_to_skip=[])
+        self.assertEqual(report['warnings'], r['warnings'])
+        self.assertEqual(report['studies'][study_id]['sha'], git_blob_sha(open(fp, 'rb').read()))
+    def testCountsMatchValidateNexson(self):
+        corpus = list(self.corpus)
+        for fn in ('unparseable_meta.v0.0.input', 'repeated_meta_id.json.v1.2.input'):
+            corpus.append((fn, pathmap.nexson_source_path(os.path.join('warn_err', fn))))
+        report = validate_corpus(corpus, codes_to_skip=[])
+        totals = {'errors': {}, 'warnings': {}}
+        for study_id, fp in corpus:
+            counts = validate_nexson(read_as_json(fp), [])[0].get_code_counts()
+            for k in ('errors', 'warnings'):
+                self.assertEqual(report['studies'][study_id][k], counts[k])
+                for code, n in counts[k].items():
+                    totals[k][code] = totals[k].get(code, 0) + n
+        self.assertEqual(report['studies']['unparseable_meta.v0.0.input']['errors']['UNPARSEABLE_META'], 1)
+        self.assertEqual(report['errors'], totals['errors'])
+        self.assertEqual(report['warnings'], totals['warnings'])
+    def testCache(self):
+        first = validate_corpus(self.corpus, cache_filepath=self.cache_fp)
+        self.assertEqual(first['num_studies'], len(STUDIES))
+        self.assertEqual(first['num_validated'], len(STUDIES))
+        self.assertEqual(first['num_studies_not_validated'], 0)
+        second = validate_corpus(self.corpus, cache_filepath=self.cache_fp, num_processes=2)
+        self.assertEqual(second['num_validated'], 0)
+        self.assertEqual(second['num_cached'], len(STUDIES))
+        for k in ('errors', 'warnings', 'studies', 'studies_with_warning'):
+            self.assertEqual(first[k], second[k])
+        # edit one study, only it should be validated again
+        fp = self.corpus[1][1]
+        blob = read_as_json(fp)
+        blob['nexml']['^ot:studyYear'] = 1066
+        write_as_json(blob, fp)
+        third = validate_corpus(self.corpus, cache_filepath=self.cache_fp, num_processes=2)
+        self.assertEqual(third['num_validated'], 1)
+        self.assertNotEqual(third['studies']['s1']['sha'], first['studies']['s1']['sha'])
+        self.assertEqual(third['studies']['s0'], first['studies']['s0'])
+    def testProfile(self):
+        report = validate_corpus(self.corpus, cache_filepath=self.cache_fp, profile=True)
+        self.assertEqual(report['profile']['num_studies'], len(STUDIES))
+        self.assertTrue('profile' not in report['studies']['s0'])
+        report = validate_corpus(self.corpus, cache_filepath=self.cache_fp, profile=True)
+        self.assertEqual(report['profile']['num_studies'], 0)
+    def testUnreadable(self):
+        fp = os.path.join(self.tmp_dir, 'bad.json')
+        with open(fp, 'w') as fo:
+            fo.write('{')
+        report = validate_corpus([('bad', fp)], cache_filepath=self.cache_fp)
+        self.assertEqual(report['num_studies_not_validated'], 1)
+        self.assertTrue('exception' in report['studies']['bad'])
+        report = validate_corpus([('bad', fp)], cache_filepath=self.cache_fp)
+        self.assertEqual(report['num_validated'], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,22 @@
 #! /usr/bin/env python
-from peyotl.evaluate_tree import evaluate_tree_rooting
+from peyotl.evaluate_tree import evaluate_corpus_rootings, \
+                                 evaluate_tree_rooting, \
+                                 rooting_table_row, \
+                                 score_rootings, \
+                                 write_rooting_table, \
+                                 ROOTING_TABLE_COLUMNS
+from peyotl.phylo.tree import parse_newick
 from peyotl.ott import OTT
 from peyotl.utility import get_config_setting_kwargs, get_logger
 from peyotl.nexson_proxy import NexsonProxy
 from peyotl.test.support import pathmap
+from peyotl.test.support.helper import random_newick
 import unittest
+import random
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
 _LOG = get_logger(__name__)
 do_test = False
 try:
@@ -27,6 +39,93 @@ class TestProxy(unittest.TestCase):
         ott = OTT()
         phylo = self.np.get_tree(tree_id='tree324')
         evaluate_tree_rooting(self.nexson, ott, phylo)
+    def testCorpus(self):
+        ott = OTT()
+        corpus = [('pg_329', pathmap.nexson_source_path('pg_329/pg_329.json'))]
+        rows = evaluate_corpus_rootings(corpus, ott)
+        self.assertTrue(len(rows) > 1)
+        self.assertEqual(evaluate_corpus_rootings(corpus * 2, ott, num_processes=2)[::2], rows)
+
+def _brute_force_scores(phylo, taxo_tree):
+    leaves = {}
+    for nd in phylo.postorder_node_iter():
+        if nd.is_leaf:
+            leaves[nd] = frozenset([nd._id])
+        else:
+            leaves[nd] = frozenset().union(*[leaves[c] for c in nd.child_iter()])
+    universe = leaves[phylo.root]
+    taxa = set()
+    for nd in taxo_tree.postorder_node_iter():
+        if not nd.is_leaf:
+            t = frozenset([i._id for i in nd.postorder_iter() if i.is_leaf])
+            if 1 < len(t) < len(universe):
+                taxa.add(t)
+    non_root = [nd for nd in phylo.preorder_node_iter()][1:]
+    def score(root_at, on_edge):
+        path = set()
+        nd = root_at
+        while nd is not None:
+            path.add(nd)
+            nd = nd.parent
+        clades = set()
+        for nd in non_root:
+            if nd in path:
+                clades.add(universe - leaves[nd])
+                if on_edge and nd is root_at:
+                    clades.add(leaves[nd])
+            else:
+                clades.add(leaves[nd])
+        incompat = [t for t in taxa if any([(t & c) and not (t <= c or c <= t) for c in clades])]
+        return len(taxa & clades), len(incompat)
+    scores = {}
+    for nd in phylo.preorder_node_iter():
+        if not nd.is_leaf:
+            scores[(nd, False)] = score(nd, False)
+        if nd.parent is not None:
+            scores[(nd, True)] = score(nd, True)
+    return scores
+
+class TestScoreRootings(unittest.TestCase):
+    def testMatchesAllClades(self):
+        rng = random.Random(5)
+        for num_leaves in (4, 5, 8, 13, 21):
+            labels = ['t{i:d}'.format(i=i) for i in range(num_leaves)]
+            for _ in range(10):
+                phylo = parse_newick(newick=random_newick(labels, rng, 'p'))
+                taxo_tree = parse_newick(newick=random_newick(labels, rng, 'x'))
+                expected = _brute_force_scores(phylo, taxo_tree)
+                result = score_rootings(phylo, taxo_tree)
+                for (nd, on_edge), score in expected.items():
+                    entity = nd.edge if on_edge else nd
+                    self.assertEqual(entity.rooting_here_score, score)
+                best = max([(d, -i) for d, i in expected.values()])
+                self.assertEqual(result['best_score'], (best[0], -best[1]))
+                self.assertEqual(set(result['best_rootings']),
+                                 set([k for k, v in expected.items() if v == result['best_score']]))
+                self.assertEqual(result['current_score'], expected[(phylo.root, False)])
+    def testDisplayedRooting(self):
+        phylo = parse_newick(newick='((a,b)p1,(c,d)p2,(e,f)p3)p0;')
+        taxo_tree = parse_newick(newick='(((a,b)x1,(c,d)x2)x3,e,f)x0;')
+        result = score_rootings(phylo, taxo_tree)
+        self.assertEqual(result['current_score'], (2, 0))
+        self.assertEqual(result['best_score'], (3, 0))
+        self.assertEqual([(nd._id, e) for nd, e in result['best_rootings']], [('p3', False), ('p3', True), ('e', True), ('f', True)])
+        self.assertEqual(result['any_root_incompat'], set())
+        taxo_tree = parse_newick(newick='((a,c)x1,b,d,e,f)x0;')
+        self.assertEqual(score_rootings(phylo, taxo_tree)['any_root_incompat'], set(['x1']))
+    def testTable(self):
+        phylo = parse_newick(newick='((a,b)p1,(c,d)p2,(e,f)p3)p0;')
+        taxo_tree = parse_newick(newick='(((a,b)x1,(c,d)x2)x3,e,f)x0;')
+        rows = [rooting_table_row('s1', 't1', score_rootings(phylo, taxo_tree)),
+                rooting_table_row('s1', 't2', None)]
+        self.assertEqual(rows[0]['best_rooting'], 'p3@node')
+        self.assertEqual(rows[0]['num_tips'], 6)
+        out = StringIO()
+        write_rooting_table(rows, out)
+        lines = out.getvalue().split('\n')
+        self.assertEqual(lines[0].split('\t'), list(ROOTING_TABLE_COLUMNS))
+        self.assertEqual(lines[1].split('\t'), ['s1', 't1', '6', '2', '0', '3', '0', '4', 'p3@node', '0', 'ok'])
+        self.assertEqual(lines[2].split('\t')[-1], 'no taxonomic information')
 
 if __name__ == "__main__":
     unittest.main()
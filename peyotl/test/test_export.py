@@ -2,6 +2,7 @@
 from peyotl.nexson_syntax import extract_tree, PhyloSchema
 from peyotl.test.support import pathmap
 from peyotl.utility import get_logger
+from peyotl.utility.str_util import flush_utf_8_writer, get_utf_8_string_io_writer
 import unittest
 _LOG = get_logger(__name__)
 
@@ -35,6 +36,27 @@ class TestExtract(unittest.TestCase):
         n = pathmap.nexson_obj('10/pg_10.json')
         newick = extract_tree(n, 'tree3', PhyloSchema('nexus', tip_label='ot:ottTaxonName'))
         self.assertTrue(newick.startswith('#'))
+    def testNewickCache(self):
+        n = pathmap.nexson_obj('10/pg_10.json')
+        ps = PhyloSchema('nexus', tip_label='ot:ottTaxonName')
+        cache = {}
+        expected = extract_tree(n, 'tree3', ps)
+        self.assertEqual(extract_tree(n, 'tree3', ps, newick_cache=cache), expected)
+        self.assertEqual(len(cache), 1)
+        # a cache hit must still fill in the NEXUS taxa block
+        self.assertEqual(extract_tree(n, 'tree3', ps, newick_cache=cache), expected)
+        self.assertEqual(len(cache), 1)
+        newick = extract_tree(n, 'tree3', PhyloSchema('newick', tip_label='ot:ottTaxonName'), newick_cache=cache)
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(newick.startswith('('))
+    def testStreamingNexusExport(self):
+        ps = PhyloSchema('nexus', content='study', tip_label='ot:ottTaxonName')
+        expected = ps.convert(pathmap.nexson_obj('10/pg_10.json'), serialize=True)
+        self.assertTrue(expected.startswith('#NEXUS'))
+        f, wrapper = get_utf_8_string_io_writer()
+        self.assertEqual(ps.convert(pathmap.nexson_obj('10/pg_10.json'), serialize=True, output_dest=wrapper), None)
+        flush_utf_8_writer(wrapper)
+        self.assertEqual(f.getvalue(), expected + '\n')
     def testMimicPhylesystemExport(self):
         study_nexson = pathmap.nexson_obj('10/pg_10.json')
         src_schema = PhyloSchema('nexson', version='1.2.1')
@@ -0,0 +1,67 @@
+#! /usr/bin/env python
+from peyotl.nexson_syntax import extract_tree_nexson, \
+                                 extract_otus_nexson, \
+                                 extract_otu_nexson, \
+                                 strip_to_meta_only, \
+                                 PhyloSchema
+from peyotl.nexson_syntax.fragment_index import NexsonFragmentIndex
+from peyotl.test.support import pathmap
+from peyotl.utility import get_logger
+import tempfile
+import shutil
+import unittest
+import os
+_LOG = get_logger(__name__)
+
+class TestFragmentIndex(unittest.TestCase):
+    def setUp(self):
+        self.fp = pathmap.nexson_source_path('10/pg_10.json')
+        self.nexson = pathmap.nexson_obj('10/pg_10.json')
+        self.fi = NexsonFragmentIndex(self.fp)
+    def testTrees(self):
+        self.assertTrue(self.fi.supports_fragments)
+        expected = extract_tree_nexson(self.nexson, None)
+        found = self.fi.read_tree_nexson(None)
+        self.assertEqual(sorted(expected), sorted(found))
+        self.assertEqual(extract_tree_nexson(self.nexson, 'tree3'), self.fi.read_tree_nexson('tree3'))
+        self.assertEqual(self.fi.read_tree_nexson('bogus'), [])
+    def testOtus(self):
+        self.assertEqual(extract_otus_nexson(self.nexson, None, None), self.fi.read_otus_nexson(None))
+        for otus_id in self.nexson['nexml']['otusById'].keys():
+            self.assertEqual(extract_otus_nexson(self.nexson, otus_id, None), self.fi.read_otus_nexson(otus_id))
+        self.assertEqual(self.fi.read_otus_nexson('bogus'), None)
+        self.assertEqual(extract_otu_nexson(self.nexson, None, None), self.fi.read_otu_nexson(None))
+        self.assertEqual(extract_otu_nexson(self.nexson, 'otu1', None), self.fi.read_otu_nexson('otu1'))
+    def testMeta(self):
+        strip_to_meta_only(self.nexson, None)
+        self.assertEqual(self.nexson, self.fi.read_meta_nexson())
+    def testSchemaConvert(self):
+        for schema in [PhyloSchema('nexson', content='tree', content_id='tree3', version='1.2.1'),
+                       PhyloSchema('nexson', content='meta', version='1.2.1'),
+                       PhyloSchema('nexson', content='otus', version='1.2.1'),
+                       PhyloSchema('nexson', content='study', version='1.2.1'),
+                       PhyloSchema('newick', content='tree', content_id='tree3'),
+                       PhyloSchema('nexus', content='subtree', content_id=('tree3', 'ingroup')),
+                      ]:
+            expected = schema.convert(pathmap.nexson_obj('10/pg_10.json'), serialize=True)
+            self.assertEqual(expected, schema.convert(self.fi, serialize=True))
+    def testSidecar(self):
+        d = tempfile.mkdtemp()
+        try:
+            index_fp = os.path.join(d, 'idx', 'pg_10.json')
+            fi = NexsonFragmentIndex(self.fp, index_filepath=index_fp)
+            trees = fi.read_tree_nexson('tree3')
+            self.assertTrue(os.path.exists(index_fp))
+            fi = NexsonFragmentIndex(self.fp, index_filepath=index_fp)
+            self.assertEqual(trees, fi.read_tree_nexson('tree3'))
+        finally:
+            shutil.rmtree(d)
+    def testOldVersion(self):
+        fi = NexsonFragmentIndex(pathmap.nexson_source_path('9/v1.0.json'))
+        self.assertFalse(fi.supports_fragments)
+        schema = PhyloSchema('nexson', content='otus', version='1.2.1')
+        expected = schema.convert(pathmap.nexson_obj('9/v1.0.json'))
+        self.assertEqual(expected, schema.convert(fi))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+#! /usr/bin/env python
+from peyotl.utility.json_backend import available_json_backends, \
+                                        get_json_backend, \
+                                        set_json_backend, \
+                                        json_dumps, \
+                                        json_loads
+from peyotl.utility.input_output import read_as_json, write_as_json
+from peyotl.utility.str_util import get_utf_8_string_io_writer, flush_utf_8_writer
+from peyotl.test.support import pathmap
+import unittest
+import json
+
+class TestJSONBackend(unittest.TestCase):
+    def setUp(self):
+        self.orig_name = get_json_backend().name
+    def tearDown(self):
+        set_json_backend(self.orig_name)
+    def testRoundTrip(self):
+        fp = pathmap.nexson_source_path('10/pg_10.json')
+        with open(fp, 'rb') as fo:
+            raw = fo.read()
+        expected = json.loads(raw.decode('utf-8'))
+        names = [b.name for b in available_json_backends()]
+        self.assertTrue('json' in names)
+        for name in names:
+            set_json_backend(name)
+            self.assertEqual(json_loads(raw), expected)
+            self.assertEqual(read_as_json(fp), expected)
+            self.assertEqual(json.loads(json_dumps(expected)), expected)
+    def testCanonicalOutput(self):
+        blob = pathmap.nexson_obj('10/pg_10.json')
+        expected = json.dumps(blob, indent=0, sort_keys=True) + '\n'
+        for backend in available_json_backends():
+            set_json_backend(backend.name)
+            f, wrapper = get_utf_8_string_io_writer()
+            write_as_json(blob, wrapper)
+            flush_utf_8_writer(wrapper)
+            self.assertEqual(f.getvalue(), expected)
+    def testFallback(self):
+        for backend in available_json_backends():
+            set_json_backend(backend.name)
+            # orjson rejects non-string keys, so this exercises the fallback to the json module
+            self.assertEqual(json.loads(json_dumps({1: 'a'})), {'1': 'a'})
+            self.assertRaises(ValueError, json_loads, '{')
+    def testBogusName(self):
+        self.assertRaises(ValueError, set_json_backend, 'bogus')
+
+if __name__ == "__main__":
+    unittest.main()
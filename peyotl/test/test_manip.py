@@ -1,8 +1,9 @@
 #! /usr/bin/env python
-from peyotl.manip import count_num_trees, iter_trees
+from peyotl.manip import count_num_trees, iter_otus, iter_trees
 from peyotl.test.support import pathmap
 from peyotl.utility import get_logger
 import unittest
+import copy
 _LOG = get_logger(__name__)
 
 class TestManip(unittest.TestCase):
@@ -23,5 +24,21 @@ class TestManip(unittest.TestCase):
                 id_order_list.append(id_order)
         for i in range(1, 4):
             self.assertEqual(id_order_list[0], id_order_list[i])
+    def testIterAnyVersion(self):
+        for d in ['9', 'otu']:
+            otu_sets, tree_lists = [], []
+            for v in ['0.0', '1.0', '1.2']:
+                inp = pathmap.nexson_obj('{d}/v{v}.json'.format(d=d, v=v))
+                orig = copy.deepcopy(inp)
+                otus = [(og, otu_id) for og, otu_id, otu in iter_otus(inp)]
+                self.assertEqual(len(otus), len(set(otus)))
+                otu_sets.append(set(otus))
+                tree_lists.append([(tg, tree_id) for tg, tree_id, tree in iter_trees(inp)])
+                self.assertEqual(inp, orig)
+            self.assertTrue(len(otu_sets[0]) > 0)
+            self.assertTrue(len(tree_lists[0]) > 0)
+            for i in range(1, 3):
+                self.assertEqual(otu_sets[0], otu_sets[i])
+                self.assertEqual(tree_lists[0], tree_lists[i])
 if __name__ == "__main__":
     unittest.main()
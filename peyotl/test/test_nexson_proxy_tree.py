@@ -1,8 +1,12 @@
 #! /usr/bin/env python
-from peyotl.nexson_proxy import NexsonProxy
+from peyotl.nexson_proxy import NexsonProxy, MISSING_INDEX, MISSING_OTT_ID
 from peyotl.test.support import pathmap
 from peyotl.utility import get_logger
 import unittest
+try:
+    import numpy
+except ImportError:
+    numpy = None
 _LOG = get_logger(__name__)
 class TestProxy(unittest.TestCase):
     def setUp(self):
@@ -44,5 +48,84 @@ class TestProxy(unittest.TestCase):
                 self.assertIs(node.edge, ed[node.edge_id])
         self.assertEqual(ntp['^ot:rootNodeId'], edge_less)
         self.assertEqual(ks, its)
+    def testCompactView(self):
+        ntp = self.np.get_tree('tree1')
+        view = ntp.compact_view()
+        self.assertIs(view, ntp.compact_view())
+        self.assertEqual(len(view), len(ntp['nodeById']))
+        by_id = dict([(node.node_id, node) for node in ntp])
+        seen = set()
+        for handle in view:
+            self.assertFalse(hasattr(handle, '__dict__'))
+            node = by_id[handle.node_id]
+            seen.add(handle.node_id)
+            self.assertIs(handle.node, node.node)
+            self.assertIs(handle.edge, node.edge)
+            self.assertEqual(handle.edge_id, node.edge_id)
+            self.assertEqual(handle.is_leaf, node.is_leaf)
+            if node.parent is None:
+                self.assertIs(handle.parent, None)
+                self.assertEqual(handle.index, 0)
+            else:
+                self.assertEqual(handle.parent.node_id, node.parent.node_id)
+                self.assertTrue(handle.parent.index < handle.index)
+            if '@otu' in node.node:
+                self.assertEqual(handle.otu_id, node.node['@otu'])
+                self.assertIs(handle.otu, node.otu.otu)
+                self.assertEqual(handle.ott_id, node.ott_id)
+            else:
+                self.assertIs(handle.otu, None)
+        self.assertEqual(seen, set(by_id.keys()))
+        h = view.get_node('node247')
+        self.assertEqual(h, view.get_node('node247'))
+        self.assertEqual(set([c.node_id for c in h.child_iter()]),
+                         set([c.node_id for c in ntp.get_node('node247').child_iter()]))
+        leaves = [n.node_id for n in view.leaf_node_iter()]
+        self.assertEqual(leaves, [n.node_id for n in view if n.is_leaf])
+        self.assertEqual(set(leaves), set([n.node_id for n in ntp if n.is_leaf]))
+    def testColumns(self):
+        otu_columns = self.np.otu_columns()
+        self.assertIs(otu_columns, self.np.otu_columns())
+        self.assertEqual(len(otu_columns), len([o for o in self.np.otu_iter()]))
+        for i, otu_id in enumerate(otu_columns.otu_ids):
+            otu = self.np.get_otu(otu_id).otu
+            self.assertEqual(otu_columns.otu_index[otu_id], i)
+            self.assertEqual(otu_columns.original_labels[i], otu.get('^ot:originalLabel'))
+            self.assertEqual(otu_columns.ott_ids[i], otu.get('^ot:ottId', MISSING_OTT_ID))
+        ntp = self.np.get_tree('tree1')
+        columns = self.np.tree_columns('tree1')
+        self.assertIs(columns, ntp.columns())
+        self.assertIs(self.np.tree_columns('bogus'), None)
+        view = ntp.compact_view()
+        self.assertEqual(len(columns), len(view))
+        for handle in view:
+            i = handle.index
+            self.assertEqual(columns.node_ids[i], handle.node_id)
+            self.assertEqual(columns.parent[i], -1 if handle.parent is None else handle.parent.index)
+            self.assertEqual(columns.first_child[i] == -1, handle.is_leaf)
+            if handle.otu_id is None:
+                self.assertEqual(columns.otu_index[i], MISSING_INDEX)
+                self.assertEqual(columns.ott_ids[i], MISSING_OTT_ID)
+            else:
+                self.assertEqual(otu_columns.otu_ids[columns.otu_index[i]], handle.otu_id)
+                expected = MISSING_OTT_ID if handle.ott_id is None else handle.ott_id
+                self.assertEqual(columns.ott_ids[i], expected)
+                self.assertEqual(otu_columns.ott_ids[columns.otu_index[i]], expected)
+    def testLargeOttId(self):
+        otu = next(iter(self.np.otu_iter()))
+        otu['^ot:ottId'] = 2 ** 40
+        otu_columns = self.np.otu_columns()
+        self.assertEqual(otu_columns.ott_ids[otu_columns.otu_index[otu._id]], 2 ** 40)
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def testNumpyColumns(self):
+        columns = self.np.tree_columns('tree1')
+        d = columns.as_numpy()
+        self.assertEqual(list(d['parent']), list(columns.parent))
+        self.assertEqual(list(d['otu_index']), list(columns.otu_index))
+        self.assertEqual(list(d['ott_ids']), list(columns.ott_ids))
+        leaves = numpy.nonzero(d['first_child'] == -1)[0]
+        self.assertEqual([columns.node_ids[i] for i in leaves],
+                         [n.node_id for n in self.np.get_tree('tree1').compact_view().leaf_node_iter()])
+        self.assertEqual(list(self.np.otu_columns().as_numpy()['ott_ids']), list(self.np.otu_columns().ott_ids))
 if __name__ == "__main__":
     unittest.main()
@@ -107,6 +107,84 @@ class TestConvert(unittest.TestCase):
         aa = validate_nexson(b)
         annot = aa[0]
         self.assertFalse(annot.has_error())
+    def testCompiledSchemaCheck(self):
+        from peyotl.nexson_validation.schema import _v1_2_Otu, _v1_2_Leaf, _v0_0_Otu
+        self.assertTrue(_v1_2_Leaf.all_valid({'@otu': 'otu1'}))
+        self.assertFalse(_v1_2_Leaf.all_valid({'@otu': 1}))
+        self.assertFalse(_v1_2_Leaf.all_valid({'@otu': 'otu1', '@bogus': 'x'}))
+        self.assertTrue(_v1_2_Otu.all_valid({'^ot:originalLabel': 'a', '^ot:ottId': 1}))
+        # missing expected key and meta objects (which may carry IDs) need the detailed check
+        self.assertFalse(_v1_2_Otu.all_valid({'^ot:originalLabel': 'a'}))
+        self.assertFalse(_v1_2_Otu.all_valid({'^ot:originalLabel': {'$': 'a'}, '^ot:ottId': 1}))
+        self.assertFalse(_v0_0_Otu.all_valid({'@id': 'otu1', 'meta': []}))
+        b = pathmap.nexson_obj('9/v1.2.json')
+        otu = list(b['nexml']['otusById']['otus9']['otuById'].values())[0]
+        otu['^ot:ottId'] = 'not an int'
+        self.assertTrue(validate_nexson(b)[0].has_error())
+    def testCompactLog(self):
+        b = pathmap.nexson_obj('9/v1.2.json')
+        full = validate_nexson(b)[0]
+        compact = validate_nexson(b, compact_log=True)[0]
+        self.assertEqual(full.create_nexson_message_list(), compact.create_nexson_message_list())
+        self.assertEqual(full.get_code_counts(), compact.get_code_counts())
+        self.assertEqual(len(list(compact.iter_nexson_messages())), len(compact.create_nexson_message_list()))
+        capped = validate_nexson(b, max_messages_per_code=2)[0]
+        self.assertEqual(full.get_code_counts(), capped.get_code_counts())
+        n_unrec = full.get_code_counts()['warnings']['UNRECOGNIZED_KEY']
+        self.assertEqual(capped.get_omitted_message_counts()['warnings'], {'UNRECOGNIZED_KEY': n_unrec - 2})
+        msgs = capped.prepare_annotation()['annotationEvent']['message']
+        self.assertEqual(len([m for m in msgs if m['@code'] == 'UNRECOGNIZED_KEY']), 2)
+    def testCappedCountsSkipRepeats(self):
+        for fn in pathmap.all_files(os.path.join('nexson', 'warn_err')):
+            if not fn.endswith('.input'):
+                continue
+            inp = testing_read_json(fn)
+            full = validate_nexson(inp)[0].get_code_counts()
+            for cap in (0, 1):
+                capped = validate_nexson(inp, max_messages_per_code=cap)[0]
+                self.assertEqual(capped.get_code_counts(), full, fn)
+        b = pathmap.nexson_obj(os.path.join('warn_err', 'unparseable_meta.v0.0.input'))
+        capped = validate_nexson(b, max_messages_per_code=0)[0]
+        self.assertEqual(capped.get_code_counts()['errors']['UNPARSEABLE_META'], 1)
+    def testProfile(self):
+        from peyotl.nexson_validation import ValidationProfile
+        p = ValidationProfile()
+        b = pathmap.nexson_obj('9/v1.2.json')
+        plain = validate_nexson(b)[0]
+        v = validate_nexson(b, validation_profile=p)[0]
+        self.assertTrue(v.profile is p)
+        self.assertEqual(plain.create_nexson_message_list(), v.create_nexson_message_list())
+        self.assertEqual(p.get('top-level', 'total')['calls'], 1)
+        self.assertTrue(p.get('node', 'schema')['calls'] > 0)
+        self.assertTrue(p.get('tree', 'ott_duplicates')['calls'] > 0)
+        self.assertAlmostEqual(sum([r[4] for r in p.as_rows()]), p.get('top-level', 'total')['seconds'])
+        validate_nexson(pathmap.nexson_obj('9/v0.0.json'), validation_profile=p)
+        self.assertTrue(p.get('node', 'bf_meta')['calls'] > 0)
+        merged = ValidationProfile.from_dict(p.as_dict()).merge(p)
+        self.assertEqual(merged.num_studies, 4)
+        self.assertEqual(merged.get('node', 'schema')['calls'], 2 * p.get('node', 'schema')['calls'])
+    def testErrorsOnly(self):
+        b = pathmap.nexson_obj('9/v1.2.json')
+        v = validate_nexson(b, errors_only=True, fail_fast=True)[0]
+        self.assertFalse(v.has_error())
+        self.assertEqual(v.create_nexson_message_list(), [])
+        for fn in ('repeated_meta_id.json.v1.2.input', 'unparseable_meta.v0.0.input'):
+            b = pathmap.nexson_obj(os.path.join('warn_err', fn))
+            full = validate_nexson(b)[0]
+            self.assertTrue(full.has_error())
+            eo = validate_nexson(b, errors_only=True)[0]
+            self.assertEqual(eo.get_code_counts()['errors'], full.get_code_counts()['errors'])
+            self.assertEqual(eo.get_code_counts()['warnings'], {})
+            ff = validate_nexson(b, errors_only=True, fail_fast=True)[0]
+            self.assertTrue(ff.has_error())
+            self.assertEqual(len(ff.create_nexson_message_list()), 1)
+    def testMalformedMetaId(self):
+        b = pathmap.nexson_obj('9/v1.2.json')
+        b['nexml']['^ot:dataDeposit'] = {'@href': 'http://example.org', '@id': ['x']}
+        v = validate_nexson(b)[0]
+        self.assertEqual(v.get_code_counts()['errors'], {'INCORRECT_VALUE_TYPE': 1})
+        ff = validate_nexson(b, errors_only=True, fail_fast=True)[0]
+        self.assertEqual(len(ff.create_nexson_message_list()), 1)
 
 if __name__ == "__main__":
     unittest.main()
@@ -31,6 +31,18 @@ class TestConvert(unittest.TestCase):
                                                  max_num_trees_per_study=1)
                 nexson, annotation, validation_log, nexson_adaptor = bundle
                 self.assertFalse(annotation['annotationEvent']['@passedChecks'])
+    def testWriteTimeValidation(self):
+        nexson = pathmap.nexson_obj('9/v1.2.json')
+        annotation, v_log, adaptor = ot_validate(nexson, annotate=False, errors_only=True, fail_fast=True)
+        self.assertTrue(annotation is None)
+        self.assertFalse(v_log.has_error())
+        bundle = validate_and_convert_nexson(nexson,
+                                             '1.2',
+                                             allow_invalid=False,
+                                             annotate=False,
+                                             errors_only=True,
+                                             fail_fast=True)
+        self.assertTrue(bundle[1] is None)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,71 @@
+#! /usr/bin/env python
+from peyotl.ott import make_tree_from_taxonomy, NONE_PAR, _tip_ott_id2par_from_columns
+from peyotl.nexson_proxy import NexsonProxy
+from peyotl.test.support import pathmap
+import unittest
+import sys
+
+class TestTaxonomyNumbering(unittest.TestCase):
+    def setUp(self):
+        #       1
+        #     / | \
+        #    2  3  4
+        #   / \    |
+        #  5   6   7
+        self.id2par = {1: NONE_PAR, 2: 1, 3: 1, 4: 1, 5: 2, 6: 2, 7: 4}
+    def testNumbering(self):
+        tt = make_tree_from_taxonomy(self.id2par)
+        self.assertEqual(sorted(tt.keys()), [1, 2, 3, 4, 5, 6, 7])
+        root = tt[1]
+        self.assertEqual(root.number_tree(0), 7)
+        self.assertEqual([tt[i].preorder_number for i in (1, 2, 5, 6, 3, 4, 7)], list(range(7)))
+        p2t = {}
+        root.fill_preorder2tuples(None, p2t)
+        self.assertEqual(p2t, {0: (None, None, 1, 5),
+                               1: (0, 4, 2, 3),
+                               2: (1, 3),
+                               3: (1, None),
+                               4: (0, 5),
+                               5: (0, None, 6, 6),
+                               6: (5, None)})
+        self.assertEqual(root.indexed_tree().preorder2tuples(), p2t)
+        leaves = set()
+        root.create_leaf_set(leaves)
+        self.assertEqual(leaves, set([3, 5, 6, 7]))
+    def testDeepLineage(self):
+        depth = 4 * sys.getrecursionlimit()
+        id2par = {0: NONE_PAR}
+        for i in range(1, depth):
+            id2par[i] = i - 1
+        tt = make_tree_from_taxonomy(id2par)
+        root = tt[0]
+        self.assertEqual(root.number_tree(0), depth)
+        self.assertEqual(tt[depth - 1].preorder_number, depth - 1)
+        p2t = {}
+        root.fill_preorder2tuples(None, p2t)
+        self.assertEqual(p2t[depth - 1], (depth - 2, None))
+        leaves = set()
+        root.create_leaf_set(leaves)
+        self.assertEqual(leaves, set([depth - 1]))
+        indexed = root.indexed_tree()
+        self.assertEqual(indexed.depth[-1], depth - 1)
+        self.assertEqual(indexed.subtree_size(0), depth)
+        self.assertEqual(indexed.lca(depth - 1, 5), 5)
+
+class TestTipOttIds(unittest.TestCase):
+    def testColumns(self):
+        np = NexsonProxy(nexson=pathmap.nexson_obj('9/v1.2.json'))
+        tree = np.get_tree('tree1')
+        ott_ids, id2par = _tip_ott_id2par_from_columns(tree.columns())
+        expected = {}
+        for node in tree:
+            par_id = None if node.parent is None else node.parent._id
+            if not node.is_leaf:
+                expected[node._id] = par_id
+            elif node.ott_id is not None:
+                expected[node.ott_id] = par_id
+        self.assertEqual(id2par, expected)
+        self.assertEqual(set(ott_ids), set([i for i in expected if isinstance(i, int)]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+#! /usr/bin/env python
+from peyotl.nexson_validation import validate_nexson
+from peyotl.test.support import pathmap
+from peyotl.utility import get_logger
+import unittest
+import copy
+import json
+_LOG = get_logger(__name__)
+
+def _messages(v_log):
+    return sorted([json.dumps(m, sort_keys=True) for m in v_log.create_nexson_message_list(sort=False)])
+
+def _clone_tree(tree, suffix):
+    '''Returns a copy of `tree` with `suffix` added to every node and edge ID'''
+    r = copy.deepcopy(tree)
+    r['nodeById'] = dict([(i + suffix, n) for i, n in r['nodeById'].items()])
+    ebs = {}
+    for source_id, edges in r['edgeBySourceId'].items():
+        by_id = {}
+        for edge_id, edge in edges.items():
+            edge['@source'] += suffix
+            edge['@target'] += suffix
+            by_id[edge_id + suffix] = edge
+        ebs[source_id + suffix] = by_id
+    r['edgeBySourceId'] = ebs
+    r['^ot:rootNodeId'] += suffix
+    if '^ot:inGroupClade' in r:
+        r['^ot:inGroupClade'] += suffix
+    return r
+
+class TestParallelValidation(unittest.TestCase):
+    def setUp(self):
+        self.nexson = pathmap.nexson_obj('9/v1.2.json')
+        tree_group = list(self.nexson['nexml']['treesById'].values())[0]
+        self.trees = tree_group['treeById']
+        for n in range(3):
+            for tree_id, tree in list(self.trees.items()):
+                if 'c' not in tree_id:
+                    clone_id = '{t}c{n:d}'.format(t=tree_id, n=n)
+                    self.trees[clone_id] = _clone_tree(tree, 'c{n:d}'.format(n=n))
+                    tree_group['^ot:treeElementOrder'].append(clone_id)
+    def _assert_same_as_serial(self, nexson):
+        expected = validate_nexson(copy.deepcopy(nexson))[0]
+        found = validate_nexson(copy.deepcopy(nexson), tree_validation_processes=2)[0]
+        self.assertEqual(expected.has_error(), found.has_error())
+        self.assertEqual(_messages(expected), _messages(found))
+        return found
+    def testValid(self):
+        v_log = self._assert_same_as_serial(self.nexson)
+        self.assertFalse(v_log.has_error())
+    def testInvalidTree(self):
+        tree_ids = sorted(self.trees.keys())
+        self.trees[tree_ids[1]]['^ot:rootNodeId'] = 'bogus'
+        self.trees[tree_ids[2]]['nodeById']['extra'] = {}
+        self.assertTrue(self._assert_same_as_serial(self.nexson).has_error())
+    def testRepeatedIds(self):
+        # a copy of a tree with the same node IDs is checked in the parent process
+        tree_ids = sorted(self.trees.keys())
+        self.trees['dup'] = copy.deepcopy(self.trees[tree_ids[0]])
+        self.assertTrue(self._assert_same_as_serial(self.nexson).has_error())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,13 @@
 #! /usr/bin/env python
-from peyotl.phylo.tree import create_tree_from_id2par
+from peyotl.phylo.tree import create_tree_from_id2par, parse_newick
+from peyotl.phylo.compact_tree import CompactTree
 from peyotl.utility import get_logger
 import unittest
+import sys
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
 _bogus_id2par = {'h': 'hp',
                  'p': 'hp',
                  'g': 'hpg',
@@ -57,5 +63,75 @@ class TestPhyloTree(unittest.TestCase):
         tips = ['h', 'p', 'g', 'Po', 'Hy', 'Sy', 'Ho', 'No']
         tree = create_tree_from_id2par(_bogus_id2par, tips)
         tree.do_full_check_of_invariants(self, id2par=_bogus_id2par)
+    def testCompactPaths(self):
+        tips = ['h', 'p', 'g', 'Po', 'Hy', 'Sy', 'Ho', 'No', 'bogus_tip']
+        self.assertRaises(ValueError, create_tree_from_id2par, _bogus_id2par, tips, compact_paths=True)
+        tips = ['h', 'p', 'g', 'Po', 'Hy', 'Sy', 'Ho', 'No']
+        compact = create_tree_from_id2par(_bogus_id2par, tips, compact_paths=True)
+        compact.do_full_check_of_invariants(self, id2par=_bogus_id2par)
+        # paths with suppressed IDs
+        tips = ['hp', 'g', 'Hy', 'Sy', 'No']
+        tree = create_tree_from_id2par(_bogus_id2par, tips)
+        compact = create_tree_from_id2par(_bogus_id2par, tips, compact_paths=True)
+        for node, c_node in zip(tree.preorder_node_iter(), compact.preorder_node_iter()):
+            self.assertEqual(node._id, c_node._id)
+            self.assertEqual(tuple(node.path_ids), c_node.path_ids)
+            self.assertEqual(node.path_set, c_node.path_set)
+            self.assertFalse(hasattr(c_node, '_path_set'))
+        self.assertEqual(sorted(tree._id2node.keys()), sorted(compact._id2node.keys()))
+class TestCompactTree(unittest.TestCase):
+    def testSameTraversals(self):
+        for newick in ['((h,p)hp,g)hpg;', '(a);', '((a,(b,c)bc,d)x,(e,f));', '(((a)))z;']:
+            tree = parse_newick(newick=newick)
+            compact = parse_newick(newick=newick, _class=CompactTree)
+            self.assertEqual([n._id for n in compact.preorder_node_iter()],
+                             [n._id for n in tree.preorder_node_iter()])
+            self.assertEqual([n._id for n in compact.postorder_node_iter()],
+                             [n._id for n in tree.postorder_node_iter()])
+            self.assertEqual(len(compact), len(list(tree.preorder_node_iter())))
+            self.assertEqual([(n._id, d, e) for n, d, e in compact.before_after_node_iter()],
+                             [(n._id, d, e) for n, d, e in tree.before_after_node_iter()])
+            self.assertEqual([n._id for n in compact.leaf_node_iter()], [n._id for n in tree.leaf_node_iter()])
+    def testBeforeAfter(self):
+        tree = parse_newick(newick='((a,(b,c)bc,d)x,(e,f)ef)r;')
+        self.assertEqual([(n._id, d, e) for n, d, e in tree.find_node('x').before_after_iter()],
+                         [('x', 0, True), ('a', 1, True), ('bc', 1, True), ('b', 2, True), ('c', 2, True),
+                          ('bc', 1, False), ('d', 1, True), ('x', 0, False)])
+        self.assertEqual([n._id for n in tree.find_node('x').postorder_iter()], ['a', 'b', 'c', 'bc', 'd', 'x'])
+        self.assertEqual([n._id for n in tree.find_node('bc').preorder_iter()], ['bc', 'b', 'c'])
+        self.assertEqual([n._id for n in tree.leaf_node_iter(tree.find_node('ef'))], ['e', 'f'])
+        self.assertEqual(sorted(tree.leaf_ids), ['a', 'b', 'c', 'd', 'e', 'f'])
+        compact = parse_newick(newick='((a,(b,c)bc,d)x,(e,f)ef)r;', _class=CompactTree)
+        self.assertEqual([n._id for n in compact.leaf_node_iter(compact.find_node('bc'))], ['b', 'c'])
+        for newick in ['((a,(b,c)bc,d)x,(e,f)ef)r;', '(a)r;', '(((a)z)y)x;']:
+            out = StringIO()
+            parse_newick(newick=newick).write_newick(out)
+            self.assertEqual(out.getvalue(), newick + '\n')
+    def testDeepTree(self):
+        depth = 4 * sys.getrecursionlimit()
+        newick = '(' * depth + 'a' + ')' * depth + ';'
+        tree = parse_newick(newick=newick)
+        self.assertEqual(len(list(tree.postorder_node_iter())), depth + 1)
+        self.assertEqual(max([d for n, d, e in tree.before_after_node_iter()]), depth)
+        self.assertEqual([n._id for n in tree.leaf_node_iter()], ['a'])
+    def testSubtrees(self):
+        compact = parse_newick(newick='((a,(b,c)bc,d)x,(e,f)ef)r;', _class=CompactTree)
+        self.assertEqual(compact.leaf_ids, ['a', 'b', 'c', 'd', 'e', 'f'])
+        x = compact.find_node('x')
+        self.assertEqual([n._id for n in x.preorder_iter()], ['x', 'a', 'bc', 'b', 'c', 'd'])
+        self.assertEqual([n._id for n in x.postorder_iter()], ['a', 'b', 'c', 'bc', 'd', 'x'])
+        self.assertEqual([n._id for n in x.child_iter()], ['a', 'bc', 'd'])
+        self.assertEqual(compact.find_node('b').parent, compact.find_node('bc'))
+        self.assertTrue(compact.root.parent is None)
+        self.assertTrue(compact.find_node('e').is_leaf)
+        self.assertFalse(x.is_leaf)
+    def testEdgeInfo(self):
+        compact = parse_newick(newick='((a:1,b)[c]:2.5,c)r:0.1;', _class=CompactTree)
+        self.assertEqual(compact.find_node('a').edge_info, '1')
+        self.assertEqual(compact.find_node('b').edge_info, None)
+        self.assertEqual(compact.find_node('a').parent.edge_info, '2.5')
+        self.assertEqual(compact.find_node('a').parent._id, None)
+        self.assertEqual(compact.root.edge_info, '0.1')
+
 if __name__ == "__main__":
     unittest.main()
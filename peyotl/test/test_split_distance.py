@@ -0,0 +1,87 @@
+#! /usr/bin/env python
+from peyotl.phylo.split_distance import collection_tree_splits, \
+                                        corpus_tree_splits, \
+                                        iter_pairwise_distances, \
+                                        split_distance, \
+                                        split_distance_matrix, \
+                                        write_distance_table, \
+                                        DISTANCE_TABLE_COLUMNS
+from peyotl.phylo.tree import parse_newick
+from peyotl.phylo.compact_tree import CompactTree
+from peyotl.test.support import pathmap
+from peyotl.test.support.helper import random_newick
+import unittest
+import random
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+def _brute_force_rf(one, other):
+    leaf_sets = []
+    for tree in (one, other):
+        leaves = {}
+        for nd in tree.postorder_node_iter():
+            if nd.is_leaf:
+                leaves[nd] = frozenset([nd._id])
+            else:
+                leaves[nd] = frozenset().union(*[leaves[c] for c in nd.child_iter()])
+        leaf_sets.append(leaves)
+    common = leaf_sets[0][one.root] & leaf_sets[1][other.root]
+    low = min(common)
+    splits = []
+    for tree, leaves in zip((one, other), leaf_sets):
+        s = set()
+        for nd, ls in leaves.items():
+            ls = ls & common
+            if low in ls:
+                ls = common - ls
+            if 2 <= len(ls) <= len(common) - 2:
+                s.add(ls)
+        splits.append(s)
+    return len(common), len(splits[0] ^ splits[1])
+
+class TestSplitDistance(unittest.TestCase):
+    def testSmall(self):
+        trees = [parse_newick(newick=n, _class=CompactTree) for n in ('((ott1:1,ott2:1):2,(ott3:1,ott4:1):1,ott5:1);',
+                                                                       '((ott1:1,ott3:1):2,(ott2:1,ott4:1):1,ott5:1,x:3);',
+                                                                       '((ott1:1,ott2:1):3,ott5:1,(ott3:1,ott4:1));',
+                                                                       '(ott1,ott2,ott7);')]
+        splits = collection_tree_splits(trees)
+        self.assertEqual(split_distance(splits[0], splits[1]), (5, 4, 6.0))
+        # same topology, but (ott1,ott2) is 1 longer and (ott3,ott4) is 1 shorter
+        self.assertEqual(split_distance(splits[0], splits[2]), (5, 0, 2.0))
+        self.assertEqual(split_distance(splits[0], splits[3])[0], 2)
+        rows = list(iter_pairwise_distances(splits))
+        self.assertEqual([r[:2] for r in rows], [(0, 1), (0, 2), (1, 2)])
+        rf, weighted = split_distance_matrix(splits)
+        self.assertEqual(rf[1][0], 4)
+        self.assertEqual(rf[3], [None, None, None, None])
+        out = StringIO()
+        write_distance_table(rows, out, splits)
+        lines = out.getvalue().split('\n')
+        self.assertEqual(lines[0].split('\t'), list(DISTANCE_TABLE_COLUMNS))
+        self.assertEqual(lines[1].split('\t')[:4], ['0', '1', '5', '4'])
+    def testRandom(self):
+        rng = random.Random(5)
+        labels = ['ott{i:d}'.format(i=i) for i in range(40)]
+        newicks = []
+        for _ in range(12):
+            newicks.append(random_newick([i for i in labels if rng.random() < 0.5], rng))
+        trees = [parse_newick(newick=n) for n in newicks]
+        splits = collection_tree_splits(trees)
+        for one, other in [(i, j) for i in range(len(trees)) for j in range(i + 1, len(trees))]:
+            n, rf = _brute_force_rf(trees[one], trees[other])
+            self.assertEqual(split_distance(splits[one], splits[other])[:2], (n, rf))
+        serial = list(iter_pairwise_distances(splits))
+        self.assertEqual(list(iter_pairwise_distances(splits, num_processes=2)), serial)
+        self.assertEqual(split_distance_matrix(splits, num_processes=2), split_distance_matrix(splits))
+    def testNexson(self):
+        fp = pathmap.nexson_source_path('pg_329/pg_329.json')
+        splits = corpus_tree_splits([('pg_329', fp), ('copy', fp)])
+        self.assertEqual([s.label for s in splits], [('pg_329', 'tree324'), ('copy', 'tree324')])
+        self.assertTrue(splits[0].num_leaves >= 4)
+        self.assertEqual(list(iter_pairwise_distances(splits)), [(0, 1, splits[0].num_leaves, 0, 0.0)])
+
+if __name__ == "__main__":
+    unittest.main()
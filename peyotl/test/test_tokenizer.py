@@ -1,5 +1,8 @@
 #! /usr/bin/env python
-from peyotl.utility.tokenizer import NewickTokenizer, NewickEvents, NewickEventFactory
+from peyotl.utility.tokenizer import NewickTokenizer, \
+                                    ChunkedNewickTokenizer, \
+                                    NewickEvents, \
+                                    NewickEventFactory
 from peyotl.utility.str_util import StringIO
 from peyotl.utility import get_logger
 import unittest
@@ -22,12 +25,31 @@ class TestNewickTokenizer(unittest.TestCase):
         self._do_test(content, exp)
     def _do_test(self, content, expected):
         self.assertEqual([i for i in NewickTokenizer(StringIO(content))], expected)
+        for chunk_size in (1, 2, 3, 1 << 20):
+            tok = ChunkedNewickTokenizer(StringIO(content), chunk_size=chunk_size)
+            self.assertEqual([i for i in tok], expected)
     def testOddQuotes(self):
         content = "((h_ ,'p)h p,g()[],:_)hpg;"
         tok = NewickTokenizer(StringIO(content))
         content = "((h_ ,'p')h p,'g()[]',:_')hpg;"
         tok = NewickTokenizer(StringIO(content))
         self.assertRaises(Exception, tok.tokens)
+        for chunk_size in (1, 2, 1 << 20):
+            tok = ChunkedNewickTokenizer(StringIO(content), chunk_size=chunk_size)
+            self.assertRaises(ValueError, tok.tokens)
+    def testChunkedMatchesNewickTokenizer(self):
+        for content in ["((a,b)c:1,'d''e')f[x];", "(a,b));", "(a,b)(c);", "((a,b)c;", "(a,b);c",
+                        "(a,'b)c;", "(a,b[c);", "(a:,b);", "(a,b\\c);", "(,a);", " ('a''''b' , c ) ;  "]:
+            try:
+                exp = [(t, tok.prev_token) for tok in [NewickTokenizer(StringIO(content))] for t in tok]
+            except ValueError:
+                exp = None
+            for chunk_size in (1, 2, 5, 1 << 20):
+                tok = ChunkedNewickTokenizer(StringIO(content), chunk_size=chunk_size)
+                if exp is None:
+                    self.assertRaises(ValueError, tok.tokens)
+                else:
+                    self.assertEqual([(t, tok.prev_token) for t in tok], exp)
     def testBranchLen(self):
         exp = ['(', '(', 'h', ':', '4.0', ',', 'p', ':', '1.1461E-5', ')',
                'hp', ':', '1351.146436', ',', 'g', ')', 'hpg', ';']
@@ -56,10 +78,23 @@ class TestNewickEvents(unittest.TestCase):
                {'edge_info': None, 'type': NewickEvents.CLOSE_SUBTREE, 'comments': [], 'label': 'hpg'}
               ]
         self._do_test(content, exp)
+    def testEdgeInfo(self):
+        content = '((h:1,p)[c]:2,g)hpg;'
+        exp = [{'type': NewickEvents.OPEN_SUBTREE, 'comments': []},
+               {'type': NewickEvents.OPEN_SUBTREE, 'comments': []},
+               {'edge_info': '1', 'type': NewickEvents.TIP, 'comments': [], 'label': 'h'},
+               {'edge_info': None, 'type': NewickEvents.TIP, 'comments': [], 'label': 'p'},
+               {'edge_info': '2', 'type': NewickEvents.CLOSE_SUBTREE, 'comments': ['c'], 'label': None},
+               {'edge_info': None, 'type': NewickEvents.TIP, 'comments': [], 'label': 'g'},
+               {'edge_info': None, 'type': NewickEvents.CLOSE_SUBTREE, 'comments': [], 'label': 'hpg'}
+              ]
+        self._do_test(content, exp)
     def _do_test(self, content, expected):
         e = [deepcopy(i) for i in NewickEventFactory(tokenizer=NewickTokenizer(stream=StringIO(content)))]
         #print(e)
         self.assertEqual(e, expected)
+        e = [deepcopy(i) for i in NewickEventFactory(newick=content)]
+        self.assertEqual(e, expected)
 
 if __name__ == "__main__":
     unittest.main()
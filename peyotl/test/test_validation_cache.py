@@ -0,0 +1,81 @@
+#! /usr/bin/env python
+from peyotl.nexson_validation import validate_nexson, ValidationCache, NexsonWarningCodes
+from peyotl.test.support import pathmap
+from peyotl.utility import get_logger
+import unittest
+import copy
+import json
+_LOG = get_logger(__name__)
+
+def _messages(v_log):
+    return sorted([json.dumps(m, sort_keys=True) for m in v_log.create_nexson_message_list(sort=False)])
+
+def _validate(nexson, cache=None):
+    codes_to_skip = [NexsonWarningCodes.UNVALIDATED_ANNOTATION] #pylint: disable=E1101
+    return validate_nexson(copy.deepcopy(nexson), codes_to_skip, validation_cache=cache)[0]
+
+class TestValidationCache(unittest.TestCase):
+    def setUp(self):
+        self.nexson = pathmap.nexson_obj('9/v1.2.json')
+    def testCachedLogMatchesFull(self):
+        for fn in ['9/v1.2.json', '10/pg_10.json', 'lacking_otus/ot_65.json.v1.2.input']:
+            nexson = pathmap.nexson_obj(fn)
+            expected = _messages(_validate(nexson))
+            cache = ValidationCache()
+            self.assertEqual(expected, _messages(_validate(nexson, cache)))
+            self.assertEqual(cache.hits, 0)
+            self.assertEqual(expected, _messages(_validate(nexson, cache)))
+            self.assertTrue(cache.hits > 0)
+    def testChangedOtu(self):
+        cache = ValidationCache()
+        _validate(self.nexson, cache)
+        edited = copy.deepcopy(self.nexson)
+        otus = list(edited['nexml']['otusById'].values())[0]['otuById']
+        otu_ids = sorted(otus.keys())
+        otus[otu_ids[0]]['^ot:originalLabel'] = 'changed'
+        otus[otu_ids[1]]['bogus'] = True
+        otus[otu_ids[2]]['^ot:ottId'] = otus[otu_ids[3]].get('^ot:ottId', 1)
+        num_trees = len(list(edited['nexml']['treesById'].values())[0]['treeById'])
+        hits, misses = cache.hits, cache.misses
+        expected = _messages(_validate(edited))
+        self.assertEqual(expected, _messages(_validate(edited, cache)))
+        # only the otus group is re-validated
+        self.assertEqual(cache.misses - misses, 1)
+        self.assertEqual(cache.hits - hits, 1 + num_trees)
+    def testChangedTree(self):
+        cache = ValidationCache()
+        _validate(self.nexson, cache)
+        edited = copy.deepcopy(self.nexson)
+        trees = list(edited['nexml']['treesById'].values())[0]['treeById']
+        tree = trees[sorted(trees.keys())[0]]
+        node_by_id = tree['nodeById']
+        node_by_id[sorted(node_by_id.keys())[0]]['@junk'] = 1
+        tree['^ot:rootNodeId'] = 'bogus'
+        self.assertEqual(_messages(_validate(edited)), _messages(_validate(edited, cache)))
+    def testRepeatedId(self):
+        cache = ValidationCache()
+        _validate(self.nexson, cache)
+        edited = copy.deepcopy(self.nexson)
+        otus = list(edited['nexml']['otusById'].values())[0]['otuById']
+        trees = list(edited['nexml']['treesById'].values())[0]['treeById']
+        tree = trees[sorted(trees.keys())[0]]
+        otus[sorted(tree['nodeById'].keys())[0]] = {'^ot:originalLabel': 'dup'}
+        full = _validate(edited)
+        self.assertTrue(full.has_error())
+        self.assertEqual(_messages(full), _messages(_validate(edited, cache)))
+        self.assertEqual(_messages(_validate(self.nexson)), _messages(_validate(self.nexson, cache)))
+    def testPersisted(self):
+        cache = ValidationCache()
+        expected = _messages(_validate(self.nexson, cache))
+        restored = ValidationCache(entries=json.loads(json.dumps(cache.as_dict())))
+        self.assertEqual(len(restored), len(cache))
+        self.assertEqual(expected, _messages(_validate(self.nexson, restored)))
+        self.assertEqual(restored.misses, 0)
+    def testMaxEntries(self):
+        cache = ValidationCache(max_entries=2)
+        expected = _messages(_validate(self.nexson, cache))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(expected, _messages(_validate(self.nexson, cache)))
+
+if __name__ == "__main__":
+    unittest.main()
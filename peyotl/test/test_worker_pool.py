@@ -0,0 +1,29 @@
+#! /usr/bin/env python
+from peyotl.utility.worker_pool import imap_with_worker_state
+import unittest
+
+_STATE = None
+
+def _set_state(state):
+    global _STATE
+    prev = _STATE
+    _STATE = state
+    return prev
+
+def _add_state(job):
+    return job + _STATE
+
+class TestWorkerPool(unittest.TestCase):
+    def testSerialAndPool(self):
+        jobs = list(range(10))
+        expected = [i + 100 for i in jobs]
+        self.assertEqual(list(imap_with_worker_state(_add_state, jobs, _set_state, 100)), expected)
+        self.assertIs(_STATE, None)
+        self.assertEqual(list(imap_with_worker_state(_add_state, jobs, _set_state, 100, num_processes=2)),
+                         expected)
+        unordered = imap_with_worker_state(_add_state, jobs, _set_state, 100, num_processes=2, ordered=False)
+        self.assertEqual(sorted(unordered), expected)
+        self.assertIs(_STATE, None)
+
+if __name__ == "__main__":
+    unittest.main()
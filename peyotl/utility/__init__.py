@@ -2,7 +2,7 @@
 '''Simple utility functions that do not depend on any other part of
 peyotl.
 '''
-__all__ = ['input_output', 'simple_file_lock', 'str_util']
+__all__ = ['input_output', 'json_backend', 'simple_file_lock', 'str_util']
 import logging
 import json
 import time
@@ -3,6 +3,7 @@
 peyotl.
 '''
 from peyotl.utility.str_util import is_str_type, StringIO
+from peyotl.utility.json_backend import json_dumps, json_loads
 import codecs
 import json
 import stat
@@ -50,6 +51,12 @@ def download(url, encoding='utf-8'):
     return response.text
 
 def write_as_json(blob, dest, indent=0, sort_keys=True):
+    '''Writes `blob` as JSON to `dest` (a filepath or file object).
+    The defaults produce the canonical form (sorted keys, one value per line)
+    that keeps git diffs of study files small. That form is always written by
+    the json module. If `indent` is None, the output is compact and is written
+    by the fastest JSON library available (see peyotl.utility.json_backend).
+    '''
     opened_out = False
     if is_str_type(dest):
         out = codecs.open(dest, mode='w', encoding='utf-8')
@@ -57,7 +64,10 @@ def write_as_json(blob, dest, indent=0, sort_keys=True):
     else:
         out = dest
     try:
-        json.dump(blob, out, indent=indent, sort_keys=sort_keys)
+        if indent is None:
+            out.write(json_dumps(blob, sort_keys=sort_keys))
+        else:
+            json.dump(blob, out, indent=indent, sort_keys=sort_keys)
         out.write('\n')
     finally:
         out.flush()
@@ -81,7 +91,7 @@ def write_pretty_dict_str(out, obj, indent=2):
 
 def read_as_json(infi, encoding='utf-8'):
     with codecs.open(infi, 'r', encoding=encoding) as inpf:
-        n = json.load(inpf)
+        n = json_loads(inpf.read())
     return n
 
 def parse_study_tree_list(fp):
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+'''Selection of the library used to encode and decode JSON.
+
+The fastest installed library of orjson, python-rapidjson, and ujson is
+used, falling back to the standard library's json module. The choice can
+be forced by setting the PEYOTL_JSON_BACKEND environmental variable to
+"orjson", "rapidjson", "ujson" or "json" (or by calling set_json_backend).
+
+The accelerated libraries do not produce the same whitespace as the
+standard library, so "canonical" output (sorted keys and newline-separated
+values, as used by write_as_json for the files that live in git) is always
+produced by the json module.
+'''
+import json
+import os
+import sys
+_JSON_BACKEND_ENVAR = 'PEYOTL_JSON_BACKEND'
+
+class JSONBackend(object):
+    '''Wraps the loads and (compact) dumps functions of a JSON library.
+    `dumps` returns text (unicode) in python 3 and a str or unicode object in python 2.
+    '''
+    def __init__(self, name, loads, dumps):
+        self.name = name
+        self._loads = loads
+        self._dumps = dumps
+    def loads(self, s):
+        return self._loads(s)
+    def dumps(self, obj, sort_keys=False):
+        return self._dumps(obj, sort_keys)
+    def __repr__(self):
+        return 'JSONBackend({})'.format(repr(self.name))
+
+def _stdlib_dumps(obj, sort_keys):
+    return json.dumps(obj, sort_keys=sort_keys)
+
+def _create_stdlib_backend():
+    return JSONBackend('json', json.loads, _stdlib_dumps)
+
+def _create_orjson_backend():
+    import orjson
+    def _orjson_dumps(obj, sort_keys):
+        if sort_keys:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode('utf-8')
+        return orjson.dumps(obj).decode('utf-8')
+    return JSONBackend('orjson', orjson.loads, _orjson_dumps)
+
+def _create_rapidjson_backend():
+    import rapidjson
+    def _rapidjson_dumps(obj, sort_keys):
+        return rapidjson.dumps(obj, sort_keys=sort_keys, ensure_ascii=False)
+    return JSONBackend('rapidjson', rapidjson.loads, _rapidjson_dumps)
+
+def _create_ujson_backend():
+    import ujson
+    if sys.version_info.major == 2:
+        raise ImportError('ujson is not used with python 2')
+    # ujson versions before 2 truncate floats when serializing
+    if int(ujson.__version__.split('.')[0]) < 2:
+        raise ImportError('ujson version {} is too old'.format(ujson.__version__))
+    def _ujson_dumps(obj, sort_keys):
+        return ujson.dumps(obj, sort_keys=sort_keys, ensure_ascii=False, escape_forward_slashes=False)
+    return JSONBackend('ujson', ujson.loads, _ujson_dumps)
+
+# in order of preference
+_BACKEND_FACTORIES = (('orjson', _create_orjson_backend),
+                      ('rapidjson', _create_rapidjson_backend),
+                      ('ujson', _create_ujson_backend),
+                      ('json', _create_stdlib_backend), )
+_BACKEND = None
+
+def available_json_backends():
+    '''Returns a list of the JSONBackend objects for the libraries that are installed'''
+    r = []
+    for name, factory in _BACKEND_FACTORIES:
+        try:
+            r.append(factory())
+        except ImportError:
+            pass
+    return r
+
+def _create_backend(name):
+    for n, factory in _BACKEND_FACTORIES:
+        if n == name:
+            return factory()
+    raise ValueError('JSON backend "{}" not recognized'.format(name))
+
+def set_json_backend(name=None):
+    '''Selects the JSON library by name. If `name` is None, the
+    PEYOTL_JSON_BACKEND environmental variable or the fastest installed
+    library is used. Returns the JSONBackend.
+    Raises ImportError if the named library is not installed.
+    '''
+    global _BACKEND
+    if name is None:
+        name = os.environ.get(_JSON_BACKEND_ENVAR)
+    if name:
+        _BACKEND = _create_backend(name)
+    else:
+        _BACKEND = available_json_backends()[0]
+    return _BACKEND
+
+def get_json_backend():
+    if _BACKEND is None:
+        return set_json_backend()
+    return _BACKEND
+
+def json_loads(s):
+    '''Decodes the JSON in `s` (a string or utf-8 encoded bytes).
+    Input that the selected backend rejects is handed to the json module,
+    so that errors (and extensions such as NaN) match the standard library.
+    '''
+    backend = get_json_backend()
+    if backend.name == 'json':
+        return json.loads(s)
+    try:
+        return backend.loads(s)
+    except (ValueError, TypeError, OverflowError):
+        return json.loads(s)
+
+def json_dumps(obj, sort_keys=False):
+    '''Returns a compact JSON serialization of `obj`.
+    For output that should be stable for diffs, use write_as_json (which
+    uses the json module with sorted keys).
+    '''
+    backend = get_json_backend()
+    try:
+        return backend.dumps(obj, sort_keys)
+    except (ValueError, TypeError, OverflowError):
+        if backend.name == 'json':
+            raise
+        return _stdlib_dumps(obj, sort_keys)
@@ -2,6 +2,7 @@
 from peyotl.utility import get_logger
 from peyotl.utility.input_output import read_filepath
 from enum import Enum
+import codecs
 import re
 _LOG = get_logger(__name__)
 _WS = re.compile(r'\s+')
@@ -212,6 +213,216 @@ class NewickTokenizer(object):
         return cb()
     next = __next__
 
+# One significant token, after optional whitespace. Groups:
+#   1 punctuation, 2 comment content, 3 quoted label content (with '' for
+#   each embedded quote), 4 unquoted label (not stripped of trailing space).
+_TOKEN_PAT = re.compile(r"\s*(?:([(),:;])|\[([^\]]*)\]|'([^']*(?:''[^']*)*)'|([^'():,;\\\[\s][^'():,;\\\[]*))")
+# enum member lookup is slow, so the chunked tokenizer uses these aliases
+_TT_NONE = NewickTokenType.NONE
+_TT_OPEN = NewickTokenType.OPEN
+_TT_CLOSE = NewickTokenType.CLOSE
+_TT_COMMA = NewickTokenType.COMMA
+_TT_COLON = NewickTokenType.COLON
+_TT_LABEL = NewickTokenType.LABEL
+_TT_EDGE_INFO = NewickTokenType.EDGE_INFO
+_TT_SEMICOLON = NewickTokenType.SEMICOLON
+_NON_WS = re.compile(r'\S')
+_LABEL_OR_CLOSE = (_TT_LABEL, _TT_CLOSE)
+_LABEL_CLOSE_OR_EDGE = (_TT_LABEL, _TT_CLOSE, _TT_EDGE_INFO)
+_BEFORE_LABEL = (_TT_OPEN, _TT_CLOSE, _TT_COMMA)
+
+class ChunkedNewickTokenizer(object):
+    '''Drop-in replacement for NewickTokenizer (same tokens, prev_token,
+    comments and error checking) intended for large inputs.
+    Rather than reading the whole input and dispatching on each character,
+    it matches whole tokens with one compiled regex over a buffer that is
+    filled from the stream `chunk_size` characters at a time. A token that
+    reaches the end of the buffer is matched again after the buffer has been
+    extended, so labels, comments and quoted strings may span chunks.
+    '''
+    def __init__(self, stream=None, newick=None, filepath=None, chunk_size=1 << 20):
+        self._stream, self._own_stream = stream, False
+        self._buf, self._eof = '', False
+        if stream is None:
+            if newick is not None:
+                self._buf, self._eof = newick, True
+            else:
+                if filepath is None:
+                    raise ValueError('"stream", "newick", or "filepath" must be provided')
+                self._stream = codecs.open(filepath, 'r', encoding='utf-8')
+                self._own_stream = True
+        self._chunk_size = chunk_size
+        self._pos = 0
+        self._consumed = 0 # number of characters that preceded self._buf
+        self.num_open_parens = 0
+        self.num_close_parens = 0
+        self.comments = []
+        self.prev_token = _TT_NONE
+        self.finished = False
+        self._token_gen = None
+        c = self._find_significant_char()
+        if c != '(':
+            if c is None:
+                c = 'the end of the input'
+            self._raise_unexpected('Expected the first character to be a "(", but found "{}"'.format(c))
+        # just so we don't have to check for NONE on every ( we fake a legal preceding token
+        self.prev_token = _TT_OPEN
+    def tokens(self):
+        return [i for i in iter(self)]
+    def file_pos(self):
+        return 'character #{}'.format(1 + self._consumed + self._pos)
+    def _raise_unexpected(self, m):
+        if self.prev_token != _TT_NONE:
+            raise ValueError('Error: {m} at {f} after a/an {p} token'.format(m=m,
+                                                                             f=self.file_pos(),
+                                                                             p=self.prev_token.name))
+        raise ValueError('Error: {m} at {f}'.format(m=m, f=self.file_pos()))
+    def __iter__(self):
+        if self._token_gen is None:
+            self._token_gen = self._generate_tokens()
+        return self._token_gen
+    def __next__(self):
+        return next(iter(self))
+    next = __next__
+    def _refill(self):
+        rest = self._buf[self._pos:]
+        self._consumed += self._pos
+        # reading at least as much as is pending keeps the rescanning of long tokens linear
+        data = self._stream.read(max(self._chunk_size, len(rest)))
+        if not data:
+            self._eof = True
+            if self._own_stream:
+                self._stream.close()
+        self._buf = rest + data
+        self._pos = 0
+    def _find_significant_char(self):
+        '''Moves to the next non-whitespace character and returns it (None at the end of the input).'''
+        while True:
+            m = _NON_WS.search(self._buf, self._pos)
+            if m is not None:
+                self._pos = m.start()
+                return m.group()
+            if self._eof:
+                self._pos = len(self._buf)
+                return None
+            self._refill()
+    def _check_end_of_input(self):
+        '''Called when no token can be matched. Returns if the input is
+        exhausted, raises ValueError if it is not valid newick.
+        '''
+        c = self._find_significant_char()
+        if c is None:
+            if self.num_close_parens != self.num_open_parens:
+                raise ValueError('Number of close parentheses ({c:d}) does not equal '\
+                                 'the number of open parentheses ({o:d}) at the end '\
+                                 'of the input ({f}).'.format(c=self.num_close_parens,
+                                                              o=self.num_open_parens,
+                                                              f=self.file_pos()))
+            return
+        if self.finished:
+            m = 'Unexpected newick content after the semicolon. Found "{c}" and {f}'
+            raise ValueError(m.format(c=c, f=self.file_pos()))
+        if c == "'":
+            self._raise_unexpected("Found an opening single-quote, but not closing quote")
+        if c == '[':
+            self._raise_unexpected("Found an opening [ of a comment, but not closing ]")
+        self._raise_unexpected('Expecting a label but found "{}"'.format(c))
+    def _punctuation_error(self, pos, c):
+        self._pos = pos
+        prev = self.prev_token
+        if c == ',':
+            self._raise_unexpected('Expecting "," to be preceded by ")", a taxon label, or branch information')
+        if c == '(':
+            self._raise_unexpected('Expecting "(" to be preceded by "," or "("')
+        if c == ')':
+            if prev in _LABEL_CLOSE_OR_EDGE:
+                self._raise_unexpected('Number of close parentheses exceeds the number of open parentheses')
+            self._raise_unexpected('Expecting ")" to be preceded by a label or branch information')
+        if c == ':':
+            self._raise_unexpected('Expecting ":" to be preceded by ")" or a taxon label')
+        self._raise_unexpected('Expecting ";" to be preceded by ")", a taxon label, or branch information')
+    def _generate_tokens(self):
+        # The scanning state is kept in locals (and stored in self._pos before
+        #   anything that needs it), because this loop runs once per token.
+        comments = self.comments
+        finditer = _TOKEN_PAT.finditer
+        buf, pos = self._buf, self._pos
+        prev = self.prev_token
+        while True:
+            eof = self._eof
+            incomplete = False
+            for m in finditer(buf, pos):
+                if m.start() != pos:
+                    break # skipped over something that is not a token
+                end = m.end()
+                if end == len(buf) and not eof:
+                    incomplete = True # the token may continue in the next chunk
+                    break
+                if prev is _TT_SEMICOLON:
+                    break # content after the semicolon
+                g = m.lastindex
+                if g == 4:
+                    tok = m.group(4).strip().replace('_', ' ')
+                elif g == 1:
+                    tok = m.group(1)
+                elif g == 2:
+                    comments.append(m.group(2))
+                    pos = end
+                    continue
+                else:
+                    if buf[end:end + 1] == "'":
+                        # the quoted label was cut short, because its closing quote is not in the buffer
+                        incomplete = True
+                        break
+                    tok = m.group(3).replace("''", "'")
+                if g != 1:
+                    if prev is _TT_COLON:
+                        prev = _TT_EDGE_INFO
+                    elif prev in _BEFORE_LABEL:
+                        prev = _TT_LABEL
+                    else:
+                        self._pos = m.start(g)
+                        msg = 'Found "{}", but expected a label to be preceded by "(", ")", or a comma'.format(tok)
+                        self._raise_unexpected(msg)
+                elif tok == ',':
+                    if prev not in _LABEL_CLOSE_OR_EDGE:
+                        self._punctuation_error(end - 1, tok)
+                    prev = _TT_COMMA
+                elif tok == '(':
+                    if prev is not _TT_OPEN and prev is not _TT_COMMA:
+                        self._punctuation_error(end - 1, tok)
+                    self.num_open_parens += 1
+                    prev = _TT_OPEN
+                elif tok == ')':
+                    if prev not in _LABEL_CLOSE_OR_EDGE or self.num_close_parens >= self.num_open_parens:
+                        self._punctuation_error(end - 1, tok)
+                    self.num_close_parens += 1
+                    prev = _TT_CLOSE
+                elif tok == ':':
+                    if prev not in _LABEL_OR_CLOSE:
+                        self._punctuation_error(end - 1, tok)
+                    prev = _TT_COLON
+                else:
+                    if prev not in _LABEL_CLOSE_OR_EDGE:
+                        self._punctuation_error(end - 1, tok)
+                    self.finished = True
+                    prev = _TT_SEMICOLON
+                pos = end
+                self.prev_token = prev
+                yield tok
+                del comments[:]
+            self._pos = pos
+            if eof:
+                self._check_end_of_input()
+                return
+            if not incomplete:
+                n = _NON_WS.search(buf, pos)
+                if n is not None and (self.finished or n.group() not in "'["):
+                    self._check_end_of_input() # raises
+                # otherwise whitespace, or a quote or comment that may be closed in the next chunk
+            self._refill()
+            buf, pos = self._buf, self._pos
+
 class NewickEvents(Enum):
     OPEN_SUBTREE = 0
     TIP = 1
@@ -233,7 +444,7 @@ class NewickEventFactory(object):
             if newick is None and filepath is None:
                 raise ValueError('tokenizer or newick argument must be supplied')
             #_LOG.debug('newick = {} filepath = {}'.format(newick, filepath))
-            self._tokenizer = NewickTokenizer(newick=newick, filepath=filepath)
+            self._tokenizer = ChunkedNewickTokenizer(newick=newick, filepath=filepath)
         else:
             self._tokenizer = tokenizer
         self._base_it = iter(self._tokenizer)
@@ -267,7 +478,8 @@ class NewickEventFactory(object):
             return self._greedy_token_seq(tok, NewickEvents.TIP)
         elif self._tokenizer.prev_token == NewickTokenType.CLOSE:
             # when reading a tip, be greedy about grabbing trailing comments
-            return self._greedy_token_seq(tok, NewickEvents.CLOSE_SUBTREE)
+            #   (tok is the ")", the label of the subtree, if any, is the next token)
+            return self._greedy_token_seq(None, NewickEvents.CLOSE_SUBTREE)
         elif self._tokenizer.prev_token == NewickTokenType.COMMA:
             self._comments.extend(self._tokenizer.comments)
             return next(self)
@@ -285,7 +497,7 @@ class NewickEventFactory(object):
         if tok == ':':
             tok = next(self._base_it)
             self._comments.extend(self._tokenizer.comments)
-            assert self._prev_type == NewickTokenType.EDGE_INFO
+            assert self._tokenizer.prev_token == NewickTokenType.EDGE_INFO
             edge_info = tok
             tok = next(self._base_it)
             self._comments.extend(self._tokenizer.comments)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+'''Running jobs in a multiprocessing.Pool whose workers share some state
+(e.g. a reference tree) that is stored in a module global of the job
+function's module.
+'''
+import multiprocessing
+
+def imap_with_worker_state(func, jobs, set_state, state, num_processes=1, ordered=True):
+    '''Yields func(job) for each job in the list `jobs`.
+
+    `set_state(state)` must store `state` where `func` finds it (usually a
+    module global) and return the value it replaces.
+    If `num_processes` > 1 and there are several jobs, they are run in a
+    multiprocessing.Pool of that size, with set_state as the initializer of
+    each worker. `state` is pickled for every worker, unless the workers are
+    forked. Results are yielded in the order of `jobs` if `ordered` is True,
+    and as they are finished otherwise.
+    Otherwise the jobs are run in this process, and the previous value is
+    restored by set_state when the iteration ends.
+    '''
+    if num_processes > 1 and len(jobs) > 1:
+        pool = multiprocessing.Pool(num_processes, set_state, (state,))
+        try:
+            results = pool.imap(func, jobs) if ordered else pool.imap_unordered(func, jobs)
+            for r in results:
+                yield r
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        prev = set_state(state)
+        try:
+            for job in jobs:
+                yield func(job)
+        finally:
+            set_state(prev)
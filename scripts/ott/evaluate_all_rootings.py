@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+'''Evaluates the rooting of every tree in the phylesystem directories that
+the peyotl library can find (see README for discussion of configuration)
+against OTT, and writes a tab-separated table with the score of the current
+rooting and of the best rooting(s) of each tree (see
+peyotl.evaluate_tree.score_rootings).
+'''
+if __name__ == '__main__':
+    from peyotl.evaluate_tree import evaluate_corpus_rootings, write_rooting_table
+    from peyotl.ott import OTT
+    from peyotl import Phylesystem, get_logger
+    import argparse
+    import codecs
+    import sys
+    import os
+    SCRIPT_NAME = os.path.split(os.path.abspath(sys.argv[0]))[-1]
+    _LOG = get_logger(SCRIPT_NAME)
+    parser = argparse.ArgumentParser(description='Suggest rootings based on OTT for every tree in phylesystem')
+    parser.add_argument("-o", "--output",
+                        metavar="FILE",
+                        required=False,
+                        help="output filepath. Standard output is used if omitted.")
+    parser.add_argument("-j", "--processes",
+                        metavar="N",
+                        type=int,
+                        default=1,
+                        help="number of processes used to evaluate studies")
+    args = parser.parse_args()
+    rows = evaluate_corpus_rootings(Phylesystem().iter_study_filepaths(),
+                                    OTT(),
+                                    num_processes=args.processes)
+    _LOG.debug('{n:d} trees evaluated'.format(n=len(rows)))
+    if args.output:
+        with codecs.open(args.output, 'w', encoding='utf-8') as out:
+            write_rooting_table(rows, out)
+    else:
+        write_rooting_table(rows, sys.stdout)
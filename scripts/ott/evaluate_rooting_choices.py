@@ -1,7 +1,6 @@
 #!/usr/bin/env python
-from peyotl.nexson_proxy import NexsonTreeProxy
 from peyotl.ott import OTT
-from peyotl.evaluate_tree import evaluate_tree_rooting
+from peyotl.evaluate_tree import evaluate_study_rootings, write_rooting_table
 from enum import Enum
 class UnrootedConflictStatus(Enum):
     EQUIVALENT = 0
@@ -90,7 +89,6 @@ if __name__ == '__main__':
         else:
             sys.exit('This NexSON has not trees.\n')
     ott = OTT()
-    for tree_id, tree, otus in trees:
-        tree_proxy = NexsonTreeProxy(tree=tree, tree_id=tree_id, otus=otus)
-        evaluate_tree_rooting(nexson, ott, tree_proxy)
+    rows = evaluate_study_rootings(inp_filepath, nexson, ott, tree_id=args.tree_id)
+    write_rooting_table(rows, out)
 
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+'''Validates every study in the phylesystem directories that the peyotl
+library can find (see README for discussion of configuration) and writes
+a JSON report with the number of messages of each NexsonWarningCodes
+type across the corpus and for each study.
+
+If a cache file is given, the results of previous runs are reused for every
+study whose file has not changed (same git blob SHA) since it was last
+validated with the same version of the validator. So nightly runs only
+need to validate the studies that were edited.
+'''
+if __name__ == '__main__':
+    from peyotl.nexson_validation.corpus import validate_corpus
+    from peyotl.nexson_validation import NexsonWarningCodes
+    from peyotl.nexson_syntax import write_as_json
+    from peyotl import Phylesystem, get_logger
+    import argparse
+    import sys
+    import os
+    SCRIPT_NAME = os.path.split(os.path.abspath(sys.argv[0]))[-1]
+    _LOG = get_logger(SCRIPT_NAME)
+    parser = argparse.ArgumentParser(description='Validate all of the studies in phylesystem')
+    parser.add_argument("-o", "--output",
+                        metavar="FILE",
+                        required=False,
+                        help="output filepath. Standard output is used if omitted.")
+    parser.add_argument("-c", "--cache",
+                        metavar="FILE",
+                        required=False,
+                        help="filepath of the cache of validation results (created if it does not exist)")
+    parser.add_argument("-j", "--processes",
+                        metavar="N",
+                        type=int,
+                        default=1,
+                        help="number of processes used to validate studies")
+    parser.add_argument('--meta',
+                        dest='meta',
+                        action='store_true',
+                        default=False,
+                        help='warn about unvalidated meta elements')
+    parser.add_argument('--profile',
+                        dest='profile',
+                        action='store_true',
+                        default=False,
+                        help='add the time spent in each phase of validation to the report')
+    args = parser.parse_args()
+    if args.meta:
+        codes_to_skip = []
+    else:
+        codes_to_skip = [NexsonWarningCodes.UNVALIDATED_ANNOTATION]
+    report = validate_corpus(Phylesystem().iter_study_filepaths(),
+                             cache_filepath=args.cache,
+                             num_processes=args.processes,
+                             codes_to_skip=codes_to_skip,
+                             profile=args.profile)
+    _LOG.debug('{v:d} studies validated, {c:d} results from the cache'.format(v=report['num_validated'],
+                                                                               c=report['num_cached']))
+    if args.output:
+        write_as_json(report, args.output)
+    else:
+        write_as_json(report, sys.stdout)